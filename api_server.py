@@ -0,0 +1,326 @@
+# api_server.py - 不經 Streamlit 介面的 HTTP/JSON 解題 API
+#
+# 執行: python api_server.py --port 8000
+#
+#   POST /solve/<operation>   本文為該運算的參數，例如 {"a": 1, "b": -5, "c": 6}
+#   POST /batch               {"problems": [{"operation": "quadratic", "params": {...}}, ...]}
+#   POST /practice            {"categories": ["二次方程"], "difficulty": 2, "count": 50} 產生練習題
+#   POST /check               {"type": "因式分解", "param": "x**2 - 4", "answer": "(x-2)(x+2)"} 批改答案；
+#                             多份答案用 {"submissions": [{"student": ..., "type": ..., "param": ..., "answer": ...}]}
+#   GET  /operations          可用的運算與參數名稱
+#   GET  /health              程序編號、工作程序池、運算快取與啟動暖機的狀態
+#   GET  /metrics             各運算的延遲直方圖（Prometheus 文字格式）
+#
+# 只依賴標準函式庫的 asyncio；公式解與幾何運算在事件迴圈中直接算，
+# 線性方程組與求值交給執行緒，sympy 運算交給執行緒再送進工作程序池，不會卡住其他請求。
+# 開始接受連線前先暖機（見 math_core/warmup.py，MATH_WARMUP=0 可關閉），第一個請求不必等 sympy 初始化。
+import argparse
+import asyncio
+import functools
+import inspect
+import json
+import math
+import os
+import signal
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+from math_core import solvers
+from math_core.metrics import metrics
+from math_core.result_cache import result_cache
+from math_core.warmup import get_warmup
+from math_core.worker_pool import ComputationTooExpensive, PoolBusy, get_pool
+
+MAX_BODY_BYTES = 1024 * 1024
+MAX_BATCH_SIZE = 1000
+
+
+def _symbolic(op):
+    def solve(expression: str):
+        return solvers.symbolic(op, expression, compute=get_pool().run)
+    return solve
+
+
+def _polynomial(coefficients: list, variable: str = "x", method: str = None):
+    # 精確根交給工作程序池；數值解在執行緒中直接算
+    return solvers.polynomial(coefficients, variable, method, compute=get_pool().run)
+
+
+CHEAP_OPERATIONS = {
+    "quadratic": solvers.quadratic,
+    "linear": solvers.linear,
+    "system": solvers.system_2x2,
+    "triangle_area": solvers.triangle_area,
+    "rect_area": solvers.rect_area,
+    "pythagoras": solvers.pythagoras,
+    "circle_area": solvers.circle_area,
+    "circle_circumference": solvers.circle_circumference,
+    "angle_conversion": solvers.convert_angle,
+    "trig": solvers.trig_values,
+    "right_triangle": solvers.right_triangle,
+}
+HEAVY_OPERATIONS = {op: _symbolic(op) for op in solvers.SYMBOLIC_LABELS}
+HEAVY_OPERATIONS["polynomial"] = _polynomial
+# 不用 sympy，但大型矩陣的消去與數萬個點的求值（含解析、編譯）也要數百毫秒，同樣交給執行緒
+HEAVY_OPERATIONS["linear_system"] = solvers.linear_system
+HEAVY_OPERATIONS["evaluate"] = solvers.evaluate
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _jsonable(value):
+    # 分數、根式與 sympy 物件一律轉成字串；NumPy 陣列轉成清單，nan／inf 不是合法的 JSON，改為 null
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    if isinstance(value, (int, float, bool, type(None))):
+        return value
+    if hasattr(value, "tolist"):
+        return _jsonable(value.tolist())
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _jsonable(v) for k, v in value.items()}
+    return str(value)
+
+
+def _to_json(solution):
+    return {
+        "類型": solution.prob_type,
+        "問題": solution.problem,
+        "解答": solution.answer,
+        "values": {k: _jsonable(v) for k, v in solution.values.items()},
+    }
+
+
+class SolverService:
+    """把運算分派到事件迴圈（便宜）或執行緒＋工作程序池（sympy），並合併相同的進行中請求。"""
+
+    def __init__(self, threads=None):
+        self._executor = ThreadPoolExecutor(max_workers=threads or get_pool().max_workers * 2)
+        self._in_flight = {}
+
+    async def solve(self, operation, params):
+        if not isinstance(params, dict):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "參數必須是 JSON 物件")
+        if operation in CHEAP_OPERATIONS:
+            return self._call(CHEAP_OPERATIONS[operation], params)
+        if operation not in HEAVY_OPERATIONS:
+            raise ApiError(HTTPStatus.NOT_FOUND, f"不支援的運算: {operation}")
+
+        # 同一時間多個學生送出同一題時只算一次
+        key = (operation, json.dumps(params, sort_keys=True))
+        future = self._in_flight.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self._executor, self._call, HEAVY_OPERATIONS[operation], params)
+            self._in_flight[key] = future
+            future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        return await asyncio.shield(future)
+
+    async def solve_batch(self, problems):
+        if not isinstance(problems, list):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "problems 必須是陣列")
+        if len(problems) > MAX_BATCH_SIZE:
+            raise ApiError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"一次最多 {MAX_BATCH_SIZE} 題")
+
+        async def one(problem):
+            try:
+                if not isinstance(problem, dict):
+                    raise ApiError(HTTPStatus.BAD_REQUEST, "每一題必須是 JSON 物件")
+                return await self.solve(problem.get("operation"), problem.get("params", {}))
+            except ApiError as e:
+                return {"error": str(e), "status": int(e.status)}
+
+        return await asyncio.gather(*(one(p) for p in problems))
+
+    async def practice(self, payload):
+        from math_core.practice import CATEGORIES, get_practice
+
+        if not isinstance(payload, dict):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "本文必須是 JSON 物件")
+        categories = payload.get("categories", list(CATEGORIES))
+        try:
+            difficulty, count = int(payload.get("difficulty", 1)), int(payload.get("count", 10))
+        except (TypeError, ValueError):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "difficulty 與 count 必須是整數")
+        if not 1 <= count <= MAX_BATCH_SIZE:
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"count 必須介於 1 與 {MAX_BATCH_SIZE} 之間")
+        loop = asyncio.get_running_loop()
+        try:
+            # 題目池不夠時要當場產生（因式分解會用到工作程序池），交給執行緒
+            problems = await loop.run_in_executor(self._executor, get_practice().worksheet,
+                                                  categories, difficulty, count)
+        except ValueError as e:
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"錯誤: {e}")
+        return [p.as_row() for p in problems]
+
+    async def check(self, payload):
+        from math_core import answer_check
+
+        if not isinstance(payload, dict):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "本文必須是 JSON 物件")
+        loop = asyncio.get_running_loop()
+        if "submissions" not in payload:
+            if "type" not in payload or "answer" not in payload:
+                raise ApiError(HTTPStatus.BAD_REQUEST, "缺少 type 或 answer")
+            result = await loop.run_in_executor(self._executor, functools.partial(
+                answer_check.check, payload["type"], payload.get("param", ""), str(payload["answer"]),
+                compute=get_pool().run))
+            return {"verdict": result.verdict, "text": answer_check.VERDICT_TEXT[result.verdict],
+                    "stage": result.stage, "message": result.message,
+                    "timings_ms": {stage: round(seconds * 1000, 3) for stage, seconds in result.timings.items()}}
+
+        submissions = payload["submissions"]
+        if not isinstance(submissions, list) or not all(isinstance(s, dict) for s in submissions):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "submissions 必須是 JSON 物件的陣列")
+        if len(submissions) > MAX_BATCH_SIZE:
+            raise ApiError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"一次最多 {MAX_BATCH_SIZE} 份")
+        rows = [(str(s.get("student", "")), str(s.get("type", "")), s.get("param", ""), str(s.get("answer", "")))
+                for s in submissions]
+        results = await loop.run_in_executor(self._executor, functools.partial(
+            answer_check.check_batch, rows, compute=get_pool().run))
+        return {"results": results}
+
+    @staticmethod
+    def _call(func, params):
+        try:
+            return _to_json(func(**params))
+        except PoolBusy as e:
+            raise ApiError(HTTPStatus.SERVICE_UNAVAILABLE, str(e))
+        except ComputationTooExpensive as e:
+            raise ApiError(HTTPStatus.UNPROCESSABLE_ENTITY, str(e))
+        except Exception as e:
+            # 參數名稱錯誤、數值不合法、sympy 解析失敗等都是使用者輸入的問題
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"錯誤: {e}")
+
+
+def describe_operations():
+    ops = {**CHEAP_OPERATIONS, **HEAVY_OPERATIONS}
+    return {name: list(inspect.signature(func).parameters) for name, func in ops.items()}
+
+
+async def _read_request(reader):
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    try:
+        method, target, version = request_line.decode("latin-1").split()
+    except ValueError:
+        raise ApiError(HTTPStatus.BAD_REQUEST, "無效的請求")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get("content-length", 0) or 0)
+    except ValueError:
+        raise ApiError(HTTPStatus.BAD_REQUEST, "Content-Length 無效")
+    if length > MAX_BODY_BYTES:
+        raise ApiError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "請求本文過大")
+    body = await reader.readexactly(length) if length else b""
+    keep_alive = headers.get("connection", "").lower() != "close" and version != "HTTP/1.0"
+    return method, target.split("?", 1)[0], body, keep_alive
+
+
+def _response(status, payload, keep_alive):
+    # 字串以純文字回傳（/metrics），其餘為 JSON
+    if isinstance(payload, str):
+        body, content_type = payload.encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8"
+    else:
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+        content_type = "application/json; charset=utf-8"
+    head = (f"HTTP/1.1 {int(status)} {status.phrase}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode("latin-1") + body
+
+
+class ApiServer:
+    def __init__(self, service=None):
+        self.service = service or SolverService()
+
+    async def route(self, method, path, body):
+        if method == "GET" and path == "/health":
+            return {"status": "ok", "pid": os.getpid(), "pool": get_pool().stats(), "cache": result_cache.stats(),
+                    "warmup": get_warmup().report()}
+        if method == "GET" and path == "/metrics":
+            return metrics.prometheus_text()
+        if method == "GET" and path == "/operations":
+            return describe_operations()
+        if method != "POST":
+            raise ApiError(HTTPStatus.METHOD_NOT_ALLOWED, "請使用 POST")
+        try:
+            payload = json.loads(body or b"{}")
+        except ValueError:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "本文不是有效的 JSON")
+        if path.startswith("/solve/"):
+            return await self.service.solve(path[len("/solve/"):], payload)
+        if path == "/batch":
+            problems = payload.get("problems") if isinstance(payload, dict) else None
+            return {"results": await self.service.solve_batch(problems)}
+        if path == "/practice":
+            return {"problems": await self.service.practice(payload)}
+        if path == "/check":
+            return await self.service.check(payload)
+        raise ApiError(HTTPStatus.NOT_FOUND, f"找不到路徑: {path}")
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                keep_alive = False
+                try:
+                    request = await _read_request(reader)
+                    if request is None:
+                        break
+                    method, path, body, keep_alive = request
+                    status, payload = HTTPStatus.OK, await self.route(method, path, body)
+                except ApiError as e:
+                    status, payload = e.status, {"error": str(e)}
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                writer.write(_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        finally:
+            writer.close()
+
+    async def serve(self, host, port, reuse_port=False):
+        # reuse_port：多個程序監聽同一個埠，由核心分配連線（見 cluster.py）
+        server = await asyncio.start_server(self.handle, host, port, reuse_port=reuse_port or None)
+        print(f"解題 API 已啟動: http://{host}:{port}（pid {os.getpid()}，暖機 {get_warmup().seconds:.2f} 秒）",
+              flush=True)
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="中學數學解題助手 HTTP/JSON API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--reuse-port", action="store_true", help="允許多個程序監聽同一個埠（SO_REUSEPORT）")
+    args = parser.parse_args()
+    # 被 terminate 時也要走到 finally 與 atexit（寫回快取快照）
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    # 暖機完成才開始監聽，cluster.py 也是等到啟動訊息才把連線轉過來；API 用不到函數圖形
+    get_warmup().run(skip=("函數圖形",))
+    get_warmup().start()
+    try:
+        asyncio.run(ApiServer().serve(args.host, args.port, args.reuse_port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        get_pool().shutdown()
+
+
+if __name__ == "__main__":
+    main()
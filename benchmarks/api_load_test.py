@@ -0,0 +1,106 @@
+# api_load_test.py - 對 api_server.py 做負載測試，回報 p50/p99 延遲與吞吐量
+#
+# 先啟動伺服器: python api_server.py --port 8000
+# 再執行:       python benchmarks/api_load_test.py --url http://127.0.0.1:8000 --concurrency 32 --requests 5000
+import argparse
+import asyncio
+import json
+import random
+import time
+from urllib.parse import urlsplit
+
+# (運算, 參數) 的混合比例大致比照課堂使用情形：公式題為主，少量 sympy 題
+WORKLOAD = [
+    ("quadratic", lambda: {"a": 1, "b": random.randint(-10, 10), "c": random.randint(-10, 10)}),
+    ("linear", lambda: {"a": random.randint(1, 9), "b": random.randint(-20, 20)}),
+    ("system", lambda: {"a1": 2, "b1": 3, "c1": random.randint(0, 20), "a2": 1, "b2": -1, "c2": 1}),
+    ("pythagoras", lambda: {"a": random.randint(1, 30), "b": random.randint(1, 30)}),
+    ("circle_area", lambda: {"radius": random.randint(1, 50)}),
+    ("trig", lambda: {"angle": random.choice([0, 30, 45, 60, 90, 120, 180])}),
+    ("right_triangle", lambda: {"a": 3, "c": random.randint(4, 20)}),
+    ("factor", lambda: {"expression": f"x**2 - {random.randint(1, 12) ** 2}"}),
+    ("expand", lambda: {"expression": f"(x + {random.randint(1, 9)})**{random.randint(2, 4)}"}),
+    ("simplify", lambda: {"expression": "(x**2 - 1)/(x - 1)"}),
+]
+
+
+async def _request(reader, writer, host, path, payload):
+    body = json.dumps(payload).encode("utf-8")
+    writer.write((f"POST {path} HTTP/1.1\r\nHost: {host}\r\n"
+                  f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n").encode("latin-1") + body)
+    await writer.drain()
+    status_line = await reader.readline()
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return int(status_line.split()[1])
+
+
+async def _client(host, port, count, latencies, statuses, batch_size):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for _ in range(count):
+            if batch_size > 1:
+                problems = []
+                for _ in range(batch_size):
+                    op, make = random.choice(WORKLOAD)
+                    problems.append({"operation": op, "params": make()})
+                path, payload = "/batch", {"problems": problems}
+            else:
+                op, make = random.choice(WORKLOAD)
+                path, payload = f"/solve/{op}", make()
+            start = time.perf_counter()
+            status = await _request(reader, writer, host, path, payload)
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+def _percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+async def run(url, concurrency, total, batch_size):
+    parts = urlsplit(url)
+    latencies, statuses = [], {}
+    per_client = max(1, total // concurrency)
+    start = time.perf_counter()
+    await asyncio.gather(*(_client(parts.hostname, parts.port or 80, per_client, latencies, statuses, batch_size)
+                           for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    problems = len(latencies) * batch_size
+    return {
+        "requests": len(latencies),
+        "problems": problems,
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        "problems_per_second": round(problems / elapsed, 1),
+        "p50_ms": round(_percentile(latencies, 0.50) * 1000, 3),
+        "p99_ms": round(_percentile(latencies, 0.99) * 1000, 3),
+        "status": statuses,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="解題 API 負載測試")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=1, help="大於 1 時改打 /batch，每個請求包含多題")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    random.seed(args.seed)
+    report = asyncio.run(run(args.url, args.concurrency, args.requests, args.batch_size))
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
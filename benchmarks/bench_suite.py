@@ -0,0 +1,260 @@
+# bench_suite.py - 所有解題函數與各分頁重新執行時間的基準測試，可與基準檔比較找出效能退步
+#
+# 執行:         python benchmarks/bench_suite.py
+# 更新基準檔:   python benchmarks/bench_suite.py --save-baseline benchmarks/baseline.json
+# 只跑部分項目: python benchmarks/bench_suite.py --only symbolic --skip-ui
+#
+# 與基準檔比較時，中位數慢超過 --tolerance 比例（且差距大於 --min-delta-ms）的項目
+# 會標記為 regression，程式以結束碼 1 離開，可直接放進 CI。基準檔與機器有關，換機器請重新產生。
+import argparse
+import functools
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# 歷史記錄寫進暫存的資料庫，不碰到正式的紀錄檔；必須在 import math_core 之前設定
+os.environ["MATH_HISTORY_DB"] = os.path.join(tempfile.mkdtemp(prefix="math-bench-"), "history.sqlite3")
+
+from math_core import solvers  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmarks", "baseline.json")
+APP_PATH = os.path.join(ROOT, "math_app_updated.py")
+TABS = ["代數", "幾何", "三角函數", "批次解題", "練習題", "歷史記錄", "使用說明", "系統監控"]
+HISTORY_SIZES = {"small": 20, "large": 100_000}
+
+# 符號運算語料：前面是課本常見題，後面是刻意讓 sympy 吃力但仍能在一秒內算完的題目
+SYMBOLIC_CORPUS = {
+    "factor": {
+        "difference_of_squares": "x**2 - 9",
+        "trinomial": "6*x**2 + 11*x - 35",
+        "two_variables": "x**2 - 2*x*y + y**2 - 4",
+        "cubic_sum": "x**3 + 27",
+        "adversarial_x30_minus_1": "x**30 - 1",
+        # (x + 1)**5 * (x - 2)**4 * (x**2 + 3) 展開後的結果
+        "adversarial_product": ("x**11 - 3*x**10 - 3*x**9 + 9*x**8 + 3*x**7 + 15*x**6 + 15*x**5"
+                                " - 93*x**4 - 96*x**3 + 88*x**2 + 144*x + 48"),
+    },
+    "expand": {
+        "binomial_square": "(x + 3)**2",
+        "product": "(2*x - 1)*(x + 4)*(x - 5)",
+        "binomial_power": "(x + 1)**10",
+        "adversarial_trinomial_power": "(x + y + z)**15",
+        "adversarial_nested": "((x + 1)**3 - (y - 2)**3)**4",
+    },
+    "simplify": {
+        "rational": "(x**2 - 1)/(x - 1)",
+        "fraction_sum": "1/x + 1/(x + 1)",
+        "trig_identity": "sin(x)**2 + cos(x)**2",
+        "radicals": "sqrt(8) + sqrt(18)",
+        "adversarial_trig_power": "(sin(x)**2 + cos(x)**2)**3 - tan(x)*cos(x)",
+        "adversarial_rational": "((x**3 - 1)/(x - 1) - (x**2 + x + 1))/(x**2 + 2*x + 1)",
+    },
+}
+
+SOLVER_CASES = {
+    "quadratic.integer_roots": lambda: solvers.quadratic(1.0, -5.0, 6.0),
+    "quadratic.irrational_roots": lambda: solvers.quadratic(1.0, 1.0, -1.0),
+    "quadratic.complex_roots": lambda: solvers.quadratic(2.0, 3.0, 5.0),
+    "quadratic.decimal_coefficients": lambda: solvers.quadratic(0.3, -1.7, 0.2),
+    "linear": lambda: solvers.linear(3.0, -7.0),
+    "system_2x2.unique": lambda: solvers.system_2x2(2.0, 3.0, 8.0, 1.0, -1.0, -1.0),
+    "system_2x2.singular": lambda: solvers.system_2x2(1.0, 2.0, 3.0, 2.0, 4.0, 6.0),
+    "linear_system.exact_4x4": lambda: solvers.linear_system(
+        [[2, 1, -1, 3], [1, -3, 2, 1], [3, 2, 1, -1], [1, 1, 1, 1]], [5, -2, 4, 6]),
+    "linear_system.numpy_300": lambda: solvers.linear_system(*_dense_system(300)),
+    "polynomial.exact_quintic": lambda: solvers.polynomial([1, 0, 0, 0, -1, -1]),
+    "polynomial.numpy_200": lambda: solvers.polynomial(_dense_system(200)[1] + [1.0]),
+    "evaluate.50k_points": lambda: solvers.evaluate("(x^2 - 1)/(x - 1) + sqrt(x)", _points(50_000)),
+    "triangle_area": lambda: solvers.triangle_area(10.0, 5.0),
+    "rect_area": lambda: solvers.rect_area(8.0, 6.0),
+    "pythagoras.hypotenuse": lambda: solvers.pythagoras(a=3.0, b=4.0),
+    "pythagoras.leg": lambda: solvers.pythagoras(a=5.0, c=13.0),
+    "circle_area": lambda: solvers.circle_area(5.0),
+    "circle_circumference": lambda: solvers.circle_circumference(5.0),
+    "convert_angle.to_radians": lambda: solvers.convert_angle(45.0),
+    "convert_angle.to_degrees": lambda: solvers.convert_angle(1.0, from_degrees=False),
+    "trig_values.degrees": lambda: solvers.trig_values(30.0),
+    "trig_values.tan_undefined": lambda: solvers.trig_values(90.0),
+    "right_triangle.legs": lambda: solvers.right_triangle(a=3.0, b=4.0),
+    "right_triangle.hypotenuse": lambda: solvers.right_triangle(a=5.0, c=13.0),
+}
+
+
+@functools.lru_cache(maxsize=None)
+def _points(n):
+    import numpy as np
+
+    return np.linspace(-10, 10, n)
+
+
+@functools.lru_cache(maxsize=None)
+def _dense_system(n):
+    # 固定亂數種子的 n 元方程組，只建一次，量測時不含產生矩陣的時間
+    import numpy as np
+
+    rng = np.random.default_rng(0)
+    return rng.standard_normal((n, n)).tolist(), rng.standard_normal(n).tolist()
+
+
+def _vector_cases():
+    import numpy as np
+
+    from math_core import geometry, trigonometry
+
+    rng = np.random.default_rng(0)
+    a, b = rng.uniform(1, 100, 100_000), rng.uniform(1, 100, 100_000)
+    return {
+        "hypotenuse_100k": lambda: geometry.hypotenuse(a, b),
+        "circle_area_100k": lambda: geometry.circle_area(a),
+        "trig_table_0_360_step_1": lambda: trigonometry.trig_table(0, 360, 1, True),
+    }
+
+
+def _symbolic_case(op, text):
+    from sympy.core.cache import clear_cache
+
+    from math_core.algebra import apply_operation, parse_expression
+
+    def run():
+        # 清掉 sympy 內部快取，量到的是第一次計算的成本（重複題目由 result_cache 負責）
+        clear_cache()
+        return apply_operation(op, parse_expression(text))
+    return run
+
+
+def measure(func, min_seconds=0.2, min_runs=5, max_runs=1000):
+    """重複執行到累計 min_seconds 秒（至少 min_runs 次），回傳毫秒統計。"""
+    func()  # 暖身：載入模組、建立快取
+    samples = []
+    started = time.perf_counter()
+    while len(samples) < max_runs and (len(samples) < min_runs or time.perf_counter() - started < min_seconds):
+        t0 = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - t0) * 1000)
+    samples.sort()
+    return {
+        "median_ms": round(statistics.median(samples), 4),
+        "p90_ms": round(samples[min(len(samples) - 1, int(0.9 * len(samples)))], 4),
+        "min_ms": round(samples[0], 4),
+        "runs": len(samples),
+    }
+
+
+def _fill_history(history_id, size):
+    from math_core.history_store import get_store
+
+    now = time.time()
+    types = ["二次方程", "因式分解", "三角形面積", "圓面積", "三角函數"]
+    get_store().add_many(history_id, ((types[i % len(types)], f"題目 {i}", f"答案 {i}", now - size + i)
+                                      for i in range(size)))
+
+
+def _ui_cases(sizes):
+    from streamlit.testing.v1 import AppTest
+
+    def rerun(tab, history_id):
+        at = AppTest.from_file(APP_PATH, default_timeout=120)
+        at.session_state.current_tab = tab
+        at.session_state.history_id = history_id
+        at.run()
+        if at.exception:
+            raise RuntimeError(f"{tab} 分頁執行失敗: {at.exception[0].message}")
+        return at.run
+
+    cases = {}
+    for size_name in sizes:
+        history_id = f"bench-{size_name}"
+        _fill_history(history_id, HISTORY_SIZES[size_name])
+        for tab in TABS:
+            cases[f"ui.{tab}.history_{size_name}"] = (rerun, tab, history_id)
+    return cases
+
+
+def collect(only=None, skip_ui=False, history_sizes=tuple(HISTORY_SIZES)):
+    cases = {f"solver.{name}": func for name, func in SOLVER_CASES.items()}
+    cases.update({f"vector.{name}": func for name, func in _vector_cases().items()})
+    for op, corpus in SYMBOLIC_CORPUS.items():
+        for name, text in corpus.items():
+            cases[f"symbolic.{op}.{name}"] = _symbolic_case(op, text)
+    if not skip_ui:
+        cases.update(_ui_cases(history_sizes))
+    if only:
+        cases = {name: case for name, case in cases.items() if any(part in name for part in only)}
+    return cases
+
+
+def run(cases, min_seconds):
+    results = {}
+    for name, case in cases.items():
+        if isinstance(case, tuple):
+            # UI 項目：AppTest 建好後只量重新執行的時間，次數少一些
+            factory, *args = case
+            results[name] = measure(factory(*args), min_seconds=min_seconds * 5, min_runs=3, max_runs=20)
+        else:
+            results[name] = measure(case, min_seconds=min_seconds)
+        print(f"{name:<55} {results[name]['median_ms']:>12.4f} ms", file=sys.stderr)
+    return results
+
+
+def compare(results, baseline, tolerance, min_delta_ms):
+    """回傳每個項目相對基準的比值，以及退步項目的名稱。"""
+    comparison, regressions = {}, []
+    for name, result in results.items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            continue
+        ratio = result["median_ms"] / base["median_ms"] if base["median_ms"] else float("inf")
+        comparison[name] = round(ratio, 3)
+        if ratio > 1 + tolerance and result["median_ms"] - base["median_ms"] > min_delta_ms:
+            regressions.append(name)
+    return comparison, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="數學助手基準測試")
+    parser.add_argument("--only", nargs="*", help="只跑名稱包含這些字串的項目")
+    parser.add_argument("--skip-ui", action="store_true", help="不跑 AppTest 的分頁重新執行項目")
+    parser.add_argument("--history", nargs="*", choices=list(HISTORY_SIZES), default=list(HISTORY_SIZES),
+                        help="分頁項目要用的歷史記錄大小")
+    parser.add_argument("--min-seconds", type=float, default=0.2, help="每個項目至少量測的秒數")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="要比較的基準檔")
+    parser.add_argument("--save-baseline", metavar="PATH", help="把這次結果寫成基準檔")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="中位數可容許的變慢比例")
+    parser.add_argument("--min-delta-ms", type=float, default=0.05, help="小於此差距的變慢不算退步")
+    args = parser.parse_args()
+
+    results = run(collect(args.only, args.skip_ui, args.history), args.min_seconds)
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+        },
+        "results": results,
+    }
+
+    regressions = []
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        report["baseline"] = args.baseline
+        report["ratio"], regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+        report["regressions"] = regressions
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2, sort_keys=True)
+            f.write("\n")
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
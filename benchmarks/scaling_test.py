@@ -0,0 +1,114 @@
+# scaling_test.py - 多程序部署的擴充性測試：工作程序數增加時，吞吐量是否接近等比例成長
+#
+# 執行: python benchmarks/scaling_test.py --workers 1 2 4 --requests 20000 --clients 4
+#
+# 每一輪以 cluster.py 啟動 N 個 API 程序（共用同一個 sqlite 快取檔），再從 --clients 個負載產生程序
+# 同時送出請求。回報每輪的吞吐量、相對單一程序的倍數與效率（倍數 / N）。負載產生程序本身也吃 CPU，
+# 核心數應大於「最多的工作程序數 + 負載產生程序數」，否則量到的是機器上限而不是擴充性。
+import argparse
+import asyncio
+import json
+import multiprocessing as mp
+import os
+import random
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, HERE)
+
+import api_load_test  # noqa: E402
+import cluster  # noqa: E402
+
+
+def _client_main(args):
+    url, concurrency, total, batch_size, seed = args
+    random.seed(seed)
+    return asyncio.run(api_load_test.run(url, concurrency, total, batch_size))
+
+
+def measure(url, clients, concurrency, total, batch_size):
+    """從 clients 個程序同時送出共 total 個請求，合併成一份結果。"""
+    jobs = [(url, max(1, concurrency // clients), max(1, total // clients), batch_size, seed)
+            for seed in range(clients)]
+    started = time.perf_counter()
+    with mp.get_context("spawn").Pool(clients) as pool:
+        reports = pool.map(_client_main, jobs)
+    elapsed = time.perf_counter() - started
+    requests = sum(r["requests"] for r in reports)
+    statuses = {}
+    for report in reports:
+        for status, n in report["status"].items():
+            statuses[status] = statuses.get(status, 0) + n
+    # 各程序的百分位數無法直接合併，取最差的一個
+    return {
+        "requests": requests,
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(requests / max(r["seconds"] for r in reports), 1),
+        "p50_ms": max(r["p50_ms"] for r in reports),
+        "p99_ms": max(r["p99_ms"] for r in reports),
+        "status": statuses,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多程序部署的擴充性測試")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--requests", type=int, default=20000, help="每一輪的請求總數")
+    parser.add_argument("--clients", type=int, default=4, help="負載產生程序數")
+    parser.add_argument("--concurrency", type=int, default=64, help="所有負載產生程序合計的連線數")
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--balancer", choices=["reuseport", "proxy"], default="reuseport")
+    parser.add_argument("--min-efficiency", type=float, default=0.0,
+                        help="任一輪效率低於此值時以結束碼 1 離開（0 表示不檢查）")
+    args = parser.parse_args()
+
+    # 每次測試用新的快取與紀錄檔，結果不受上一次影響
+    workdir = tempfile.mkdtemp(prefix="math-scaling-")
+    os.environ["MATH_CACHE_URL"] = f"sqlite:///{os.path.join(workdir, 'cache.sqlite3')}"
+    os.environ["MATH_HISTORY_DB"] = os.path.join(workdir, "history.sqlite3")
+    url = f"http://127.0.0.1:{args.port}"
+
+    rounds = []
+    for workers in args.workers:
+        procs, _ = cluster.start_workers("api", workers, "127.0.0.1", args.port, args.balancer)
+        try:
+            if args.balancer == "proxy":
+                balancer = mp.get_context("spawn").Process(target=_serve_proxy, args=(workers, args.port),
+                                                           daemon=True)
+                balancer.start()
+                cluster.wait_for_port("127.0.0.1", args.port)
+            # 暖身：載入 sympy 工作程序、填入共用快取
+            measure(url, args.clients, args.concurrency, min(2000, args.requests), args.batch_size)
+            result = measure(url, args.clients, args.concurrency, args.requests, args.batch_size)
+        finally:
+            if args.balancer == "proxy":
+                balancer.terminate()
+                balancer.join()
+            cluster.stop_workers(procs)
+        result["workers"] = workers
+        rounds.append(result)
+        print(f"{workers:>3} 個程序: {result['requests_per_second']:>10.1f} req/s  "
+              f"p99 {result['p99_ms']:.1f} ms", file=sys.stderr)
+
+    base = rounds[0]["requests_per_second"] / rounds[0]["workers"]
+    for result in rounds:
+        result["speedup"] = round(result["requests_per_second"] / rounds[0]["requests_per_second"], 2)
+        result["efficiency"] = round(result["requests_per_second"] / (base * result["workers"]), 2)
+    report = {"cpu_count": os.cpu_count(), "clients": args.clients, "balancer": args.balancer, "rounds": rounds}
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    low = args.min_efficiency and any(r["efficiency"] < args.min_efficiency for r in rounds)
+    sys.exit(1 if low else 0)
+
+
+def _serve_proxy(workers, port):
+    backends = [("127.0.0.1", port + 1 + i) for i in range(workers)]
+    asyncio.run(cluster.Balancer(backends).serve("127.0.0.1", port))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+# cluster.py - 單機多程序部署：啟動多個 API 或 Streamlit 程序，前面放一個本機負載平衡器
+#
+# API:        python cluster.py api --workers 4 --port 8000
+# Streamlit:  python cluster.py app --workers 4 --port 8501
+#
+# 各程序共用 MATH_HISTORY_DB 的紀錄檔與 MATH_CACHE_URL 的運算快取；沒有設定 MATH_CACHE_URL 時
+# 改用工作目錄下的 sqlite 快取檔，讓一個程序算過的題目其他程序也能直接取用。
+# 每個程序各有自己的 sympy 工作程序池，預設把 CPU 核心平均分給各程序。
+#
+# 負載平衡:
+#   reuseport  API 程序以 SO_REUSEPORT 監聽同一個埠，由核心分配連線（不經過代理，Linux 預設）
+#   proxy      本程序監聽對外的埠，把每條 TCP 連線轉給後面的程序；
+#              Streamlit 的 session 綁在單一程序的 WebSocket 上，所以依用戶端位址固定轉給同一個程序
+import argparse
+import asyncio
+import itertools
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import zlib
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(ROOT, "math_app_updated.py")
+API_PATH = os.path.join(ROOT, "api_server.py")
+DEFAULT_CACHE_FILE = os.path.join(ROOT, "math_cache.sqlite3")
+# 轉送資料時每次讀取的大小
+_CHUNK = 64 * 1024
+
+
+def worker_env(workers):
+    """子程序的環境變數：共用的紀錄檔與快取改成絕對路徑，工作程序池依程序數分配核心。"""
+    from math_core.history_store import DEFAULT_PATH
+
+    env = dict(os.environ)
+    env["MATH_HISTORY_DB"] = os.path.abspath(DEFAULT_PATH)
+    env.setdefault("MATH_CACHE_URL", f"sqlite:///{DEFAULT_CACHE_FILE}")
+    env.setdefault("MATH_POOL_WORKERS", str(max(1, (os.cpu_count() or 1) // workers)))
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [ROOT, env.get("PYTHONPATH")]))
+    return env
+
+
+def worker_command(kind, host, port, reuse_port=False):
+    if kind == "api":
+        command = [sys.executable, API_PATH, "--host", host, "--port", str(port)]
+        return command + ["--reuse-port"] if reuse_port else command
+    return [sys.executable, "-m", "streamlit", "run", APP_PATH, "--server.headless", "true",
+            "--server.address", host, "--server.port", str(port)]
+
+
+def wait_for_port(host, port, timeout=60.0):
+    """等到埠可以連線（程序啟動完成）；逾時丟出 TimeoutError。"""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with socket.create_connection((host, port), timeout=1):
+                return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"{host}:{port} 在 {timeout:g} 秒內沒有啟動")
+            time.sleep(0.1)
+
+
+class Balancer:
+    """TCP 層的負載平衡：輪流或依用戶端位址選後端，連不上時改試下一個。"""
+
+    def __init__(self, backends, sticky=False):
+        self.backends = list(backends)
+        self.sticky = sticky
+        self._next = itertools.cycle(range(len(self.backends)))
+        self.connections = [0] * len(self.backends)
+
+    def order(self, peer_host):
+        # 回傳嘗試的順序：第一個是選中的後端，其餘依序備援
+        if self.sticky:
+            first = zlib.crc32(peer_host.encode("utf-8")) % len(self.backends)
+        else:
+            first = next(self._next)
+        return [(first + i) % len(self.backends) for i in range(len(self.backends))]
+
+    async def handle(self, client_reader, client_writer):
+        peer = client_writer.get_extra_info("peername") or ("", 0)
+        for index in self.order(peer[0]):
+            try:
+                backend_reader, backend_writer = await asyncio.open_connection(*self.backends[index])
+                break
+            except OSError:
+                continue
+        else:
+            client_writer.close()
+            return
+        self.connections[index] += 1
+        await asyncio.gather(_pipe(client_reader, backend_writer), _pipe(backend_reader, client_writer))
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+async def _pipe(reader, writer):
+    try:
+        while True:
+            data = await reader.read(_CHUNK)
+            if not data:
+                break
+            writer.write(data)
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+def start_workers(kind, workers, host, port, balancer):
+    """啟動子程序並等它們就緒；回傳 (程序清單, 後端位址清單)。"""
+    env = worker_env(workers)
+    if balancer == "reuseport":
+        ports = [port] * workers
+    else:
+        ports = [port + 1 + i for i in range(workers)]
+    procs = []
+    try:
+        for p in ports:
+            command = worker_command(kind, host, p, balancer == "reuseport")
+            if balancer == "reuseport":
+                # 共用埠時連得上不代表這個程序已就緒，改等它印出啟動訊息
+                proc = subprocess.Popen(command, env=env, cwd=ROOT, stdout=subprocess.PIPE, text=True)
+                procs.append(proc)
+                if not proc.stdout.readline():
+                    raise RuntimeError(f"第 {len(procs)} 個程序啟動失敗（結束碼 {proc.wait()}）")
+            else:
+                procs.append(subprocess.Popen(command, env=env, cwd=ROOT))
+        for p in set(ports):
+            wait_for_port(host, p)
+    except BaseException:
+        stop_workers(procs)
+        raise
+    return procs, [(host, p) for p in ports]
+
+
+def stop_workers(procs):
+    for proc in procs:
+        proc.terminate()
+    for proc in procs:
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="單機多程序部署")
+    parser.add_argument("kind", choices=["api", "app"], help="api: api_server.py；app: Streamlit 網頁")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, help="對外的埠（預設 api 為 8000、app 為 8501）")
+    parser.add_argument("--balancer", choices=["reuseport", "proxy"],
+                        help="api 在支援 SO_REUSEPORT 的系統預設 reuseport，其餘一律 proxy")
+    args = parser.parse_args()
+
+    port = args.port or (8000 if args.kind == "api" else 8501)
+    balancer = args.balancer or ("reuseport" if args.kind == "api" and hasattr(socket, "SO_REUSEPORT")
+                                 else "proxy")
+    if args.kind == "app" and balancer == "reuseport":
+        parser.error("Streamlit 程序無法共用同一個埠，請使用 --balancer proxy")
+
+    # 被 terminate 時也要走到 finally 收掉子程序
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    procs, backends = start_workers(args.kind, args.workers, args.host, port, balancer)
+    print(f"已啟動 {args.workers} 個{args.kind}程序（{balancer}）: http://{args.host}:{port}", flush=True)
+    try:
+        if balancer == "proxy":
+            asyncio.run(Balancer(backends, sticky=args.kind == "app").serve(args.host, port))
+        else:
+            while all(proc.poll() is None for proc in procs):
+                time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_workers(procs)
+
+
+if __name__ == "__main__":
+    main()
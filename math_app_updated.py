@@ -1,21 +1,44 @@
 # math_app.py - 完整版數學助手（包含代數、幾何、三角函數）
 import streamlit as st
-import sympy as sp
+import hmac
 import math
-import pandas as pd
-import numpy as np
+import os
+import time
+import uuid
 from datetime import datetime
 
-# ========== 網頁配置 ==========
-st.set_page_config(
-    page_title="中學數學解題助手",
-    page_icon="🧮",
-    layout="wide",
-    initial_sidebar_state="expanded"
-)
+# sympy、pandas、numpy、matplotlib 等較重的模組都在用到的分頁裡才載入，
+# 冷啟動（例如只開「使用說明」）只需付出 streamlit 本身的成本
+from math_core import solvers
+from math_core.history_store import get_store
+from math_core.metrics import metrics
+from math_core.result_cache import result_cache
+from math_core.session_memory import RecordTable, get_session_memory
+from math_core.worker_pool import ComputationTooExpensive, get_pool
+from math_core.warmup import get_warmup
 
-# ========== 自定義CSS美化 ==========
-st.markdown("""
+# 系統監控分頁的管理權杖：輸入相同權杖的 session 才能重設統計、寫回快照與調整取樣分析器；
+# 沒有設定時分頁只供檢視。這些設定由整個程序共用，不能讓學生改動
+ADMIN_TOKEN = os.environ.get("MATH_ADMIN_TOKEN", "")
+
+# 每個伺服器程序第一次執行時在背景暖機（sympy、工作程序池、預設範例的快取），不會擋住頁面
+get_warmup().start()
+
+# 整頁重新執行的計時（與取樣分析）從這裡開始，到檔案最後結束
+_rerun_started = time.perf_counter()
+_rerun_profile = metrics.profiler.start("math_rerun_seconds")
+
+try:
+    # ========== 網頁配置 ==========
+    st.set_page_config(
+        page_title="中學數學解題助手",
+        page_icon="🧮",
+        layout="wide",
+        initial_sidebar_state="expanded"
+    )
+
+    # ========== 自定義CSS美化 ==========
+    st.markdown("""
 <style>
     .main-title {
         text-align: center;
@@ -45,530 +68,1134 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# ========== 初始化Session State ==========
-if 'history' not in st.session_state:
-    st.session_state.history = []
-if 'current_tab' not in st.session_state:
-    st.session_state.current_tab = "代數"
+    # ========== 初始化Session State ==========
+    if 'history_id' not in st.session_state:
+        # 紀錄代碼：解題紀錄存在磁碟上，換 session 後輸入代碼即可找回
+        st.session_state.history_id = uuid.uuid4().hex[:12]
+    if 'memory_id' not in st.session_state:
+        # 本 session 暫存結果（解答、批次結果、練習卷）的代號；這些結果由 SessionMemory 控管記憶體用量
+        st.session_state.memory_id = uuid.uuid4().hex
+    if 'current_tab' not in st.session_state:
+        st.session_state.current_tab = "代數"
 
-# ========== 標題區 ==========
-st.markdown('<h1 class="main-title">🎓 中學數學解題助手</h1>', unsafe_allow_html=True)
-st.markdown("---")
+    # ========== 標題區 ==========
+    st.markdown('<h1 class="main-title">🎓 中學數學解題助手</h1>', unsafe_allow_html=True)
+    st.markdown("---")
 
-# ========== 側邊欄 ==========
-with st.sidebar:
-    st.markdown("### 📚 功能選單")
-    
-    tab = st.radio(
-        "選擇解題類別",
-        ["代數", "幾何", "三角函數", "歷史記錄", "使用說明"],
-        index=["代數", "幾何", "三角函數", "歷史記錄", "使用說明"].index(st.session_state.current_tab)
-    )
-    st.session_state.current_tab = tab
+    # ========== 側邊欄 ==========
+    with st.sidebar:
+        st.markdown("### 📚 功能選單")
+        
+        tab = st.radio(
+            "選擇解題類別",
+            ["代數", "幾何", "三角函數", "批次解題", "練習題", "歷史記錄", "使用說明", "系統監控"],
+            index=["代數", "幾何", "三角函數", "批次解題", "練習題", "歷史記錄", "使用說明", "系統監控"].index(st.session_state.current_tab)
+        )
+        st.session_state.current_tab = tab
+        
+        st.markdown("---")
+        st.markdown("### 📊 統計資訊")
+        st.info(f"解題紀錄: {get_store().count(st.session_state.history_id)} 筆")
+        memory_usage = get_session_memory().usage(st.session_state.memory_id)
+        st.caption(
+            f"暫存記憶體: {memory_usage['bytes'] / 1024:.0f} KB / {memory_usage['max_bytes'] / 1024 / 1024:.0f} MB"
+            + (f"（{memory_usage['on_disk']} 項已移到磁碟）" if memory_usage['on_disk'] else "")
+        )
+        cache_stats = result_cache.stats()
+        st.caption(
+            f"運算快取: 命中 {cache_stats['hits']} / 未命中 {cache_stats['misses']}"
+            f"（{cache_stats['entries']} 筆, {cache_stats['bytes'] / 1024:.1f} KB）"
+        )
+        if get_warmup().state != "done":
+            st.caption("⏳ 伺服器暖機中，第一次計算可能稍慢")
+        
+        if st.button("🗑️ 清除歷史", use_container_width=True):
+            get_store().clear(st.session_state.history_id)
+            st.rerun()
+        
+        st.markdown("---")
+        st.caption("🎓 數學研究所專題")
+        st.caption("版本: 3.0 (完整網頁版)")
+
+    # ========== 記錄歷史的輔助函數 ==========
+    HISTORY_PAGE_SIZE = 50
+
+    def add_to_history(prob_type, problem, solution):
+        get_store().add(st.session_state.history_id, prob_type, problem, solution)
+
+    def export_history_file(history_id, fmt, prob_types, date_range):
+        import os
+        import tempfile
+        from datetime import timedelta
+        from math_core.history_export import FORMATS, export_history
+        
+        # 日期範圍只選了一天時 date_input 會回傳一個元素
+        start_date, end_date = (tuple(date_range) * 2)[:2] if date_range else (None, None)
+        start = datetime.combine(start_date, datetime.min.time()).timestamp() if start_date else None
+        end = datetime.combine(end_date + timedelta(days=1), datetime.min.time()).timestamp() if end_date else None
+        extension, mime = FORMATS[fmt]
+        file_name = f"math_history_{datetime.now().strftime('%Y%m%d_%H%M')}.{extension}"
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, file_name)
+            with open(path, "wb") as f:
+                count = export_history(get_store(), history_id, fmt, f,
+                                       prob_types=prob_types, start=start, end=end)
+            st.caption(f"共 {count} 筆紀錄")
+            with open(path, "rb") as f:
+                st.download_button(
+                    label=f"📥 下載{fmt}檔案",
+                    data=f,
+                    file_name=file_name,
+                    mime=mime,
+                    use_container_width=True
+                )
+
+    # ========== 依輸入值沿用結果的輔助函數 ==========
+    def widget_values(keys):
+        return tuple(st.session_state.get(key) for key in keys)
+
+    def memo(section, keys, compute, deps=()):
+        """keys（元件的 key）與 deps 的值都和上次相同時，直接沿用上次 compute() 的結果。
     
-    st.markdown("---")
-    st.markdown("### 📊 統計資訊")
-    st.info(f"解題紀錄: {len(st.session_state.history)} 筆")
+    結果存在 SessionMemory，超過記憶體上限時可能被丟掉，之後重新計算。
+    """
+        memory, name = get_session_memory(), f"memo:{section}"
+        inputs = (widget_values(keys), deps)
+        cached = memory.get(st.session_state.memory_id, name)
+        if cached is None or cached[0] != inputs:
+            cached = (inputs, compute())
+            memory.put(st.session_state.memory_id, name, cached)
+        return cached[1]
+
+    def section_result(section, keys, clicked, compute):
+        """按下按鈕時執行 compute() 並記住結果；之後的重新執行只要 keys 的元件值沒變就沿用，不再重算。
     
-    if st.button("🗑️ 清除歷史", use_container_width=True):
-        st.session_state.history = []
-        st.rerun()
+    回傳 (結果, 是否剛算出)；沒有可用的結果時為 (None, False)。compute 的例外會直接往外丟。
+    """
+        memory, name = get_session_memory(), f"result:{section}"
+        inputs = widget_values(keys)
+        if clicked:
+            memory.pop(st.session_state.memory_id, name)
+            sol = compute()
+            memory.put(st.session_state.memory_id, name, (inputs, sol))
+            return sol, True
+        cached = memory.get(st.session_state.memory_id, name)
+        if cached is not None and cached[0] == inputs:
+            return cached[1], False
+        return None, False
+
+    def show_steps(section, sol):
+        """打開開關時才產生並顯示解題步驟。
     
-    st.markdown("---")
-    st.caption("🎓 數學研究所專題")
-    st.caption("版本: 3.0 (完整網頁版)")
+    st.expander 的內容不論是否展開都會執行，改用開關才能讓沒看步驟的重新執行不必產生步驟；
+    步驟產生後留在 Solution 上，之後的重新執行直接沿用。
+    """
+        if sol.explain is None or not st.toggle("📝 查看詳細步驟", key=f"steps_{section}"):
+            return
+        try:
+            solution_steps = sol.steps
+        except ComputationTooExpensive as e:
+            st.warning(f"⏱️ {e}")
+            return
+        for i, step in enumerate(solution_steps, 1):
+            st.markdown(f"{i}. {step.text}" + (f"：`{step.formula}`" if step.formula else ""))
 
-# ========== 記錄歷史的輔助函數 ==========
-def add_to_history(prob_type, problem, solution):
-    record = {
-        "類型": prob_type,
-        "問題": problem,
-        "解答": solution,
-        "時間": datetime.now().strftime("%H:%M:%S")
-    }
-    st.session_state.history.append(record)
+    # ========== 表格的輔助函數 ==========
+    def hypotenuse_table(pairs_text):
+        import pandas as pd
+        from math_core.geometry import hypotenuse
+        
+        pairs = [[float(v) for v in line.replace("，", ",").split(",")]
+                 for line in pairs_text.splitlines() if line.strip()]
+        if any(len(pair) != 2 for pair in pairs):
+            raise ValueError("每行需輸入兩個數值")
+        legs_a = [pair[0] for pair in pairs]
+        legs_b = [pair[1] for pair in pairs]
+        return pd.DataFrame({"a": legs_a, "b": legs_b, "c": hypotenuse(legs_a, legs_b)})
 
-# ========== 代數功能區 ==========
-if tab == "代數":
-    st.markdown("## 🧮 代數運算")
-    
-    alg_tab1, alg_tab2, alg_tab3 = st.tabs(["📊 方程求解", "🔍 表達式運算", "🧩 方程組"])
-    
-    # 標籤1：方程求解
-    with alg_tab1:
-        col1, col2 = st.columns(2)
+    def trig_value_table(start, stop, step, degrees):
+        import pandas as pd
+        from math_core.trigonometry import trig_table
         
+        angles, sin_col, cos_col, tan_col = trig_table(start, stop, step, degrees=degrees)
+        return pd.DataFrame({"角度" if degrees else "弧度": angles, "sin": sin_col, "cos": cos_col, "tan": tan_col})
+
+    # ========== 繪製函數圖形的輔助函數 ==========
+    def plot_panel(expr_text, key, x_min=-10.0, x_max=10.0):
+        if not st.checkbox("📈 顯示函數圖形", key=f"{key}_plot"):
+            return
+        from math_core.algebra import parse_expression
+        from math_core.plotting import render_plot
+        
+        col1, col2, col3 = st.columns(3)
         with col1:
-            st.markdown('<div class="feature-card">', unsafe_allow_html=True)
-            st.markdown("#### 一元二次方程")
-            st.markdown("**格式: ax² + bx + c = 0**")
+            lo = st.number_input("x 最小值", value=x_min, key=f"{key}_xmin")
+        with col2:
+            hi = st.number_input("x 最大值", value=x_max, key=f"{key}_xmax")
+        with col3:
+            resolution = st.select_slider("解析度", options=[100, 200, 400, 800], value=200, key=f"{key}_res")
+        
+        if hi <= lo:
+            st.error("x 最大值必須大於最小值！")
+            return
+        try:
+            st.image(render_plot(parse_expression(expr_text), lo, hi, resolution))
+        except Exception as e:
+            st.error(f"無法繪圖: {e}")
+
+    # ========== 代數功能區 ==========
+    if tab == "代數":
+        st.markdown("## 🧮 代數運算")
+        
+        alg_tab1, alg_tab2, alg_tab3 = st.tabs(["📊 方程求解", "🔍 表達式運算", "🧩 方程組"])
+        
+        # 標籤1：方程求解
+        with alg_tab1:
+            col1, col2 = st.columns(2)
             
-            a = st.number_input("係數 a", value=1.0, key="quad_a")
-            b = st.number_input("係數 b", value=-5.0, key="quad_b")
-            c = st.number_input("常數項 c", value=6.0, key="quad_c")
+            with col1:
+                st.markdown('<div class="feature-card">', unsafe_allow_html=True)
+                st.markdown("#### 一元二次方程")
+                st.markdown("**格式: ax² + bx + c = 0**")
+                
+                a = st.number_input("係數 a", value=1.0, key="quad_a")
+                b = st.number_input("係數 b", value=-5.0, key="quad_b")
+                c = st.number_input("常數項 c", value=6.0, key="quad_c")
+                
+                clicked = st.button("求解二次方程", key="btn_quad")
+                if clicked and a == 0:
+                    st.error("係數 a 不能為 0！")
+                else:
+                    sol, fresh = section_result("quad", ["quad_a", "quad_b", "quad_c"], clicked,
+                                                lambda: solvers.quadratic(a, b, c))
+                    if sol:
+                        st.markdown('<div class="success-box">', unsafe_allow_html=True)
+                        st.markdown(f"**解為:** {sol.answer}")
+                        if sol.values["approx"]:
+                            st.markdown(f"**近似值:** {sol.values['approx']}")
+                        st.markdown('</div>', unsafe_allow_html=True)
+                        
+                        show_steps("quad", sol)
+                        
+                        if fresh:
+                            add_to_history(sol.prob_type, sol.problem, sol.answer)
+                
+                plot_panel(solvers.quadratic_text(a, b, c), "quad")
+                st.markdown('</div>', unsafe_allow_html=True)
             
-            if st.button("求解二次方程", key="btn_quad"):
-                if a == 0:
+            with col2:
+                st.markdown('<div class="feature-card">', unsafe_allow_html=True)
+                st.markdown("#### 一元一次方程")
+                st.markdown("**格式: ax + b = 0**")
+                
+                a_lin = st.number_input("係數 a", value=2.0, key="lin_a")
+                b_lin = st.number_input("常數項 b", value=-8.0, key="lin_b")
+                
+                clicked = st.button("求解一次方程", key="btn_lin")
+                if clicked and a_lin == 0:
                     st.error("係數 a 不能為 0！")
                 else:
-                    x = sp.symbols('x')
-                    equation = a*x**2 + b*x + c
-                    solutions = sp.solve(equation, x)
-                    
+                    sol, fresh = section_result("lin", ["lin_a", "lin_b"], clicked,
+                                                lambda: solvers.linear(a_lin, b_lin))
+                    if sol:
+                        st.markdown('<div class="success-box">', unsafe_allow_html=True)
+                        st.markdown(f"**解為:** x = {sol.values['x']:.4f}")
+                        st.markdown('</div>', unsafe_allow_html=True)
+                        
+                        show_steps("lin", sol)
+                        
+                        if fresh:
+                            add_to_history(sol.prob_type, sol.problem, sol.answer)
+                st.markdown('</div>', unsafe_allow_html=True)
+            
+            # 任意次數的多項式方程
+            st.markdown('<div class="feature-card">', unsafe_allow_html=True)
+            st.markdown("#### 多項式方程（任意次數）")
+            st.caption("低次且係數為有理數時求精確根；高次（可到數百次）以數值法求根並附誤差上界")
+            
+            poly_format = st.radio("輸入方式", ["方程式", "係數"], horizontal=True, key="poly_format")
+            if poly_format == "方程式":
+                poly_text = st.text_input("方程式", value="x^3 - 6x^2 + 11x - 6 = 0", key="poly_equation")
+            else:
+                poly_text = st.text_input("係數（由最高次往下，以逗號分隔）", value="1, 0, -2", key="poly_coefficients")
+            poly_method = st.selectbox("解法", ["自動", "精確（sympy）", "數值（numpy）"], key="poly_method")
+            
+            def solve_polynomial():
+                from math_core import polynomials
+                if poly_format == "方程式":
+                    coefficients, variable = polynomials.parse_polynomial(poly_text)
+                else:
+                    coefficients, variable = polynomials.parse_coefficients(poly_text), "x"
+                method = {"自動": None, "數值（numpy）": "numpy"}.get(poly_method, "exact")
+                return solvers.polynomial(coefficients, variable, method, compute=get_pool().run)
+            
+            try:
+                sol, fresh = section_result("polynomial", ["poly_format", "poly_equation", "poly_coefficients", "poly_method"],
+                                            st.button("求解多項式方程", key="btn_polynomial"),
+                                            solve_polynomial)
+                if sol:
+                    import pandas as pd
+                    from math_core.polynomials import format_root
+                    values = sol.values
                     st.markdown('<div class="success-box">', unsafe_allow_html=True)
-                    st.markdown(f"**解為:** {solutions}")
+                    st.markdown(f"**{values['degree']} 次方程，共 {len(values['real_roots'])} 個相異實根**")
+                    table = {"近似值": [format_root(z) for z in values["roots"]], "重數": list(values["multiplicities"])}
+                    if values["exact"]:
+                        table = {"精確值": [str(r) for r in values["exact"]], **table}
+                    else:
+                        table["誤差上界"] = [f"{r:.1e}" for r in values["radii"]]
+                    st.dataframe(pd.DataFrame(table), hide_index=True)
                     st.markdown('</div>', unsafe_allow_html=True)
                     
-                    # 顯示判別式
-                    D = b**2 - 4*a*c
-                    with st.expander("📝 查看詳細步驟"):
-                        st.write(f"1. 計算判別式: D = b² - 4ac = {b}² - 4×{a}×{c} = {D}")
-                        if D > 0:
-                            st.write(f"2. D > 0，有兩個實根")
-                            st.write(f"3. 求根公式: x = [-b ± √D] / (2a)")
-                            st.write(f"   x₁ = [{-b} + √{D}] / (2×{a}) = {solutions[0]}")
-                            st.write(f"   x₂ = [{-b} - √{D}] / (2×{a}) = {solutions[1]}")
+                    show_steps("polynomial", sol)
                     
-                    add_to_history("二次方程", f"{a}x²+{b}x+{c}=0", str(solutions))
+                    if fresh:
+                        add_to_history(sol.prob_type, sol.problem, sol.answer)
+            except ComputationTooExpensive as e:
+                st.warning(f"⏱️ {e}（可改用數值解法）")
+            except Exception as e:
+                st.error(f"錯誤: {e}")
             st.markdown('</div>', unsafe_allow_html=True)
         
-        with col2:
+        # 標籤2：表達式運算
+        with alg_tab2:
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                st.markdown('<div class="feature-card">', unsafe_allow_html=True)
+                st.markdown("#### 因式分解")
+                st.caption("例: x^2 - 4, x² + 2x + 1（可用 ^、²、√ 與 2x 這類省略乘號的寫法）")
+                
+                factor_expr = st.text_input("輸入表達式", value="x**2 - 4", key="factor_expr")
+                
+                try:
+                    sol, fresh = section_result("factor", ["factor_expr"],
+                                                st.button("因式分解", key="btn_factor"),
+                                                lambda: solvers.symbolic("factor", factor_expr, compute=get_pool().run))
+                    if sol:
+                        st.markdown('<div class="success-box">', unsafe_allow_html=True)
+                        st.markdown(f"**結果:** {factor_expr} = {sol.answer}")
+                        st.markdown('</div>', unsafe_allow_html=True)
+                        
+                        show_steps("factor", sol)
+                        
+                        if fresh:
+                            add_to_history(sol.prob_type, sol.problem, sol.answer)
+                except ComputationTooExpensive as e:
+                    st.warning(f"⏱️ {e}")
+                except Exception as e:
+                    st.error(f"錯誤: {e}")
+                st.markdown('</div>', unsafe_allow_html=True)
+            
+            with col2:
+                st.markdown('<div class="feature-card">', unsafe_allow_html=True)
+                st.markdown("#### 表達式展開")
+                st.caption("例: (x+1)^2, (x+2)(x-3)")
+                
+                expand_expr = st.text_input("輸入表達式", value="(x+1)**2", key="expand_expr")
+                
+                try:
+                    sol, fresh = section_result("expand", ["expand_expr"],
+                                                st.button("展開表達式", key="btn_expand"),
+                                                lambda: solvers.symbolic("expand", expand_expr, compute=get_pool().run))
+                    if sol:
+                        st.markdown('<div class="success-box">', unsafe_allow_html=True)
+                        st.markdown(f"**結果:** {expand_expr} = {sol.answer}")
+                        st.markdown('</div>', unsafe_allow_html=True)
+                        
+                        show_steps("expand", sol)
+                        
+                        if fresh:
+                            add_to_history(sol.prob_type, sol.problem, sol.answer)
+                except ComputationTooExpensive as e:
+                    st.warning(f"⏱️ {e}")
+                except Exception as e:
+                    st.error(f"錯誤: {e}")
+                st.markdown('</div>', unsafe_allow_html=True)
+            
+            # 表達式化簡
             st.markdown('<div class="feature-card">', unsafe_allow_html=True)
-            st.markdown("#### 一元一次方程")
-            st.markdown("**格式: ax + b = 0**")
+            st.markdown("#### 表達式化簡")
+            st.caption("例: (x^2 - 1)/(x - 1), sin^2(x) + cos^2(x)")
             
-            a_lin = st.number_input("係數 a", value=2.0, key="lin_a")
-            b_lin = st.number_input("常數項 b", value=-8.0, key="lin_b")
+            simplify_expr = st.text_input("輸入複雜表達式", value="(x**2 - 1)/(x - 1)", key="simplify_expr")
             
-            if st.button("求解一次方程", key="btn_lin"):
-                if a_lin == 0:
-                    st.error("係數 a 不能為 0！")
-                else:
-                    solution = -b_lin / a_lin
+            try:
+                sol, fresh = section_result("simplify", ["simplify_expr"],
+                                            st.button("化簡表達式", key="btn_simplify"),
+                                            lambda: solvers.symbolic("simplify", simplify_expr, compute=get_pool().run))
+                if sol:
                     st.markdown('<div class="success-box">', unsafe_allow_html=True)
-                    st.markdown(f"**解為:** x = {solution:.4f}")
+                    st.markdown(f"**結果:** {simplify_expr} = {sol.answer}")
                     st.markdown('</div>', unsafe_allow_html=True)
                     
-                    add_to_history("一次方程", f"{a_lin}x+{b_lin}=0", f"x={solution:.4f}")
+                    show_steps("simplify", sol)
+                    
+                    if fresh:
+                        add_to_history(sol.prob_type, sol.problem, sol.answer)
+            except ComputationTooExpensive as e:
+                st.warning(f"⏱️ {e}")
+            except Exception as e:
+                st.error(f"錯誤: {e}")
+            
+            plot_panel(simplify_expr, "simplify")
             st.markdown('</div>', unsafe_allow_html=True)
-    
-    # 標籤2：表達式運算
-    with alg_tab2:
-        col1, col2 = st.columns(2)
-        
-        with col1:
+            
+            # 代入求值
             st.markdown('<div class="feature-card">', unsafe_allow_html=True)
-            st.markdown("#### 因式分解")
-            st.caption("例: x**2 - 4, x**2 + 2x + 1")
+            st.markdown("#### 代入求值")
+            st.caption("表達式只編譯一次，一次可代入數萬個 x 值")
             
-            factor_expr = st.text_input("輸入表達式", value="x**2 - 4", key="factor_expr")
+            eval_expr = st.text_input("輸入單變數表達式", value="x**2 - 4", key="eval_expr")
+            eval_mode = st.radio("x 值", ["等距範圍", "自訂數值"], horizontal=True, key="eval_mode")
+            if eval_mode == "等距範圍":
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    eval_start = st.number_input("起點", value=-5.0, key="eval_start")
+                with col2:
+                    eval_stop = st.number_input("終點", value=5.0, key="eval_stop")
+                with col3:
+                    eval_count = st.number_input("點數", min_value=2, max_value=100_000, value=11, step=1, key="eval_count")
+            else:
+                eval_points = st.text_input("x 值（以逗號分隔）", value="0, 1, 2, 3", key="eval_points")
             
-            if st.button("因式分解", key="btn_factor"):
-                try:
-                    factored = sp.factor(factor_expr)
-                    st.markdown('<div class="success-box">', unsafe_allow_html=True)
-                    st.markdown(f"**結果:** {factor_expr} = {factored}")
-                    st.markdown('</div>', unsafe_allow_html=True)
+            def evaluate_expression():
+                import numpy as np
+                from math_core.plotting import parse_points
+                if eval_mode == "等距範圍":
+                    xs = np.linspace(eval_start, eval_stop, int(eval_count))
+                else:
+                    xs = parse_points(eval_points)
+                return solvers.evaluate(eval_expr, xs)
+            
+            try:
+                eval_keys = ["eval_expr", "eval_mode", "eval_start", "eval_stop", "eval_count", "eval_points"]
+                sol, fresh = section_result("evaluate", eval_keys, st.button("計算數值", key="btn_evaluate"),
+                                            evaluate_expression)
+                if sol:
+                    import pandas as pd
+                    values = sol.values
+                    st.caption(f"共 {len(values['x'])} 個點，其中 {values['defined']} 個有定義（無定義的點顯示為空白）")
+                    table = pd.DataFrame({values["variable"]: values["x"], "值": values["y"]})
+                    st.dataframe(table, hide_index=True, height=300)
+                    # 數萬列的 CSV 只在輸入改變時重新產生（與上面的結果用同一組元件值）
+                    csv = memo("evaluate_csv", eval_keys, lambda: table.to_csv(index=False).encode("utf-8-sig"))
+                    st.download_button("📥 下載數值表 (CSV)", csv, file_name="values.csv", mime="text/csv",
+                                       key="download_values")
                     
-                    add_to_history("因式分解", factor_expr, str(factored))
-                except Exception as e:
-                    st.error(f"錯誤: {e}")
+                    show_steps("evaluate", sol)
+                    
+                    if fresh:
+                        add_to_history(sol.prob_type, sol.problem, sol.answer)
+            except Exception as e:
+                st.error(f"錯誤: {e}")
             st.markdown('</div>', unsafe_allow_html=True)
         
-        with col2:
+        # 標籤3：方程組
+        with alg_tab3:
             st.markdown('<div class="feature-card">', unsafe_allow_html=True)
-            st.markdown("#### 表達式展開")
-            st.caption("例: (x+1)**2, (x+2)*(x-3)")
+            st.markdown("#### 二元一次方程組")
+            st.markdown("**格式:** a₁x + b₁y = c₁")
+            st.markdown("　　　　a₂x + b₂y = c₂")
             
-            expand_expr = st.text_input("輸入表達式", value="(x+1)**2", key="expand_expr")
+            st.markdown("##### 第一個方程")
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                a1 = st.number_input("a₁", value=2.0, key="sys_a1")
+            with col2:
+                b1 = st.number_input("b₁", value=3.0, key="sys_b1")
+            with col3:
+                c1 = st.number_input("c₁", value=8.0, key="sys_c1")
             
-            if st.button("展開表達式", key="btn_expand"):
-                try:
-                    expanded = sp.expand(expand_expr)
-                    st.markdown('<div class="success-box">', unsafe_allow_html=True)
-                    st.markdown(f"**結果:** {expand_expr} = {expanded}")
-                    st.markdown('</div>', unsafe_allow_html=True)
+            st.markdown("##### 第二個方程")
+            col4, col5, col6 = st.columns(3)
+            with col4:
+                a2 = st.number_input("a₂", value=1.0, key="sys_a2")
+            with col5:
+                b2 = st.number_input("b₂", value=-1.0, key="sys_b2")
+            with col6:
+                c2 = st.number_input("c₂", value=1.0, key="sys_c2")
+            
+            try:
+                sol, fresh = section_result("system", ["sys_a1", "sys_b1", "sys_c1", "sys_a2", "sys_b2", "sys_c2"],
+                                            st.button("解方程組", key="btn_system"),
+                                            lambda: solvers.system_2x2(a1, b1, c1, a2, b2, c2))
+                if sol:
+                    if sol.values["x"] is not None:
+                        st.markdown('<div class="success-box">', unsafe_allow_html=True)
+                        st.markdown("**方程組:**")
+                        st.write(f"{a1}x + {b1}y = {c1}")
+                        st.write(f"{a2}x + {b2}y = {c2}")
+                        st.write(f"**解:** x = {sol.values['x']}, y = {sol.values['y']}")
+                        st.markdown('</div>', unsafe_allow_html=True)
+                    elif sol.values["status"] == "infinite":
+                        st.warning("兩個方程式其實是同一條直線，方程組有無限多解")
+                    else:
+                        st.warning("兩條直線平行，方程組無解")
                     
-                    add_to_history("表達式展開", expand_expr, str(expanded))
-                except Exception as e:
-                    st.error(f"錯誤: {e}")
+                    show_steps("system", sol)
+                    
+                    if fresh:
+                        add_to_history(sol.prob_type, sol.problem, sol.answer)
+            except Exception as e:
+                st.error(f"錯誤: {e}")
             st.markdown('</div>', unsafe_allow_html=True)
-        
-        # 表達式化簡
-        st.markdown('<div class="feature-card">', unsafe_allow_html=True)
-        st.markdown("#### 表達式化簡")
-        st.caption("例: (x**2 - 1)/(x - 1), sin(x)**2 + cos(x)**2")
-        
-        simplify_expr = st.text_input("輸入複雜表達式", value="(x**2 - 1)/(x - 1)", key="simplify_expr")
-        
-        if st.button("化簡表達式", key="btn_simplify"):
+            
+            # n 元一次方程組
+            st.markdown('<div class="feature-card">', unsafe_allow_html=True)
+            st.markdown("#### n 元一次方程組")
+            st.caption("方程式個數可多於或少於未知數；小型題目以分數精確消去，大型題目交給 numpy")
+            
+            lin_format = st.radio("輸入方式", ["方程式", "係數矩陣"], horizontal=True, key="lin_format")
+            if lin_format == "方程式":
+                st.caption("每行一個方程式，例: 2x + 3y - z = 5")
+                lin_text = st.text_area("方程組", value="x + y + z = 6\ny - z = 0\n2x + z = 4", key="lin_equations")
+            else:
+                st.caption("每行一個方程式的係數，最後一個數為常數項，例: 2 3 -1 | 5")
+                lin_text = st.text_area("增廣矩陣", value="1 1 1 | 6\n0 1 -1 | 0\n2 0 1 | 4", key="lin_matrix")
+            lin_method = st.selectbox("解法", ["自動", "精確（分數消去）", "numpy"], key="lin_method")
+            
+            def solve_linear_system():
+                from math_core import linear_systems
+                if lin_format == "方程式":
+                    matrix, constants, names = linear_systems.parse_equations(lin_text)
+                else:
+                    (matrix, constants), names = linear_systems.parse_matrix(lin_text), None
+                method = {"自動": None, "numpy": "numpy"}.get(lin_method, "exact")
+                return solvers.linear_system(matrix, constants, names, method)
+            
             try:
-                simplified = sp.simplify(simplify_expr)
-                st.markdown('<div class="success-box">', unsafe_allow_html=True)
-                st.markdown(f"**結果:** {simplify_expr} = {simplified}")
-                st.markdown('</div>', unsafe_allow_html=True)
-                
-                add_to_history("表達式化簡", simplify_expr, str(simplified))
+                sol, fresh = section_result("linear_system", ["lin_format", "lin_equations", "lin_matrix", "lin_method"],
+                                            st.button("解方程組", key="btn_linear_system"),
+                                            solve_linear_system)
+                if sol:
+                    values = sol.values
+                    st.caption(f"係數矩陣的秩 {values['rank']}、增廣矩陣的秩 {values['augmented_rank']}，"
+                               f"解法: {'分數消去' if values['method'] == 'exact' else 'numpy'}")
+                    if values["status"] == "unique":
+                        import pandas as pd
+                        st.markdown('<div class="success-box">', unsafe_allow_html=True)
+                        st.markdown("**唯一解:**")
+                        st.dataframe(pd.DataFrame({"未知數": values["names"],
+                                                   "解": [str(v) for v in values["solution"]]}),
+                                     hide_index=True)
+                        st.markdown('</div>', unsafe_allow_html=True)
+                    elif values["status"] == "infinite":
+                        st.info(f"方程組有無限多解（{len(values['names']) - values['rank']} 個自由變數）")
+                        if values["general"]:
+                            st.markdown("**通解:** " + "；".join(f"`{line}`" for line in values["general"]))
+                    else:
+                        st.warning("方程組無解（增廣矩陣的秩比係數矩陣大）")
+                    
+                    show_steps("linear_system", sol)
+                    
+                    if fresh:
+                        add_to_history(sol.prob_type, sol.problem, sol.answer)
             except Exception as e:
                 st.error(f"錯誤: {e}")
-        st.markdown('</div>', unsafe_allow_html=True)
-    
-    # 標籤3：方程組
-    with alg_tab3:
-        st.markdown('<div class="feature-card">', unsafe_allow_html=True)
-        st.markdown("#### 二元一次方程組")
-        st.markdown("**格式:** a₁x + b₁y = c₁")
-        st.markdown("　　　　a₂x + b₂y = c₂")
-        
-        st.markdown("##### 第一個方程")
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            a1 = st.number_input("a₁", value=2.0, key="sys_a1")
-        with col2:
-            b1 = st.number_input("b₁", value=3.0, key="sys_b1")
-        with col3:
-            c1 = st.number_input("c₁", value=8.0, key="sys_c1")
-        
-        st.markdown("##### 第二個方程")
-        col4, col5, col6 = st.columns(3)
-        with col4:
-            a2 = st.number_input("a₂", value=1.0, key="sys_a2")
-        with col5:
-            b2 = st.number_input("b₂", value=-1.0, key="sys_b2")
-        with col6:
-            c2 = st.number_input("c₂", value=1.0, key="sys_c2")
-        
-        if st.button("解方程組", key="btn_system"):
-            try:
-                x, y = sp.symbols('x y')
-                eq1 = sp.Eq(a1*x + b1*y, c1)
-                eq2 = sp.Eq(a2*x + b2*y, c2)
-                solution = sp.solve((eq1, eq2), (x, y))
+            st.markdown('</div>', unsafe_allow_html=True)
+
+    # ========== 幾何功能區 ==========
+    elif tab == "幾何":
+        st.markdown("## 📐 幾何計算")
+        
+        geom_tab1, geom_tab2, geom_tab3 = st.tabs(["📏 面積計算", "🔺 三角形", "⚫ 圓形"])
+        
+        with geom_tab1:
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                st.markdown('<div class="feature-card">', unsafe_allow_html=True)
+                st.markdown("#### 三角形面積")
+                st.markdown("**公式:** 面積 = ½ × 底 × 高")
                 
-                if solution:
+                base = st.number_input("底邊長", value=10.0, min_value=0.0, key="tri_base")
+                height = st.number_input("高", value=5.0, min_value=0.0, key="tri_height")
+                
+                sol, fresh = section_result("tri_area", ["tri_base", "tri_height"],
+                                            st.button("計算三角形面積", key="btn_tri_area"),
+                                            lambda: solvers.triangle_area(base, height))
+                if sol:
                     st.markdown('<div class="success-box">', unsafe_allow_html=True)
-                    st.markdown("**方程組:**")
-                    st.write(f"{a1}x + {b1}y = {c1}")
-                    st.write(f"{a2}x + {b2}y = {c2}")
-                    st.write(f"**解:** x = {solution[x]}, y = {solution[y]}")
+                    st.markdown(f"**面積** = ½ × {base} × {height}")
+                    st.markdown(f"**結果** = {sol.answer}")
                     st.markdown('</div>', unsafe_allow_html=True)
-                else:
-                    st.warning("方程組無解或無限多解")
+                    
+                    show_steps("tri_area", sol)
+                    
+                    if fresh:
+                        add_to_history(sol.prob_type, sol.problem, sol.answer)
+                st.markdown('</div>', unsafe_allow_html=True)
+            
+            with col2:
+                st.markdown('<div class="feature-card">', unsafe_allow_html=True)
+                st.markdown("#### 長方形面積")
+                st.markdown("**公式:** 面積 = 長 × 寬")
                 
-                add_to_history("二元方程組", f"({a1},{b1},{c1}),({a2},{b2},{c2})", str(solution))
-            except Exception as e:
-                st.error(f"錯誤: {e}")
-        st.markdown('</div>', unsafe_allow_html=True)
-
-# ========== 幾何功能區 ==========
-elif tab == "幾何":
-    st.markdown("## 📐 幾何計算")
-    
-    geom_tab1, geom_tab2, geom_tab3 = st.tabs(["📏 面積計算", "🔺 三角形", "⚫ 圓形"])
-    
-    with geom_tab1:
-        col1, col2 = st.columns(2)
+                length = st.number_input("長", value=8.0, min_value=0.0, key="rect_len")
+                width = st.number_input("寬", value=6.0, min_value=0.0, key="rect_width")
+                
+                sol, fresh = section_result("rect_area", ["rect_len", "rect_width"],
+                                            st.button("計算長方形面積", key="btn_rect_area"),
+                                            lambda: solvers.rect_area(length, width))
+                if sol:
+                    st.markdown('<div class="success-box">', unsafe_allow_html=True)
+                    st.markdown(f"**面積** = {length} × {width}")
+                    st.markdown(f"**結果** = {sol.answer}")
+                    st.markdown('</div>', unsafe_allow_html=True)
+                    
+                    show_steps("rect_area", sol)
+                    
+                    if fresh:
+                        add_to_history(sol.prob_type, sol.problem, sol.answer)
+                st.markdown('</div>', unsafe_allow_html=True)
         
-        with col1:
+        with geom_tab2:
             st.markdown('<div class="feature-card">', unsafe_allow_html=True)
-            st.markdown("#### 三角形面積")
-            st.markdown("**公式:** 面積 = ½ × 底 × 高")
+            st.markdown("#### 畢氏定理")
+            st.markdown("**公式:** a² + b² = c²")
+            st.markdown("已知任意兩邊求第三邊")
             
-            base = st.number_input("底邊長", value=10.0, min_value=0.0, key="tri_base")
-            height = st.number_input("高", value=5.0, min_value=0.0, key="tri_height")
+            option = st.selectbox("已知條件", 
+                                 ["已知兩直角邊(a,b)求斜邊(c)",
+                                  "已知直角邊(a)和斜邊(c)求另一邊(b)",
+                                  "已知直角邊(b)和斜邊(c)求另一邊(a)"])
             
-            if st.button("計算三角形面積", key="btn_tri_area"):
-                area = 0.5 * base * height
-                st.markdown('<div class="success-box">', unsafe_allow_html=True)
-                st.markdown(f"**面積** = ½ × {base} × {height}")
-                st.markdown(f"**結果** = {area}")
-                st.markdown('</div>', unsafe_allow_html=True)
+            if "兩直角邊" in option:
+                col1, col2 = st.columns(2)
+                with col1:
+                    a = st.number_input("直角邊 a", value=3.0, min_value=0.0, key="pyth_a")
+                with col2:
+                    b = st.number_input("直角邊 b", value=4.0, min_value=0.0, key="pyth_b")
                 
-                add_to_history("三角形面積", f"底={base},高={height}", f"{area}")
+                sol, fresh = section_result("pyth_c", ["pyth_a", "pyth_b"],
+                                            st.button("計算斜邊", key="btn_pyth_c"),
+                                            lambda: solvers.pythagoras(a=a, b=b))
+                if sol:
+                    st.markdown('<div class="success-box">', unsafe_allow_html=True)
+                    st.markdown(f"**斜邊 c** = √({a}² + {b}²)")
+                    st.markdown(f"**結果** = {sol.values['value']:.4f}")
+                    st.markdown('</div>', unsafe_allow_html=True)
+                    show_steps("pyth_c", sol)
+                    
+                    if fresh:
+                        add_to_history(sol.prob_type, sol.problem, sol.answer)
+                
+                pairs_text = st.text_area("批次計算（每行一組 a,b）", value="3,4\n5,12\n8,15", key="pyth_pairs")
+                try:
+                    table, _ = section_result("pyth_table", ["pyth_pairs"],
+                                              st.button("計算斜邊表", key="btn_pyth_table"),
+                                              lambda: hypotenuse_table(pairs_text))
+                    if table is not None:
+                        st.dataframe(table, use_container_width=True, hide_index=True)
+                except ValueError as e:
+                    st.error(f"錯誤: {e}")
+            
+            elif "直角邊(a)和斜邊" in option:
+                col1, col2 = st.columns(2)
+                with col1:
+                    a = st.number_input("直角邊 a", value=3.0, min_value=0.0, key="pyth_a2")
+                with col2:
+                    c = st.number_input("斜邊 c", value=5.0, min_value=0.0, key="pyth_c2")
+                
+                clicked = st.button("計算另一邊", key="btn_pyth_b2")
+                if clicked and c <= a:
+                    st.error("斜邊必須大於直角邊！")
+                else:
+                    sol, fresh = section_result("pyth_b2", ["pyth_a2", "pyth_c2"], clicked,
+                                                lambda: solvers.pythagoras(a=a, c=c))
+                    if sol:
+                        st.markdown('<div class="success-box">', unsafe_allow_html=True)
+                        st.markdown(f"**直角邊 b** = √({c}² - {a}²)")
+                        st.markdown(f"**結果** = {sol.values['value']:.4f}")
+                        st.markdown('</div>', unsafe_allow_html=True)
+                        show_steps("pyth_b2", sol)
+                        
+                        if fresh:
+                            add_to_history(sol.prob_type, sol.problem, sol.answer)
             st.markdown('</div>', unsafe_allow_html=True)
         
-        with col2:
+        with geom_tab3:
             st.markdown('<div class="feature-card">', unsafe_allow_html=True)
-            st.markdown("#### 長方形面積")
-            st.markdown("**公式:** 面積 = 長 × 寬")
+            st.markdown("#### 圓計算")
+            st.markdown("**公式:** 面積 = π × r², 周長 = 2π × r")
             
-            length = st.number_input("長", value=8.0, min_value=0.0, key="rect_len")
-            width = st.number_input("寬", value=6.0, min_value=0.0, key="rect_width")
+            radius = st.number_input("半徑 r", value=5.0, min_value=0.0, key="circle_radius")
             
-            if st.button("計算長方形面積", key="btn_rect_area"):
-                area = length * width
-                st.markdown('<div class="success-box">', unsafe_allow_html=True)
-                st.markdown(f"**面積** = {length} × {width}")
-                st.markdown(f"**結果** = {area}")
-                st.markdown('</div>', unsafe_allow_html=True)
-                
-                add_to_history("長方形面積", f"長={length},寬={width}", f"{area}")
-            st.markdown('</div>', unsafe_allow_html=True)
-    
-    with geom_tab2:
-        st.markdown('<div class="feature-card">', unsafe_allow_html=True)
-        st.markdown("#### 畢氏定理")
-        st.markdown("**公式:** a² + b² = c²")
-        st.markdown("已知任意兩邊求第三邊")
-        
-        option = st.selectbox("已知條件", 
-                             ["已知兩直角邊(a,b)求斜邊(c)",
-                              "已知直角邊(a)和斜邊(c)求另一邊(b)",
-                              "已知直角邊(b)和斜邊(c)求另一邊(a)"])
-        
-        if "兩直角邊" in option:
             col1, col2 = st.columns(2)
             with col1:
-                a = st.number_input("直角邊 a", value=3.0, min_value=0.0, key="pyth_a")
+                sol, fresh = section_result("circle_area", ["circle_radius"],
+                                            st.button("計算圓面積", key="btn_circle_area"),
+                                            lambda: solvers.circle_area(radius))
+                if sol:
+                    st.markdown('<div class="success-box">', unsafe_allow_html=True)
+                    st.markdown(f"**面積** = π × {radius}²")
+                    st.markdown(f"**結果** = {sol.answer}")
+                    st.markdown('</div>', unsafe_allow_html=True)
+                    show_steps("circle_area", sol)
+                    
+                    if fresh:
+                        add_to_history(sol.prob_type, sol.problem, sol.answer)
+            
             with col2:
-                b = st.number_input("直角邊 b", value=4.0, min_value=0.0, key="pyth_b")
+                sol, fresh = section_result("circle_circ", ["circle_radius"],
+                                            st.button("計算圓周長", key="btn_circle_circ"),
+                                            lambda: solvers.circle_circumference(radius))
+                if sol:
+                    st.markdown('<div class="success-box">', unsafe_allow_html=True)
+                    st.markdown(f"**周長** = 2π × {radius}")
+                    st.markdown(f"**結果** = {sol.answer}")
+                    st.markdown('</div>', unsafe_allow_html=True)
+                    show_steps("circle_circ", sol)
+                    
+                    if fresh:
+                        add_to_history(sol.prob_type, sol.problem, sol.answer)
+            st.markdown('</div>', unsafe_allow_html=True)
+
+    # ========== 三角函數功能區 ==========
+    elif tab == "三角函數":
+        st.markdown("## 📐 三角函數")
+        
+        trig_tab1, trig_tab2, trig_tab3 = st.tabs(["🔄 角度轉換", "📊 函數計算", "🔺 解直角三角形"])
+        
+        with trig_tab1:
+            st.markdown('<div class="feature-card">', unsafe_allow_html=True)
+            st.markdown("#### 角度單位轉換")
             
-            if st.button("計算斜邊", key="btn_pyth_c"):
-                c = math.sqrt(a**2 + b**2)
-                st.markdown('<div class="success-box">', unsafe_allow_html=True)
-                st.markdown(f"**斜邊 c** = √({a}² + {b}²)")
-                st.markdown(f"**結果** = {c:.4f}")
-                st.markdown('</div>', unsafe_allow_html=True)
-                add_to_history("畢氏定理", f"a={a},b={b}", f"c={c:.4f}")
+            col1, col2 = st.columns(2)
+            with col1:
+                value = st.number_input("數值", value=180.0, key="angle_value")
+                from_unit = st.selectbox("從單位", ["度(°)", "弧度(rad)"], key="angle_from")
+            
+            with col2:
+                sol, fresh = section_result("convert_angle", ["angle_value", "angle_from"],
+                                            st.button("執行轉換", key="btn_convert_angle"),
+                                            lambda: solvers.convert_angle(value, from_degrees="度" in from_unit))
+                if sol:
+                    st.markdown('<div class="success-box">', unsafe_allow_html=True)
+                    exact = sol.values["exact"]
+                    if "度" in from_unit:
+                        approx = f"{sol.values['result']:.6f}"
+                        st.markdown(f"**{value}°** = {f'{exact} ≈ {approx}' if exact else approx} 弧度")
+                    elif exact:
+                        st.markdown(f"**{value} 弧度** = {exact}")
+                    else:
+                        st.markdown(f"**{value} 弧度** = {sol.values['result']:.6f}°")
+                    st.markdown('</div>', unsafe_allow_html=True)
+                    show_steps("convert_angle", sol)
+                    
+                    if fresh:
+                        add_to_history(sol.prob_type, sol.problem, sol.answer)
+            st.markdown('</div>', unsafe_allow_html=True)
         
-        elif "直角邊(a)和斜邊" in option:
+        with trig_tab2:
+            st.markdown('<div class="feature-card">', unsafe_allow_html=True)
+            st.markdown("#### 三角函數值")
+            
             col1, col2 = st.columns(2)
             with col1:
-                a = st.number_input("直角邊 a", value=3.0, min_value=0.0, key="pyth_a2")
+                angle = st.number_input("角度值", value=45.0, key="trig_angle")
+                unit = st.selectbox("單位", ["度(°)", "弧度(rad)"], key="trig_unit")
+            
+            with col2:
+                sol, fresh = section_result("trig_values", ["trig_angle", "trig_unit"],
+                                            st.button("計算函數值", key="btn_trig_values"),
+                                            lambda: solvers.trig_values(angle, degrees="度" in unit))
+                if sol:
+                    exact = sol.values["exact"] or {}
+                    
+                    st.markdown('<div class="success-box">', unsafe_allow_html=True)
+                    st.markdown(f"**角度:** {sol.problem}")
+                    for name in ("sin", "cos", "tan"):
+                        result = sol.values[name]
+                        if result is None:
+                            st.markdown(f"**{name}** = 未定義")
+                        elif exact.get(name) and exact[name] != f"{result:g}":
+                            # 特殊角顯示精確值與近似值，例如 √2/2 ≈ 0.707107
+                            st.markdown(f"**{name}** = {exact[name]} ≈ {result:.6f}")
+                        else:
+                            st.markdown(f"**{name}** = {result:.6f}")
+                    st.markdown('</div>', unsafe_allow_html=True)
+                    
+                    show_steps("trig_values", sol)
+                    
+                    if fresh:
+                        add_to_history(sol.prob_type, sol.problem, sol.answer)
+            
+            st.markdown("##### 📋 三角函數表")
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                table_start = st.number_input("起始值", value=0.0, key="trig_table_start")
             with col2:
-                c = st.number_input("斜邊 c", value=5.0, min_value=0.0, key="pyth_c2")
+                table_stop = st.number_input("結束值", value=360.0, key="trig_table_stop")
+            with col3:
+                table_step = st.number_input("間隔", value=15.0, min_value=0.001, key="trig_table_step")
             
-            if st.button("計算另一邊", key="btn_pyth_b2"):
-                if c <= a:
-                    st.error("斜邊必須大於直角邊！")
-                else:
-                    b = math.sqrt(c**2 - a**2)
+            clicked = st.button("產生函數表", key="btn_trig_table")
+            if clicked and table_stop < table_start:
+                st.error("結束值必須大於或等於起始值！")
+            elif clicked and (table_stop - table_start) / table_step > 100000:
+                st.error("表格超過 100000 列，請加大間隔！")
+            else:
+                table, _ = section_result("trig_table", ["trig_table_start", "trig_table_stop", "trig_table_step", "trig_unit"],
+                                          clicked, lambda: trig_value_table(table_start, table_stop, table_step, "度" in unit))
+                if table is not None:
+                    st.dataframe(table, use_container_width=True, hide_index=True)
+            
+            st.markdown("##### 📈 函數圖形")
+            plot_func = st.selectbox("函數", ["sin", "cos", "tan"], key="trig_plot_func")
+            plot_panel(f"{plot_func}(x)", "trig", -2 * math.pi, 2 * math.pi)
+            st.markdown('</div>', unsafe_allow_html=True)
+        
+        with trig_tab3:
+            st.markdown('<div class="feature-card">', unsafe_allow_html=True)
+            st.markdown("#### 解直角三角形")
+            st.markdown("已知兩邊求第三邊和角度")
+            
+            known_option = st.selectbox("已知條件",
+                                       ["已知兩直角邊(a,b)",
+                                        "已知直角邊(a)和斜邊(c)",
+                                        "已知直角邊(b)和斜邊(c)"])
+            
+            if "兩直角邊" in known_option:
+                col1, col2 = st.columns(2)
+                with col1:
+                    a = st.number_input("直角邊 a", value=3.0, min_value=0.0, key="rt_a")
+                with col2:
+                    b = st.number_input("直角邊 b", value=4.0, min_value=0.0, key="rt_b")
+                
+                sol, fresh = section_result("rt1", ["rt_a", "rt_b"],
+                                            st.button("解三角形", key="btn_solve_rt1"),
+                                            lambda: solvers.right_triangle(a=a, b=b))
+                if sol:
+                    c, angle_A, angle_B = sol.values["c"], sol.values["A"], sol.values["B"]
+                    
                     st.markdown('<div class="success-box">', unsafe_allow_html=True)
-                    st.markdown(f"**直角邊 b** = √({c}² - {a}²)")
-                    st.markdown(f"**結果** = {b:.4f}")
+                    st.markdown("**結果:**")
+                    st.markdown(f"斜邊 c = √({a}² + {b}²) = {c:.4f}")
+                    st.markdown(f"角 A = arctan({a}/{b}) = {angle_A:.2f}°")
+                    st.markdown(f"角 B = 90° - {angle_A:.2f}° = {angle_B:.2f}°")
                     st.markdown('</div>', unsafe_allow_html=True)
-                    add_to_history("畢氏定理", f"a={a},c={c}", f"b={b:.4f}")
-        st.markdown('</div>', unsafe_allow_html=True)
-    
-    with geom_tab3:
-        st.markdown('<div class="feature-card">', unsafe_allow_html=True)
-        st.markdown("#### 圓計算")
-        st.markdown("**公式:** 面積 = π × r², 周長 = 2π × r")
+                    
+                    show_steps("rt1", sol)
+                    
+                    if fresh:
+                        add_to_history(sol.prob_type, sol.problem, sol.answer)
+            
+            elif "直角邊(a)和斜邊" in known_option:
+                col1, col2 = st.columns(2)
+                with col1:
+                    a = st.number_input("直角邊 a", value=3.0, min_value=0.0, key="rt_a2")
+                with col2:
+                    c = st.number_input("斜邊 c", value=5.0, min_value=0.0, key="rt_c2")
+                
+                clicked = st.button("解三角形", key="btn_solve_rt2")
+                if clicked and c <= a:
+                    st.error("斜邊必須大於直角邊！")
+                else:
+                    sol, fresh = section_result("rt2", ["rt_a2", "rt_c2"], clicked,
+                                                lambda: solvers.right_triangle(a=a, c=c))
+                    if sol:
+                        b, angle_A, angle_B = sol.values["b"], sol.values["A"], sol.values["B"]
+                        
+                        st.markdown('<div class="success-box">', unsafe_allow_html=True)
+                        st.markdown("**結果:**")
+                        st.markdown(f"直角邊 b = √({c}² - {a}²) = {b:.4f}")
+                        st.markdown(f"角 A = arcsin({a}/{c}) = {angle_A:.2f}°")
+                        st.markdown(f"角 B = 90° - {angle_A:.2f}° = {angle_B:.2f}°")
+                        st.markdown('</div>', unsafe_allow_html=True)
+                        
+                        show_steps("rt2", sol)
+                        
+                        if fresh:
+                            add_to_history(sol.prob_type, sol.problem, sol.answer)
+            st.markdown('</div>', unsafe_allow_html=True)
+
+    # ========== 批次解題區 ==========
+    elif tab == "批次解題":
+        from math_core.batch import COLUMNS as BATCH_COLUMNS, load_problems, solve_batch
         
-        radius = st.number_input("半徑 r", value=5.0, min_value=0.0, key="circle_radius")
+        st.markdown("## 📦 批次解題")
+        st.markdown("上傳含「類型」與「參數」兩欄的 CSV 或 JSON 題目檔，一次解完整份考卷。")
         
-        col1, col2 = st.columns(2)
-        with col1:
-            if st.button("計算圓面積", key="btn_circle_area"):
-                area = math.pi * radius ** 2
-                st.markdown('<div class="success-box">', unsafe_allow_html=True)
-                st.markdown(f"**面積** = π × {radius}²")
-                st.markdown(f"**結果** = {area:.4f}")
-                st.markdown('</div>', unsafe_allow_html=True)
-                add_to_history("圓面積", f"半徑={radius}", f"{area:.4f}")
+        with st.expander("📝 題目檔格式"):
+            st.markdown("""
+        | 類型 | 參數範例 |
+        |---|---|
+        | 二次方程 | `1,-5,6`（a,b,c） |
+        | 一次方程 | `2,-8`（a,b） |
+        | 二元方程組 | `2,3,8,1,-1,1`（a₁,b₁,c₁,a₂,b₂,c₂） |
+        | 線性方程組 | `x + y + z = 6; y - z = 0; 2x + z = 4`（以分號分隔方程式） |
+        | 多項式方程 | `x^3 - 6x^2 + 11x - 6 = 0` |
+        | 因式分解 / 表達式展開 / 表達式化簡 | `x**2 - 4` |
+        | 三角形面積 | `底=10,高=5` |
+        | 長方形面積 | `長=8,寬=6` |
+        | 畢氏定理 / 解直角三角形 | `a=3,b=4`、`a=3,c=5` 或 `b=4,c=5` |
+        | 圓面積 / 圓周長 | `半徑=5` |
+        | 角度轉換 / 三角函數 | `30°` 或 `3.14弧度` |
         
+        JSON 格式: `[{"類型": "二次方程", "參數": [1, -5, 6]}, ...]`
+        """)
+        
+        uploaded = st.file_uploader("上傳題目檔", type=["csv", "json"], key="batch_file")
+        
+        if uploaded is not None and st.button("開始批次解題", key="btn_batch"):
+            try:
+                problems = load_problems(uploaded.getvalue(), uploaded.name)
+            except Exception as e:
+                st.error(f"錯誤: {e}")
+            else:
+                progress = st.progress(0.0, text="解題中...")
+                def report(done, total):
+                    progress.progress(done / total if total else 1.0, text=f"已完成 {done}/{total} 題")
+                get_session_memory().put(st.session_state.memory_id, "batch_results", RecordTable.from_rows(
+                    solve_batch(problems, on_progress=report), BATCH_COLUMNS, labels=["類型", "時間"]))
+        
+        batch_table = get_session_memory().get(st.session_state.memory_id, "batch_results")
+        if batch_table:
+            batch_df = batch_table.to_frame()
+            st.markdown(f"**共 {len(batch_df)} 題**，錯誤 {batch_df['解答'].str.startswith('錯誤').sum()} 題")
+            st.dataframe(batch_df, use_container_width=True, hide_index=True)
+            st.download_button(
+                label="📥 下載結果CSV檔案",
+                data=batch_df.to_csv(index=False).encode('utf-8'),
+                file_name=f"math_batch_{datetime.now().strftime('%Y%m%d_%H%M')}.csv",
+                mime="text/csv",
+                use_container_width=True
+            )
+        
+        st.markdown("---")
+        st.markdown("### ✅ 批改答案")
+        st.markdown("先在隨機數值點上比較，錯的答案立即排除；對的答案再做精確比較與符號化簡，並檢查形式（例如是否分解完全）。")
+        from math_core import answer_check
+        
+        col1, col2, col3 = st.columns([1, 2, 2])
+        with col1:
+            check_type = st.selectbox("題型", list(answer_check.EXPRESSION_TYPES) + list(answer_check.EQUATION_TYPES),
+                                      key="check_type")
         with col2:
-            if st.button("計算圓周長", key="btn_circle_circ"):
-                circumference = 2 * math.pi * radius
-                st.markdown('<div class="success-box">', unsafe_allow_html=True)
-                st.markdown(f"**周長** = 2π × {radius}")
-                st.markdown(f"**結果** = {circumference:.4f}")
-                st.markdown('</div>', unsafe_allow_html=True)
-                add_to_history("圓周長", f"半徑={radius}", f"{circumference:.4f}")
-        st.markdown('</div>', unsafe_allow_html=True)
+            check_param = st.text_input("題目（同題目檔的參數）", value="x**2 - 4", key="check_param")
+        with col3:
+            check_answer = st.text_input("學生答案", value="(x-2)(x+2)", key="check_answer")
+        
+        if st.button("批改", key="btn_check"):
+            result = answer_check.check(check_type, check_param, check_answer, compute=get_pool().run)
+            verdict = answer_check.VERDICT_TEXT[result.verdict]
+            message = f"{verdict}" + (f"：{result.message}" if result.message else "")
+            if result.verdict == "equivalent":
+                st.success(message)
+            elif result.verdict in ("probably", "wrong_form"):
+                st.warning(message)
+            else:
+                st.error(message)
+            st.caption("各階段耗時: " + "、".join(f"{answer_check.STAGE_TEXT[stage]} {seconds * 1000:.2f}ms"
+                                              for stage, seconds in result.timings.items()))
+        
+        submissions_file = st.file_uploader("上傳學生答案檔（欄位: 學生、類型、參數、答案）", type=["csv", "json"],
+                                            key="check_file")
+        if submissions_file is not None and st.button("開始批改", key="btn_check_batch"):
+            try:
+                submissions = answer_check.load_submissions(submissions_file.getvalue(), submissions_file.name)
+            except Exception as e:
+                st.error(f"錯誤: {e}")
+            else:
+                progress = st.progress(0.0, text="批改中...")
+                def report(done, total):
+                    progress.progress(done / total if total else 1.0, text=f"已批改 {done}/{total} 份")
+                get_session_memory().put(st.session_state.memory_id, "check_results", RecordTable.from_rows(
+                    answer_check.check_batch(submissions, compute=get_pool().run, on_progress=report),
+                    answer_check.COLUMNS, labels=["學生", "類型", "結果"], numbers=["毫秒"]))
+        
+        check_table = get_session_memory().get(st.session_state.memory_id, "check_results")
+        if check_table:
+            check_df = check_table.to_frame()
+            correct = (check_df["結果"] == answer_check.VERDICT_TEXT["equivalent"]).sum()
+            st.markdown(f"**共 {len(check_df)} 份**，正確 {correct} 份（{correct / len(check_df):.0%}），"
+                        f"平均每份 {check_df['毫秒'].mean():.2f}ms")
+            st.dataframe(check_df, use_container_width=True, hide_index=True)
+            st.download_button(
+                label="📥 下載批改結果CSV",
+                data=check_df.to_csv(index=False).encode('utf-8'),
+                file_name=f"math_check_{datetime.now().strftime('%Y%m%d_%H%M')}.csv",
+                mime="text/csv",
+                use_container_width=True
+            )
 
-# ========== 三角函數功能區 ==========
-elif tab == "三角函數":
-    st.markdown("## 📐 三角函數")
-    
-    trig_tab1, trig_tab2, trig_tab3 = st.tabs(["🔄 角度轉換", "📊 函數計算", "🔺 解直角三角形"])
-    
-    with trig_tab1:
-        st.markdown('<div class="feature-card">', unsafe_allow_html=True)
-        st.markdown("#### 角度單位轉換")
+    # ========== 練習題區 ==========
+    elif tab == "練習題":
+        from math_core.batch import COLUMNS as BATCH_COLUMNS
+        from math_core.practice import CATEGORIES, DIFFICULTIES, get_practice
+        
+        practice = get_practice()
+        st.markdown("## ✏️ 練習題")
+        st.markdown("依題型與難度自動出題，每題答案都經過解題程式驗證；題目在背景預先備好，整份練習卷立即產生。")
         
+        practice_categories = st.multiselect("題型", list(CATEGORIES), default=list(CATEGORIES),
+                                             key="practice_categories")
         col1, col2 = st.columns(2)
         with col1:
-            value = st.number_input("數值", value=180.0, key="angle_value")
-            from_unit = st.selectbox("從單位", ["度(°)", "弧度(rad)"], key="angle_from")
-        
+            practice_difficulty = st.select_slider("難度", options=list(DIFFICULTIES), value=1,
+                                                   format_func=DIFFICULTIES.get, key="practice_difficulty")
         with col2:
-            if st.button("執行轉換", key="btn_convert_angle"):
-                if "度" in from_unit:
-                    radians = math.radians(value)
-                    st.markdown('<div class="success-box">', unsafe_allow_html=True)
-                    st.markdown(f"**{value}°** = {radians:.6f} 弧度")
-                    st.markdown('</div>', unsafe_allow_html=True)
-                    add_to_history("角度轉換", f"{value}°", f"{radians:.6f}弧度")
-                else:
-                    degrees = math.degrees(value)
-                    st.markdown('<div class="success-box">', unsafe_allow_html=True)
-                    st.markdown(f"**{value} 弧度** = {degrees:.6f}°")
-                    st.markdown('</div>', unsafe_allow_html=True)
-                    add_to_history("角度轉換", f"{value}弧度", f"{degrees:.6f}°")
-        st.markdown('</div>', unsafe_allow_html=True)
-    
-    with trig_tab2:
-        st.markdown('<div class="feature-card">', unsafe_allow_html=True)
-        st.markdown("#### 三角函數值")
+            practice_count = st.number_input("題數", min_value=1, max_value=200, value=50, step=1, key="practice_count")
         
-        col1, col2 = st.columns(2)
-        with col1:
-            angle = st.number_input("角度值", value=45.0, key="trig_angle")
-            unit = st.selectbox("單位", ["度(°)", "弧度(rad)"], key="trig_unit")
+        if st.button("產生練習卷", key="btn_practice"):
+            try:
+                problems = practice.worksheet(practice_categories, practice_difficulty, int(practice_count))
+                get_session_memory().put(st.session_state.memory_id, "practice_sheet", RecordTable.from_rows(
+                    (p.as_row() for p in problems), BATCH_COLUMNS, labels=["類型", "時間"]))
+            except Exception as e:
+                st.error(f"錯誤: {e}")
         
-        with col2:
-            if st.button("計算函數值", key="btn_trig_values"):
-                if "度" in unit:
-                    angle_rad = math.radians(angle)
-                    angle_str = f"{angle}°"
-                else:
-                    angle_rad = angle
-                    angle_str = f"{angle}弧度"
-                
-                sin_val = math.sin(angle_rad)
-                cos_val = math.cos(angle_rad)
-                tan_val = math.tan(angle_rad) if abs(angle_rad % math.pi - math.pi/2) > 0.001 else "未定義"
-                
-                st.markdown('<div class="success-box">', unsafe_allow_html=True)
-                st.markdown(f"**角度:** {angle_str}")
-                st.markdown(f"**sin** = {sin_val:.6f}")
-                st.markdown(f"**cos** = {cos_val:.6f}")
-                st.markdown(f"**tan** = {tan_val if isinstance(tan_val, str) else f'{tan_val:.6f}'}")
-                st.markdown('</div>', unsafe_allow_html=True)
-                
-                add_to_history("三角函數", f"{angle_str}", f"sin={sin_val:.4f},cos={cos_val:.4f}")
-        st.markdown('</div>', unsafe_allow_html=True)
-    
-    with trig_tab3:
-        st.markdown('<div class="feature-card">', unsafe_allow_html=True)
-        st.markdown("#### 解直角三角形")
-        st.markdown("已知兩邊求第三邊和角度")
+        practice_table = get_session_memory().get(st.session_state.memory_id, "practice_sheet")
+        if practice_table:
+            sheet = practice_table.to_frame()
+            sheet.index = range(1, len(sheet) + 1)
+            show_answers = st.toggle("顯示答案", key="practice_answers")
+            st.dataframe(sheet if show_answers else sheet.drop(columns=["解答"]), use_container_width=True)
+            st.download_button(
+                label="📥 下載練習卷CSV（含答案，欄位同歷史記錄）",
+                data=sheet.to_csv(index=False).encode('utf-8'),
+                file_name=f"math_practice_{datetime.now().strftime('%Y%m%d_%H%M')}.csv",
+                mime="text/csv",
+                use_container_width=True
+            )
         
-        known_option = st.selectbox("已知條件",
-                                   ["已知兩直角邊(a,b)",
-                                    "已知直角邊(a)和斜邊(c)",
-                                    "已知直角邊(b)和斜邊(c)"])
+        pool_stats = practice.stats()
+        ready = sum(pool_stats["pools"].values())
+        st.caption(f"題目池: 已備妥 {ready}/{pool_stats['size'] * len(pool_stats['pools'])} 題，"
+                   f"累計直接取用 {pool_stats['served_from_pool']} 題、當場產生 {pool_stats['generated_on_demand']} 題")
+
+    # ========== 歷史記錄區 ==========
+    elif tab == "歷史記錄":
+        import pandas as pd
+        from math_core.history_store import COLUMNS as HISTORY_COLUMNS, category_counts
         
-        if "兩直角邊" in known_option:
-            col1, col2 = st.columns(2)
+        history_started = time.perf_counter()
+        
+        st.markdown("## 📜 解題歷史記錄")
+        
+        store = get_store()
+        history_id = st.session_state.history_id
+        st.caption(f"您的紀錄代碼: `{history_id}`（在其他裝置或重新開啟時輸入即可找回紀錄）")
+        with st.expander("🔑 載入其他紀錄代碼"):
+            code = st.text_input("紀錄代碼", key="history_code").strip()
+            if st.button("載入", key="btn_history_code") and code:
+                st.session_state.history_id = code
+                st.rerun()
+        
+        # 統計數字來自預先累計的各題型筆數，不必掃描整張表；紀錄版本沒變時連查詢都沿用上次的結果
+        version = (history_id, store.version(history_id))
+        type_counts = memo("history_counts", [], lambda: store.type_counts(history_id), deps=version)
+        total = sum(type_counts.values())
+        if not total:
+            st.info("還沒有解題記錄，快去解題吧！")
+        else:
+            # 統計資訊
+            algebra_count, geometry_count = category_counts(type_counts)
+            col1, col2, col3 = st.columns(3)
             with col1:
-                a = st.number_input("直角邊 a", value=3.0, min_value=0.0, key="rt_a")
+                st.metric("總記錄數", total)
             with col2:
-                b = st.number_input("直角邊 b", value=4.0, min_value=0.0, key="rt_b")
+                st.metric("代數問題", algebra_count)
+            with col3:
+                st.metric("幾何問題", geometry_count)
             
-            if st.button("解三角形", key="btn_solve_rt1"):
-                c = math.sqrt(a**2 + b**2)
-                angle_A = math.degrees(math.atan(a/b))
-                angle_B = 90 - angle_A
-                
-                st.markdown('<div class="success-box">', unsafe_allow_html=True)
-                st.markdown("**結果:**")
-                st.markdown(f"斜邊 c = √({a}² + {b}²) = {c:.4f}")
-                st.markdown(f"角 A = arctan({a}/{b}) = {angle_A:.2f}°")
-                st.markdown(f"角 B = 90° - {angle_A:.2f}° = {angle_B:.2f}°")
-                st.markdown('</div>', unsafe_allow_html=True)
-                
-                add_to_history("解直角三角形", f"a={a},b={b}", f"c={c:.2f},A={angle_A:.1f}°,B={angle_B:.1f}°")
-        
-        elif "直角邊(a)和斜邊" in known_option:
+            # 分頁顯示：每次只讀取一頁
             col1, col2 = st.columns(2)
             with col1:
-                a = st.number_input("直角邊 a", value=3.0, min_value=0.0, key="rt_a2")
+                type_filter = st.selectbox("題型", ["全部"] + list(type_counts), key="history_type")
+            prob_type = None if type_filter == "全部" else type_filter
+            pages = max(1, math.ceil(type_counts.get(prob_type, total) / HISTORY_PAGE_SIZE))
+            if st.session_state.get("history_page", 1) > pages:
+                # 換題型或清除後頁數變少時，回到最後一頁
+                st.session_state.history_page = pages
             with col2:
-                c = st.number_input("斜邊 c", value=5.0, min_value=0.0, key="rt_c2")
+                page = st.number_input(f"頁數（共 {pages} 頁）", min_value=1, max_value=pages, value=1,
+                                       step=1, key="history_page")
+            table = memo("history_page", ["history_type", "history_page"],
+                         lambda: pd.DataFrame(store.page(history_id, int(page), HISTORY_PAGE_SIZE, prob_type),
+                                              columns=HISTORY_COLUMNS), deps=version)
+            st.dataframe(table, use_container_width=True, hide_index=True)
             
-            if st.button("解三角形", key="btn_solve_rt2"):
-                if c <= a:
-                    st.error("斜邊必須大於直角邊！")
-                else:
-                    b = math.sqrt(c**2 - a**2)
-                    angle_A = math.degrees(math.asin(a/c))
-                    angle_B = 90 - angle_A
-                    
-                    st.markdown('<div class="success-box">', unsafe_allow_html=True)
-                    st.markdown("**結果:**")
-                    st.markdown(f"直角邊 b = √({c}² - {a}²) = {b:.4f}")
-                    st.markdown(f"角 A = arcsin({a}/{c}) = {angle_A:.2f}°")
-                    st.markdown(f"角 B = 90° - {angle_A:.2f}° = {angle_B:.2f}°")
-                    st.markdown('</div>', unsafe_allow_html=True)
-                    
-                    add_to_history("解直角三角形", f"a={a},c={c}", f"b={b:.2f},A={angle_A:.1f}°,B={angle_B:.1f}°")
-        st.markdown('</div>', unsafe_allow_html=True)
-
-# ========== 歷史記錄區 ==========
-elif tab == "歷史記錄":
-    st.markdown("## 📜 解題歷史記錄")
-    
-    if not st.session_state.history:
-        st.info("還沒有解題記錄，快去解題吧！")
-    else:
-        # 顯示為表格
-        df = pd.DataFrame(st.session_state.history)
-        st.dataframe(df, use_container_width=True, hide_index=True)
-        
-        # 統計資訊
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            st.metric("總記錄數", len(df))
-        with col2:
-            st.metric("代數問題", len(df[df["類型"].str.contains("方程|因式|表達式")]))
-        with col3:
-            st.metric("幾何問題", len(df[df["類型"].str.contains("面積|圓|畢氏")]))
-        
-        # 下載按鈕
-        csv = df.to_csv(index=False).encode('utf-8')
-        st.download_button(
-            label="📥 下載CSV檔案",
-            data=csv,
-            file_name=f"math_history_{datetime.now().strftime('%Y%m%d_%H%M')}.csv",
-            mime="text/csv",
-            use_container_width=True
-        )
+            # 匯出：按下按鈕才依篩選條件分批寫入暫存檔，平常的重新執行不讀取全部紀錄
+            with st.expander("📥 匯出紀錄"):
+                from math_core.history_export import FORMATS
+                
+                first, last = (datetime.fromtimestamp(t).date()
+                               for t in memo("history_range", [], lambda: store.time_range(history_id), deps=version))
+                col1, col2 = st.columns(2)
+                with col1:
+                    export_format = st.radio("檔案格式", list(FORMATS), horizontal=True, key="export_format")
+                    export_types = st.multiselect("題型（不選則全部）", list(type_counts), key="export_types")
+                with col2:
+                    date_range = st.date_input("日期範圍", value=(first, last), key="export_dates")
+                
+                if st.button("產生匯出檔", key="btn_history_export", use_container_width=True):
+                    export_history_file(history_id, export_format, export_types, date_range)
+            
+            # 清除按鈕
+            if st.button("🗑️ 清除所有記錄", use_container_width=True, type="secondary"):
+                store.clear(history_id)
+                st.rerun()
         
-        # 清除按鈕
-        if st.button("🗑️ 清除所有記錄", use_container_width=True, type="secondary"):
-            st.session_state.history = []
-            st.rerun()
+        metrics.observe("math_history_render_seconds", time.perf_counter() - history_started)
 
-# ========== 使用說明區 ==========
-elif tab == "使用說明":
-    st.markdown("## 📖 使用說明")
-    
-    with st.expander("🎯 快速入門", expanded=True):
-        st.markdown("""
+    # ========== 使用說明區 ==========
+    elif tab == "使用說明":
+        st.markdown("## 📖 使用說明")
+        
+        with st.expander("🎯 快速入門", expanded=True):
+            st.markdown("""
         1. **選擇功能類別**：在左側選單選擇代數、幾何或三角函數
         2. **輸入數值**：在對應的輸入框中輸入數字或表達式
         3. **點擊計算**：按下計算按鈕查看結果
-        4. **查看歷史**：所有計算會自動保存到歷史記錄
+        4. **查看步驟**：打開結果下方的「📝 查看詳細步驟」開關，逐步查看解題過程
+        5. **查看歷史**：所有計算會自動保存到歷史記錄
         """)
-    
-    with st.expander("🧮 代數功能"):
-        st.markdown("""
+        
+        with st.expander("🧮 代數功能"):
+            st.markdown("""
         ### 一元二次方程
         - 格式: `ax² + bx + c = 0`
         - 輸入三個係數即可求解
-        - 提供判別式分析和詳細步驟
+        - 提供判別式分析和詳細步驟（重根與複數根也有完整步驟）
         
         ### 一元一次方程
         - 格式: `ax + b = 0`
         - 當 a ≠ 0 時，解為 `x = -b/a`
         
+        ### 多項式方程
+        - 輸入方程式（`x^5 - x - 1 = 0`）或由最高次往下的係數（`1, 0, 0, 0, -1, -1`）
+        - 8 次以內且係數為有理數時先因式分解：一、二次因式給根式，其餘以 `CRootOf` 精確表示
+        - 更高次（最多 500 次）以伴隨矩陣的特徵值求根，經牛頓法修正並列出每個根的誤差上界
+        
         ### 因式分解
         - 支援多項式因式分解
-        - 例: `x**2 - 4` → `(x-2)*(x+2)`
+        - 例: `x^2 - 4` → `(x-2)*(x+2)`
+        - 次方可寫 `x^2`、`x**2` 或 `x²`，乘號可省略（`2x`、`3(x+1)`），根號可用 `√`
+        
+        ### 代入求值
+        - 輸入單變數表達式與一串 x 值（等距範圍或自訂數值），一次算出數值表並可下載 CSV
+        - 表達式只編譯一次成向量化的數值函數，數萬個點也能立即算完
         
         ### 表達式展開
         - 展開多項式乘積
-        - 例: `(x+1)**2` → `x**2 + 2x + 1`
+        - 例: `(x+1)^2` → `x**2 + 2x + 1`
         
         ### 二元一次方程組
         - 格式: `a₁x + b₁y = c₁`, `a₂x + b₂y = c₂`
-        - 輸入六個係數求解
+        - 輸入六個係數求解，行列式為 0 時會分辨無解或無限多解
+        
+        ### n 元一次方程組
+        - 每行一個方程式（`2x + 3y - z = 5`），或每行一列係數、最後一個數為常數項（`2 3 -1 | 5`）
+        - 依係數矩陣與增廣矩陣的秩判斷唯一解、無解或無限多解，無限多解時列出通解
+        - 小型題目以分數消去並列出列運算；大型題目（數百個未知數）以 numpy 求解
         """)
-    
-    with st.expander("📐 幾何功能"):
-        st.markdown("""
+        
+        with st.expander("📐 幾何功能"):
+            st.markdown("""
         ### 面積計算
         - 三角形面積: `½ × 底 × 高`
         - 長方形面積: `長 × 寬`
@@ -581,28 +1208,127 @@ elif tab == "使用說明":
         - 面積: `π × r²`
         - 周長: `2π × r`
         """)
-    
-    with st.expander("📐 三角函數"):
-        st.markdown("""
+        
+        with st.expander("📐 三角函數"):
+            st.markdown("""
         ### 角度轉換
         - 度(°) ↔ 弧度(rad) 互換
         
         ### 函數計算
         - 計算 sin, cos, tan 值
+        - 15° 的倍數（π/12 的倍數）直接顯示精確值，例如 sin 45° = √2/2
         - 支援度和弧度單位
         
         ### 解直角三角形
         - 已知兩邊求第三邊和角度
         - 自動計算所有未知量
         """)
-    
-    st.markdown("---")
-    st.markdown("**💡 提示:** 所有計算結果會自動保存，可在「歷史記錄」中查看和下載")
+        
+        with st.expander("📦 批次解題"):
+            st.markdown("""
+        ### 上傳題目檔
+        - 支援 CSV 與 JSON，欄位為「類型」與「參數」
+        - 題型名稱與歷史記錄相同，例如 `二次方程`、`因式分解`、`畢氏定理`
+        - 結果可下載為與歷史記錄相同欄位的 CSV 檔
+        
+        ### 批改答案
+        - 支援因式分解、表達式展開／化簡、一次／二次／多項式方程
+        - 答案檔欄位為「學生」「類型」「參數」「答案」；方程的根可寫成 `x=2,3`、`1±√2` 或小數近似
+        - 先代入隨機數值排除錯誤答案，再以精確比較或符號化簡確認；值正確但形式不對（例如沒有分解完全）會另外標示
+        """)
+        
+        with st.expander("✏️ 練習題"):
+            st.markdown("""
+        ### 自動出題
+        - 題型: 二次方程（整數根）、二元方程組（整數解）、因式分解、畢氏定理（畢氏三元數）、三角函數（特殊角）
+        - 難度分簡單、中等、困難；每題答案都由解題程式實際解過並核對
+        - 題目池在背景預先備好，練習卷可下載為與歷史記錄相同欄位的 CSV 檔
+        """)
+        
+        st.markdown("---")
+        st.markdown("**💡 提示:** 所有計算結果會自動保存，可在「歷史記錄」中查看和下載")
+
+    # ========== 系統監控區 ==========
+    elif tab == "系統監控":
+        import pandas as pd
+        
+        st.markdown("## 🩺 系統監控")
+        st.caption("各項操作的執行時間統計（本伺服器程序啟動以來）")
+        
+        admin = False
+        if ADMIN_TOKEN:
+            admin_token = st.text_input("管理權杖", type="password", key="admin_token")
+            admin = hmac.compare_digest(admin_token.encode("utf-8"), ADMIN_TOKEN.encode("utf-8"))
+        if not admin:
+            st.caption("🔒 唯讀檢視：重設統計、寫回快照與調整取樣分析器需要管理權杖（以環境變數 MATH_ADMIN_TOKEN 設定）")
+        
+        rows = metrics.snapshot()
+        if not rows:
+            st.info("還沒有任何統計資料")
+        else:
+            st.dataframe(pd.DataFrame(rows).round(3), use_container_width=True, hide_index=True)
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            st.json({"工作程序池": get_pool().stats(), "運算快取": result_cache.stats(),
+                     "session 暫存": get_session_memory().stats()})
+        with col2:
+            st.download_button(
+                label="📥 下載 Prometheus 格式",
+                data=metrics.prometheus_text(),
+                file_name="metrics.prom",
+                mime="text/plain",
+                use_container_width=True
+            )
+            if admin and st.button("🔄 重設統計", key="btn_metrics_reset", use_container_width=True):
+                metrics.reset()
+                st.rerun()
+        
+        st.markdown("### 🔥 啟動暖機")
+        warmup = get_warmup()
+        warmup_report = warmup.report()
+        if warmup_report["state"] != "done":
+            st.info("暖機進行中...")
+        else:
+            st.caption(f"共 {warmup_report['seconds']:.2f} 秒，暖機了 {warmup_report['pool_workers']} 個工作程序"
+                       + ("" if warmup_report["enabled"] else "（已由 MATH_WARMUP=0 關閉）"))
+        if warmup_report["steps"]:
+            st.dataframe(pd.DataFrame(list(warmup_report["steps"].items()), columns=["步驟", "秒"]).round(3),
+                         use_container_width=True, hide_index=True)
+        for name, error in warmup_report["errors"].items():
+            st.warning(f"{name}: {error}")
+        if warmup.snapshot_path:
+            snapshot = warmup_report["snapshot"]
+            st.caption(f"快取快照: {snapshot['path']}（啟動時載入 {snapshot['loaded']} 筆，最近寫回 {snapshot['saved']} 筆）")
+            if admin and st.button("💾 立即寫回快照", key="btn_snapshot_save"):
+                st.success(f"已寫回 {warmup.save_snapshot()} 筆（快取沒有變動時不會重寫）")
+        
+        st.markdown("### 🔬 取樣分析器")
+        profiler = metrics.profiler
+        if not admin:
+            st.caption(f"{'已開啟' if profiler.enabled else '未開啟'}，慢請求門檻 {profiler.threshold:g} 秒")
+        else:
+            # 分析器的設定由所有 session 共用：只在管理者改動元件時寫回，重新執行時不會用本 session 的舊值蓋掉
+            st.toggle("記錄慢請求的呼叫堆疊", value=profiler.enabled, key="profiler_enabled",
+                      on_change=lambda: setattr(profiler, "enabled", st.session_state.profiler_enabled))
+            st.number_input("慢請求門檻（秒）", min_value=0.01, value=profiler.threshold, step=0.1, key="profiler_threshold",
+                            on_change=lambda: setattr(profiler, "threshold", st.session_state.profiler_threshold))
+        # 呼叫堆疊含有伺服器上的檔名與程式碼位置，只給管理者看
+        for record in reversed(profiler.slow if admin else ()):
+            title = (f"{datetime.fromtimestamp(record['time']).strftime('%H:%M:%S')} "
+                     f"{record['label']} — {record['seconds']:.3f} 秒（{record['samples']} 次取樣）")
+            with st.expander(title):
+                st.code("\n".join(f"{n:5d}  {stack}" for stack, n in record["stacks"]), language="text")
 
-# ========== 頁腳 ==========
-st.markdown("---")
-st.caption("🎓 數學研究所專題 | 中學數學解題助手 | 網頁版 v3.0")
+    # ========== 頁腳 ==========
+    st.markdown("---")
+    st.caption("🎓 數學研究所專題 | 中學數學解題助手 | 網頁版 v3.0")
 
-# ========== 自動重啟提示 ==========
-if st.sidebar.checkbox("開啟自動重啟", value=False):
-    st.sidebar.warning("開發模式：程式碼修改後會自動重啟")
\ No newline at end of file
+    # ========== 自動重啟提示 ==========
+    if st.sidebar.checkbox("開啟自動重啟", value=False):
+        st.sidebar.warning("開發模式：程式碼修改後會自動重啟")
+finally:
+    # st.rerun()、st.stop() 以例外結束這次執行，同樣要記錄耗時並停止取樣，否則取樣會一直掛在重複使用的執行緒上
+    metrics.observe("math_rerun_seconds", time.perf_counter() - _rerun_started,
+                    tab=st.session_state.get("current_tab", ""))
+    metrics.profiler.stop(_rerun_profile)
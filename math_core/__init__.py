@@ -0,0 +1 @@
+# math_core - 數學助手的計算核心（不依賴 Streamlit）
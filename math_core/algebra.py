@@ -0,0 +1,28 @@
+# algebra.py - 表達式運算（因式分解／展開／化簡）
+import sympy as sp
+
+from math_core import polynomials, steps
+from math_core.parser import parse
+
+OPERATIONS = {
+    "factor": sp.factor,
+    "expand": sp.expand,
+    "simplify": sp.simplify,
+    # 解題步驟：與運算本身一樣可交給工作程序池執行、走共用快取
+    "factor_steps": steps.factor_steps,
+    "expand_steps": steps.expand_steps,
+    "simplify_steps": steps.simplify_steps,
+    # 多項式方程的精確根（sympy 因式分解可能很久，同樣交給工作程序池）
+    "poly_roots": polynomials.exact_roots,
+    # 批改答案的最後一步：simplify(學生答案 − 正確答案) 是否為 0
+    "is_zero": lambda expr: sp.simplify(expr) == 0,
+}
+
+
+def parse_expression(text):
+    """以 math_core.parser 解析學生寫法（x^2、2x、√2），不經過 sympify/eval。"""
+    return parse(text)
+
+
+def apply_operation(op, expr):
+    return OPERATIONS[op](expr)
@@ -0,0 +1,356 @@
+# answer_check.py - 批改學生答案：先以亂數代值快速排除錯誤，再做精確比較，最後才動用符號化簡
+#
+# 表達式題（因式分解／展開／化簡）: 在幾個隨機複數點上比較數值 → 兩邊都是有理函數時以 cancel 化成
+# 標準形比較（精確證明）→ 其餘交給工作程序池做 simplify(a − b)，超時視為「數值上正確」。
+# 相等之後再檢查形式：因式分解要分解完全、展開要沒有括號、化簡不能比解答更長。
+# 方程題（一次／二次／多項式方程）: 學生的每個根先和解答的根比數值，再逐一做有理數的精確比較或符號比較，
+# 最後確認沒有漏掉任何一個相異根。每道題的各階段耗時記在 CheckResult.timings 與 math_check_seconds。
+import cmath
+import contextlib
+import io
+import json
+import random
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Dict
+
+from math_core import solvers
+from math_core.batch import _params, _require
+from math_core.metrics import metrics
+from math_core.worker_pool import ComputationTooExpensive, PoolBusy
+
+# 數值比較的取樣點數與相對誤差
+SAMPLE_POINTS = 6
+TOLERANCE = 1e-9
+# 數值解（高次方程）沒有精確根，學生的小數答案只要在此相對誤差內就算相符
+NUMERIC_ROOT_TOLERANCE = 1e-4
+
+EXPRESSION_TYPES = {"因式分解": "factor", "表達式展開": "expand", "表達式化簡": "simplify"}
+EQUATION_TYPES = ("一次方程", "二次方程", "多項式方程")
+VERDICT_TEXT = {
+    "equivalent": "正確",
+    "probably": "數值上正確（未能以符號證明）",
+    "wrong_form": "值正確但形式不符",
+    "not_equivalent": "錯誤",
+    "invalid": "無法批改",
+}
+STAGE_TEXT = {"parse": "解析", "solve": "求解", "numeric": "數值比較", "canonical": "標準形",
+              "symbolic": "符號化簡", "form": "形式檢查"}
+_DECIMALS = re.compile(r"\d\.(\d+)")
+
+COLUMNS = ["學生", "類型", "問題", "學生答案", "結果", "說明", "毫秒"]
+
+
+@dataclass
+class CheckResult:
+    verdict: str                 # VERDICT_TEXT 的鍵
+    stage: str                   # 做出判定的階段: "parse"、"numeric"、"canonical"、"symbolic" 或 "form"
+    message: str = ""
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def seconds(self):
+        return sum(self.timings.values())
+
+    @property
+    def correct(self):
+        return self.verdict in ("equivalent", "probably")
+
+
+class _Timer:
+    # 依階段累計耗時，同時記錄到 metrics
+    def __init__(self):
+        self.timings = {}
+
+    @contextlib.contextmanager
+    def __call__(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            self.timings[stage] = self.timings.get(stage, 0.0) + seconds
+            metrics.observe("math_check_seconds", seconds, stage=stage)
+
+    def result(self, verdict, stage, message=""):
+        # 共用同一個 dict：在 with 區塊內回傳時，該階段的耗時離開區塊後才補上
+        return CheckResult(verdict, stage, message, self.timings)
+
+
+def _is_zero(expr, compute):
+    """符號化簡 expr 是否為 0；超時或工作程序池忙碌時回傳 None（無法判定）。"""
+    try:
+        return bool(compute("is_zero", expr))
+    except (ComputationTooExpensive, PoolBusy):
+        return None
+
+
+def _sample(symbols, seed, real=False):
+    # 單位圓附近的隨機複數點，避開實數定義域（log、sqrt 的負數）與常見的整數奇異點；
+    # real=True 時只取實數點（|x| 這類函數在複數點上與 x 的多項式不會相等）
+    rng = random.Random(seed)
+    for _ in range(SAMPLE_POINTS):
+        yield {s: complex(rng.uniform(0.3, 1.7), 0.0 if real else rng.uniform(0.3, 1.7)) * rng.choice((1, -1))
+               for s in symbols}
+
+
+def _numeric_differs(a, b, seed=0):
+    """在隨機點上 a、b 的值明顯不同時回傳 True；所有點都無法計算時回傳 None。"""
+    import sympy as sp
+
+    symbols = sorted(a.free_symbols | b.free_symbols, key=str)
+    try:
+        # cmath 沒有的函數（Abs 等）改用 mpmath；兩者都沒有（例如含 zoo）時無法以數值比較
+        fa = sp.lambdify(symbols, a, modules=["cmath", "mpmath"])
+        fb = sp.lambdify(symbols, b, modules=["cmath", "mpmath"])
+    except (KeyError, NameError, TypeError, SyntaxError):
+        return None
+    compared = False
+    for point in _sample(symbols, seed, real=a.has(sp.Abs) or b.has(sp.Abs)):
+        args = [point[s] for s in symbols]
+        try:
+            va, vb = complex(fa(*args)), complex(fb(*args))
+        except (ArithmeticError, ValueError, TypeError, NameError, AttributeError):
+            continue
+        if not (cmath.isfinite(va) and cmath.isfinite(vb)):
+            continue
+        compared = True
+        if abs(va - vb) > TOLERANCE * max(1.0, abs(va), abs(vb)):
+            return True
+    return False if compared else None
+
+
+def _factor_count(expr):
+    # 乘積中非常數因式的個數（重數算進去），例如 2(x-1)²(x+3) → 3
+    if expr.is_Mul:
+        return sum(_factor_count(arg) for arg in expr.args)
+    if expr.is_Pow and expr.exp.is_Integer and expr.exp > 0:
+        return int(expr.exp) * _factor_count(expr.base)
+    return 0 if expr.is_number else 1
+
+
+def _expression_form(op, student, expected):
+    import sympy as sp
+
+    if op == "factor" and _factor_count(student) < _factor_count(expected):
+        return f"還沒有分解完全，可以分解成 {expected}"
+    if op == "expand" and sp.expand(student) != student:
+        return "還沒有完全展開"
+    if op == "simplify" and sp.count_ops(student) > sp.count_ops(expected):
+        return f"還可以再化簡，例如 {expected}"
+    return None
+
+
+def check_expression(op, text, answer, compute):
+    """因式分解／展開／化簡：學生答案與題目等值，且形式符合題型。"""
+    import sympy as sp
+
+    from math_core.parser import parse
+
+    timer = _Timer()
+    with timer("parse"):
+        try:
+            student = parse(answer)
+        except ValueError as e:
+            return timer.result("invalid", "parse", f"無法解析學生答案: {e}")
+        if student.has(sp.nan, sp.zoo, sp.oo, -sp.oo):
+            return timer.result("invalid", "parse", "學生答案含有無定義的值（例如 0/0、1/0）")
+    with timer("solve"):
+        expected = solvers.symbolic(op, text, compute=compute).values["result"]
+        if expected.has(sp.nan, sp.zoo, sp.oo, -sp.oo):
+            return timer.result("invalid", "solve", "題目含有無定義的值（例如 0/0、1/0）")
+
+    with timer("numeric"):
+        differs = _numeric_differs(student, expected)
+    if differs:
+        return timer.result("not_equivalent", "numeric", "代入隨機數值後與正確答案不相等")
+
+    difference = student - expected
+    if difference.is_rational_function() and not difference.has(sp.Float):
+        with timer("canonical"):
+            equal = sp.cancel(sp.together(difference)) == 0
+        if not equal:
+            return timer.result("not_equivalent", "canonical", "化成標準形後與正確答案不相等")
+        verdict, stage = "equivalent", "canonical"
+    else:
+        with timer("symbolic"):
+            zero = _is_zero(difference, compute)
+        if zero:
+            verdict, stage = "equivalent", "symbolic"
+        elif differs is None:
+            return timer.result("invalid", "symbolic", "無法以數值或符號方式比較")
+        else:
+            verdict, stage = "probably", "symbolic"
+
+    with timer("form"):
+        problem = _expression_form(op, student, expected)
+    if problem:
+        return timer.result("wrong_form", "form", problem)
+    return timer.result(verdict, stage)
+
+
+def _student_roots(answer):
+    """「x=2,3」、「x = 2 或 x = -3」、「[2, 3]」、「1±√2」等寫法 → [(原文, sympy 數字, 容許誤差)]。
+
+    寫成小數的根視為近似值，容許誤差為最後一位的一個單位，例如 1.414 可與 √2 相差 0.001。
+    """
+    import sympy as sp
+
+    from math_core.parser import parse
+
+    text = answer
+    for old in ("或", ";", "；", "，", "and"):
+        text = text.replace(old, ",")
+    for old in "[]{}":
+        text = text.replace(old, "")
+    roots = []
+    for piece in text.split(","):
+        piece = piece.split("=")[-1].strip()
+        if not piece:
+            continue
+        digits = [len(d) for d in _DECIMALS.findall(piece)]
+        tolerance = 10.0 ** -min(digits) if digits else None
+        variants = [piece.replace("±", "+"), piece.replace("±", "-")] if "±" in piece else [piece]
+        for variant in variants:
+            value = parse(variant).subs(sp.Symbol("i"), sp.I)
+            if value.free_symbols:
+                raise ValueError(f"根必須是數字: {variant}")
+            if value.has(sp.nan, sp.zoo, sp.oo, -sp.oo):
+                raise ValueError(f"根必須是有限的數: {variant}")
+            roots.append((variant, value, tolerance))
+    if not roots:
+        raise ValueError("沒有找到任何根")
+    return roots
+
+
+def _equation_coefficients(prob_type, param):
+    from math_core import polynomials
+
+    if prob_type == "多項式方程":
+        return polynomials.parse_polynomial(str(param))[0]
+    names = ("a", "b") if prob_type == "一次方程" else ("a", "b", "c")
+    return _require(_params(param, names), *names)
+
+
+def check_equation(prob_type, param, answer, compute):
+    """方程題：學生列出的每個根都要是方程式的根，且相異根一個都不能少。"""
+    import sympy as sp
+
+    timer = _Timer()
+    with timer("parse"):
+        try:
+            student = _student_roots(str(answer))
+        except ValueError as e:
+            return timer.result("invalid", "parse", f"無法解析學生答案: {e}")
+    with timer("solve"):
+        expected = solvers.polynomial(_equation_coefficients(prob_type, param), compute=compute)
+    roots = expected.values["roots"]
+    exact = expected.values["exact"]
+    tolerance = TOLERANCE if exact else NUMERIC_ROOT_TOLERANCE
+
+    with timer("numeric"):
+        matches = []
+        for text, value, approximate in student:
+            z = complex(sp.N(value, 20))
+            if not cmath.isfinite(z):
+                # 例如 tan(π/2) 化簡後不一定帶有 zoo，數值才看得出來
+                return timer.result("invalid", "numeric", f"根必須是有限的數: {text}")
+            distances = [abs(z - r) for r in roots]
+            nearest = min(range(len(roots)), key=distances.__getitem__)
+            limit = max(tolerance * max(1.0, abs(roots[nearest])), approximate or 0.0)
+            if distances[nearest] > limit:
+                return timer.result("not_equivalent", "numeric", f"{text} 不是方程式的根")
+            matches.append(nearest)
+    missing = len(roots) - len(set(matches))
+    if missing:
+        return timer.result("not_equivalent", "numeric", f"少了 {missing} 個根")
+    if not exact:
+        return timer.result("probably", "numeric", f"與數值解相符（相對誤差 < {NUMERIC_ROOT_TOLERANCE:g}）")
+    if any(approximate for _, _, approximate in student):
+        return timer.result("probably", "numeric", "以小數近似，與精確根的差距在最後一位以內")
+
+    stage = "canonical"
+    with timer("canonical"):
+        pending = []
+        for (text, value, _), i in zip(student, matches):
+            if value.is_Rational and exact[i].is_Rational:
+                if value != exact[i]:
+                    return timer.result("not_equivalent", "canonical", f"{text} 不是方程式的根")
+            else:
+                pending.append((value, exact[i]))
+    if pending:
+        stage = "symbolic"
+        with timer("symbolic"):
+            proven = [_is_zero(value - root, compute) for value, root in pending]
+        if not all(proven):
+            return timer.result("probably", "symbolic")
+    return timer.result("equivalent", stage)
+
+
+def check(prob_type, param, answer, compute=None):
+    """批改一題；compute(op, expr) 可換成工作程序池的 run（符號運算可能很久）。"""
+    from math_core.algebra import apply_operation
+
+    compute = compute or apply_operation
+    try:
+        if prob_type in EXPRESSION_TYPES:
+            return check_expression(EXPRESSION_TYPES[prob_type], str(param).strip(), str(answer), compute)
+        if prob_type in EQUATION_TYPES:
+            return check_equation(prob_type, param, answer, compute)
+        raise ValueError(f"不支援批改的題型: {prob_type}")
+    except ComputationTooExpensive as e:
+        return CheckResult("invalid", "solve", str(e))
+    except (PoolBusy, ValueError) as e:
+        return CheckResult("invalid", "solve", f"錯誤: {e}")
+    except Exception as e:
+        # sympy 或數值計算的其他例外：只算這一份答案無法批改，不能讓整批批改或頁面中斷
+        return CheckResult("invalid", "solve", f"無法批改: {type(e).__name__}: {e}")
+
+
+def load_submissions(data, filename):
+    """讀取學生答案檔，回傳 [(學生, 類型, 參數, 學生答案), ...]；欄位為「類型」「參數」「答案」，「學生」可省略。"""
+    if filename.lower().endswith(".json"):
+        rows = json.loads(data.decode("utf-8-sig"))
+        if isinstance(rows, dict):
+            rows = rows.get("submissions", [])
+    else:
+        import pandas as pd
+        rows = pd.read_csv(io.BytesIO(data), dtype=str, keep_default_na=False).to_dict("records")
+    submissions = []
+    for row in rows:
+        if not isinstance(row, dict) or "類型" not in row or "答案" not in row:
+            raise ValueError("答案檔缺少「類型」或「答案」欄位")
+        param = row.get("參數", row.get("問題"))
+        if param is None:
+            raise ValueError("答案檔缺少「參數」欄位")
+        submissions.append((str(row.get("學生", "")), str(row["類型"]).strip(), param, str(row["答案"])))
+    return submissions
+
+
+def _row(student, prob_type, param, answer, result):
+    problem = ",".join(str(v) for v in param) if isinstance(param, (list, tuple)) else str(param)
+    return dict(zip(COLUMNS, (student, prob_type, problem, answer, VERDICT_TEXT[result.verdict],
+                              result.message, round(result.seconds * 1000, 2))))
+
+
+def check_batch(submissions, compute=None, workers=None, on_progress=None):
+    """依原順序回傳每份答案的批改結果；相同的 (類型, 參數, 答案) 只批改一次。"""
+    unique = {}
+    for i, (_, prob_type, param, answer) in enumerate(submissions):
+        key = (prob_type, str(param).strip(), str(answer).strip())
+        unique.setdefault(key, []).append(i)
+    results = [None] * len(submissions)
+    done = 0
+    with ThreadPoolExecutor(max_workers=workers or 4) as executor:
+        futures = {executor.submit(check, *key, compute=compute): indexes for key, indexes in unique.items()}
+        for future in as_completed(futures):
+            result = future.result()
+            for i in futures[future]:
+                student, prob_type, param, answer = submissions[i]
+                results[i] = _row(student, prob_type, param, answer, result)
+            done += len(futures[future])
+            if on_progress is not None:
+                on_progress(done, len(submissions))
+    return results
@@ -0,0 +1,183 @@
+# batch.py - 批次解題：讀入 CSV/JSON 題目檔，輸出與歷史記錄 CSV 相同欄位的結果
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+from math_core import solvers
+from math_core.worker_pool import ComputationTooExpensive, get_pool
+
+COLUMNS = ["類型", "問題", "解答", "時間"]
+
+
+def _params(text, names):
+    # "1,-5,6" 或 "a=3,c=5" 兩種寫法皆可，回傳 {名稱: float}
+    if isinstance(text, (list, tuple)):
+        items = [str(v) for v in text]
+    else:
+        items = [item for item in str(text).replace("，", ",").split(",") if item.strip()]
+    values = {}
+    for pos, item in enumerate(items):
+        if "=" in item:
+            name, value = item.split("=", 1)
+            values[name.strip()] = float(value)
+        elif pos < len(names):
+            values[names[pos]] = float(item)
+        else:
+            raise ValueError(f"參數過多: {text}")
+    return values
+
+
+def _require(values, *names):
+    missing = [n for n in names if n not in values]
+    if missing:
+        raise ValueError(f"缺少參數: {', '.join(missing)}")
+    return [values[n] for n in names]
+
+
+def _angle(text):
+    # "180°"、"3.14弧度"、"3.14rad" 或純數字（預設為度）
+    text = str(text).strip()
+    for suffix in ("弧度", "rad"):
+        if text.endswith(suffix):
+            return float(text[:-len(suffix)]), False
+    return float(text.rstrip("°度")), True
+
+
+# ========== 各題型：把「參數」欄解析成 solvers 的引數 ==========
+def _symbolic(op):
+    def solve(param):
+        return solvers.symbolic(op, str(param).strip(), compute=get_pool().run)
+    return solve
+
+
+def _fixed(func, names):
+    # 固定參數的題型，例如二次方程的 a,b,c
+    def solve(param):
+        return func(*_require(_params(param, names), *names))
+    return solve
+
+
+def _sides(func):
+    # 畢氏定理與解直角三角形：a,b 預設依序填入，也可寫 a=3,c=5
+    def solve(param):
+        values = _params(param, "ab")
+        unknown = set(values) - {"a", "b", "c"}
+        if unknown:
+            raise ValueError(f"未知參數: {', '.join(sorted(unknown))}")
+        return func(**values)
+    return solve
+
+
+def _linear_system(param):
+    # 方程式以分號或換行分隔，例如 "x + y = 3; x - y = 1"
+    from math_core import linear_systems
+
+    matrix, constants, names = linear_systems.parse_equations(str(param).replace(";", "\n"))
+    return solvers.linear_system(matrix, constants, names)
+
+
+def _polynomial(param):
+    from math_core import polynomials
+
+    coefficients, variable = polynomials.parse_polynomial(str(param))
+    return solvers.polynomial(coefficients, variable, compute=get_pool().run)
+
+
+def _angle_solver(func):
+    def solve(param):
+        return func(*_angle(param))
+    return solve
+
+
+SOLVERS = {
+    "二次方程": _fixed(solvers.quadratic, ("a", "b", "c")),
+    "一次方程": _fixed(solvers.linear, ("a", "b")),
+    "二元方程組": _fixed(solvers.system_2x2, ("a1", "b1", "c1", "a2", "b2", "c2")),
+    "線性方程組": _linear_system,
+    "多項式方程": _polynomial,
+    "因式分解": _symbolic("factor"),
+    "表達式展開": _symbolic("expand"),
+    "表達式化簡": _symbolic("simplify"),
+    "三角形面積": _fixed(solvers.triangle_area, ("底", "高")),
+    "長方形面積": _fixed(solvers.rect_area, ("長", "寬")),
+    "畢氏定理": _sides(solvers.pythagoras),
+    "圓面積": _fixed(solvers.circle_area, ("半徑",)),
+    "圓周長": _fixed(solvers.circle_circumference, ("半徑",)),
+    "角度轉換": _angle_solver(solvers.convert_angle),
+    "三角函數": _angle_solver(solvers.trig_values),
+    "解直角三角形": _sides(solvers.right_triangle),
+}
+
+# 需要 sympy 的題型送到工作程序池平行計算，其餘在本程序直接算
+HEAVY_TYPES = {"因式分解", "表達式展開", "表達式化簡", "多項式方程"}
+
+
+def load_problems(data, filename):
+    """讀取題目檔，回傳 [(類型, 參數), ...]；欄位為「類型」與「參數」（或「問題」）。"""
+    if filename.lower().endswith(".json"):
+        rows = json.loads(data.decode("utf-8-sig"))
+        if isinstance(rows, dict):
+            rows = rows.get("problems", [])
+    else:
+        import pandas as pd
+        rows = pd.read_csv(io.BytesIO(data), dtype=str, keep_default_na=False).to_dict("records")
+    problems = []
+    for row in rows:
+        if not isinstance(row, dict) or "類型" not in row:
+            raise ValueError("題目檔缺少「類型」欄位")
+        param = row.get("參數", row.get("問題"))
+        if param is None:
+            raise ValueError("題目檔缺少「參數」欄位")
+        problems.append((str(row["類型"]).strip(), param))
+    return problems
+
+
+def solve_one(prob_type, param):
+    """解一題並回傳一筆歷史記錄格式的 dict；錯誤寫進「解答」欄而不中斷整批。"""
+    problem = ",".join(str(v) for v in param) if isinstance(param, (list, tuple)) else str(param)
+    try:
+        solver = SOLVERS.get(prob_type)
+        if solver is None:
+            raise ValueError(f"不支援的題型: {prob_type}")
+        solution = solver(param)
+        problem, answer = solution.problem, solution.answer
+    except ComputationTooExpensive as e:
+        answer = str(e)
+    except Exception as e:
+        answer = f"錯誤: {e}"
+    return {"類型": prob_type, "問題": problem, "解答": answer,
+            "時間": datetime.now().strftime("%H:%M:%S")}
+
+
+def solve_batch(problems, on_progress=None, workers=None):
+    """依原順序回傳每題的記錄；on_progress(完成數, 總數) 在呼叫端執行緒中回報進度。"""
+    total = len(problems)
+    results = [None] * total
+    done = 0
+    # 相同的 sympy 題目只算一次
+    heavy = {}
+    for i, (prob_type, param) in enumerate(problems):
+        if prob_type in HEAVY_TYPES:
+            key = (prob_type, str(param).strip())
+            heavy.setdefault(key, []).append(i)
+        else:
+            results[i] = solve_one(prob_type, param)
+            done += 1
+            if on_progress is not None and done % 500 == 0:
+                on_progress(done, total)
+    if on_progress is not None:
+        on_progress(done, total)
+
+    if heavy:
+        workers = workers or get_pool().max_workers
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(solve_one, *key): indexes for key, indexes in heavy.items()}
+            for future in as_completed(futures):
+                record = future.result()
+                for i in futures[future]:
+                    results[i] = dict(record)
+                done += len(futures[future])
+                if on_progress is not None:
+                    on_progress(done, total)
+    return results
@@ -0,0 +1,166 @@
+# closed_form.py - 一次、二次方程與二元一次方程組的公式解（精確分數／根式）
+import math
+from fractions import Fraction
+
+# 抽取平方因數時試除的上限；超過仍然正確，只是根號內可能沒有完全化簡
+_SQUARE_TRIAL_LIMIT = 1000
+
+
+def to_fraction(value):
+    """把輸入框的數值轉成分數；浮點數以最短十進位表示轉換（0.1 → 1/10）。"""
+    if isinstance(value, Fraction):
+        return value
+    if isinstance(value, float):
+        return Fraction(repr(value))
+    return Fraction(value)
+
+
+def _split_square(n):
+    # n = k² · m，回傳 (k, m)
+    root = math.isqrt(n)
+    if root * root == n:
+        return root, 1
+    k = 1
+    i = 2
+    while i <= _SQUARE_TRIAL_LIMIT and i * i <= n:
+        while n % (i * i) == 0:
+            n //= i * i
+            k *= i
+        i += 1
+    root = math.isqrt(n)
+    if root * root == n:
+        return k * root, 1
+    return k, n
+
+
+class Root:
+    """形如 real ± coef·√radicand（imaginary 時再乘 i）的精確根。"""
+
+    __slots__ = ("real", "coef", "radicand", "imaginary")
+
+    def __init__(self, real, coef=Fraction(0), radicand=1, imaginary=False):
+        self.real = real
+        self.coef = coef
+        self.radicand = radicand
+        self.imaginary = imaginary
+
+    def __eq__(self, other):
+        return isinstance(other, Root) and (
+            (self.real, self.coef, self.radicand, self.imaginary)
+            == (other.real, other.coef, other.radicand, other.imaginary))
+
+    def __hash__(self):
+        return hash((self.real, self.coef, self.radicand, self.imaginary))
+
+    def __repr__(self):
+        return f"Root({self})"
+
+    def is_rational(self):
+        return self.coef == 0 or (self.radicand == 1 and not self.imaginary)
+
+    def value(self):
+        surd = float(self.coef) * math.sqrt(self.radicand)
+        if self.imaginary:
+            return complex(float(self.real), surd)
+        return float(self.real) + surd
+
+    def __str__(self):
+        if self.coef == 0:
+            return str(self.real)
+        if self.radicand == 1 and not self.imaginary:
+            return str(self.real + self.coef)
+        # 輸出格式比照 sympy，例如 5/2 - sqrt(3)*I/2
+        num, den = abs(self.coef.numerator), self.coef.denominator
+        factors = []
+        if num != 1:
+            factors.append(str(num))
+        if self.radicand != 1:
+            factors.append(f"sqrt({self.radicand})")
+        if self.imaginary:
+            factors.append("I")
+        term = "*".join(factors)
+        if den != 1:
+            term += f"/{den}"
+        sign = "-" if self.coef < 0 else "+"
+        if self.real == 0:
+            return term if sign == "+" else f"-{term}"
+        return f"{self.real} {sign} {term}"
+
+
+def format_roots(roots):
+    return "[" + ", ".join(str(r) for r in roots) + "]"
+
+
+def format_approx(roots):
+    """無理根或複數根的小數近似值；全部是有理根時回傳空字串。"""
+    if all(isinstance(r, Root) and r.is_rational() for r in roots):
+        return ""
+    parts = []
+    for r in roots:
+        v = complex(r.value() if isinstance(r, Root) else r)
+        if v.imag == 0:
+            parts.append(f"{v.real:.6f}")
+        else:
+            parts.append(f"{v.real:.6f} {'-' if v.imag < 0 else '+'} {abs(v.imag):.6f}i")
+    return ", ".join(parts)
+
+
+def solve_linear(a, b):
+    """ax + b = 0；a 為 0 時回傳 None。"""
+    a, b = to_fraction(a), to_fraction(b)
+    if a == 0:
+        return None
+    return -b / a
+
+
+def _sympy_quadratic(a, b, c):
+    import sympy as sp
+    x = sp.symbols('x')
+    return sp.solve(a*x**2 + b*x + c, x)
+
+
+def solve_quadratic(a, b, c):
+    """ax² + bx + c = 0 的根：實根由小到大，共軛複根虛部先負後正（sp.solve 不保證這個順序）。
+
+    重根只回傳一個；係數不是有限實數時才退回 sympy。
+    """
+    if not all(math.isfinite(v) for v in (a, b, c)):
+        return _sympy_quadratic(a, b, c)
+    a, b, c = to_fraction(a), to_fraction(b), to_fraction(c)
+    if a == 0:
+        x = solve_linear(b, c)
+        return [] if x is None else [Root(x)]
+
+    real = -b / (2*a)
+    D = b*b - 4*a*c
+    if D == 0:
+        return [Root(real)]
+    # √(n/d) = √(n·d)/d
+    n, d = abs(D.numerator), D.denominator
+    k, m = _split_square(n * d)
+    coef = Fraction(k, d) / abs(2*a)
+    if m == 1 and D > 0:
+        return [Root(real - coef), Root(real + coef)]
+    return [Root(real, -coef, m, D < 0), Root(real, coef, m, D < 0)]
+
+
+def solve_system_2x2(a1, b1, c1, a2, b2, c2):
+    """克拉瑪公式解 a₁x + b₁y = c₁, a₂x + b₂y = c₂；行列式為 0（無解或無限多解）時回傳 None。"""
+    a1, b1, c1, a2, b2, c2 = (to_fraction(v) for v in (a1, b1, c1, a2, b2, c2))
+    det = a1*b2 - a2*b1
+    if det == 0:
+        return None
+    return (c1*b2 - c2*b1) / det, (a1*c2 - a2*c1) / det
+
+
+def singular_system_status(a1, b1, c1, a2, b2, c2):
+    """行列式為 0 的二元方程組是 "none"（無解）還是 "infinite"（無限多解）。
+
+    兩列（含常數項）成比例、且沒有「0 = 非零」的列時無限多解，也就是增廣矩陣的秩等於係數矩陣的秩。
+    """
+    a1, b1, c1, a2, b2, c2 = (to_fraction(v) for v in (a1, b1, c1, a2, b2, c2))
+    if (a1 == b1 == 0 and c1 != 0) or (a2 == b2 == 0 and c2 != 0):
+        return "none"
+    if a1*c2 - a2*c1 == 0 and b1*c2 - b2*c1 == 0:
+        return "infinite"
+    return "none"
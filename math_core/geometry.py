@@ -0,0 +1,36 @@
+# geometry.py - 面積、畢氏定理與圓的公式（可輸入純量或陣列）
+import numpy as np
+
+
+def _out(x):
+    # 純量輸入回傳 Python float，陣列輸入回傳 ndarray
+    x = np.asarray(x, dtype=float)
+    return x.item() if x.ndim == 0 else x
+
+
+def triangle_area(base, height):
+    return _out(0.5 * np.asarray(base, dtype=float) * np.asarray(height, dtype=float))
+
+
+def rect_area(length, width):
+    return _out(np.asarray(length, dtype=float) * np.asarray(width, dtype=float))
+
+
+def circle_area(radius):
+    return _out(np.pi * np.asarray(radius, dtype=float) ** 2)
+
+
+def circle_circumference(radius):
+    return _out(2 * np.pi * np.asarray(radius, dtype=float))
+
+
+def hypotenuse(a, b):
+    return _out(np.hypot(np.asarray(a, dtype=float), np.asarray(b, dtype=float)))
+
+
+def leg(c, other):
+    """已知斜邊與一股求另一股；斜邊不大於直角邊的位置為 nan。"""
+    c = np.asarray(c, dtype=float)
+    other = np.asarray(other, dtype=float)
+    with np.errstate(invalid="ignore"):
+        return _out(np.where(c > other, np.sqrt(c**2 - other**2), np.nan))
@@ -0,0 +1,77 @@
+# history_export.py - 分批把解題紀錄寫成 CSV 或 Parquet
+#
+# 資料由 HistoryStore.iter_rows 一批一批讀出、一批一批寫入檔案，
+# 不會先組成整份 DataFrame 或整份 bytes。Parquet 需要 pyarrow（Streamlit 已依賴它）。
+import csv
+import io
+from datetime import datetime
+
+from math_core.history_store import COLUMNS, TIME_FORMAT
+
+FORMATS = {
+    "CSV": ("csv", "text/csv"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+
+
+def csv_chunks(batches):
+    """把每一批紀錄轉成一段 UTF-8 的 CSV bytes，第一段含欄位名稱。"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(COLUMNS)
+    for rows in batches:
+        writer.writerows((t, p, a, datetime.fromtimestamp(created).strftime(TIME_FORMAT))
+                         for t, p, a, created in rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # 沒有任何紀錄時仍輸出欄位名稱
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _counting(batches, on_batch):
+    for rows in batches:
+        on_batch(len(rows))
+        yield rows
+
+
+def write_parquet(batches, fileobj):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    # 類型重複度高，以字典編碼；時間存成 timestamp 而非字串
+    schema = pa.schema([
+        (COLUMNS[0], pa.dictionary(pa.int32(), pa.string())),
+        (COLUMNS[1], pa.string()),
+        (COLUMNS[2], pa.string()),
+        (COLUMNS[3], pa.timestamp("s")),
+    ])
+    with pq.ParquetWriter(fileobj, schema, compression="zstd") as writer:
+        for rows in batches:
+            types, problems, answers, created = zip(*rows)
+            writer.write_table(pa.table([
+                pa.array(types).dictionary_encode(),
+                pa.array(problems, pa.string()),
+                pa.array(answers, pa.string()),
+                pa.array([datetime.fromtimestamp(t) for t in created], pa.timestamp("s")),
+            ], schema=schema))
+
+
+def export_history(store, owner, fmt, fileobj, **filters):
+    """依 fmt（"CSV" 或 "Parquet"）把符合篩選條件的紀錄寫進 fileobj，回傳寫出的筆數。"""
+    if fmt not in FORMATS:
+        raise ValueError(f"不支援的匯出格式: {fmt}")
+    count = 0
+
+    def add(n):
+        nonlocal count
+        count += n
+
+    batches = _counting(store.iter_rows(owner, **filters), add)
+    if fmt == "CSV":
+        for chunk in csv_chunks(batches):
+            fileobj.write(chunk)
+    else:
+        write_parquet(batches, fileobj)
+    return count
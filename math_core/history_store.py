@@ -0,0 +1,185 @@
+# history_store.py - 以 SQLite 保存解題紀錄（取代記憶體中的 session 清單）
+#
+# 每個瀏覽器 session 有一組紀錄代碼（owner），紀錄寫入磁碟，重新整理或換 session
+# 後輸入代碼即可載入。各題型的筆數由 trigger 維護在 history_counts，統計不必掃整張表；
+# history_versions 在每次新增或刪除時遞增，畫面可依版本號判斷查詢結果是否仍有效。
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+DEFAULT_PATH = os.environ.get("MATH_HISTORY_DB", "math_history.sqlite3")
+COLUMNS = ["類型", "問題", "解答", "時間"]
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# 歷史記錄頁的「代數問題」「幾何問題」分類，與原本 str.contains 的規則相同
+ALGEBRA_PATTERN = re.compile("方程|因式|表達式")
+GEOMETRY_PATTERN = re.compile("面積|圓|畢氏")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY,
+    owner TEXT NOT NULL,
+    type TEXT NOT NULL,
+    problem TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_history_owner_created ON history(owner, created);
+CREATE INDEX IF NOT EXISTS idx_history_owner_type ON history(owner, type, created);
+
+CREATE TABLE IF NOT EXISTS history_counts (
+    owner TEXT NOT NULL,
+    type TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    PRIMARY KEY (owner, type)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS trg_history_insert AFTER INSERT ON history BEGIN
+    INSERT INTO history_counts (owner, type, n) VALUES (NEW.owner, NEW.type, 1)
+    ON CONFLICT (owner, type) DO UPDATE SET n = n + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_history_delete AFTER DELETE ON history BEGIN
+    UPDATE history_counts SET n = n - 1 WHERE owner = OLD.owner AND type = OLD.type;
+END;
+
+CREATE TABLE IF NOT EXISTS history_versions (
+    owner TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS trg_history_version_insert AFTER INSERT ON history BEGIN
+    INSERT INTO history_versions (owner, version) VALUES (NEW.owner, 1)
+    ON CONFLICT (owner) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_history_version_delete AFTER DELETE ON history BEGIN
+    INSERT INTO history_versions (owner, version) VALUES (OLD.owner, 1)
+    ON CONFLICT (owner) DO UPDATE SET version = version + 1;
+END;
+"""
+
+
+def _record(row):
+    prob_type, problem, answer, created = row
+    return {"類型": prob_type, "問題": problem, "解答": answer,
+            "時間": datetime.fromtimestamp(created).strftime(TIME_FORMAT)}
+
+
+class HistoryStore:
+    """執行緒安全的紀錄庫；每個執行緒各自持有一條 SQLite 連線。"""
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._connect().executescript(_SCHEMA)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def add(self, owner, prob_type, problem, answer, created=None):
+        conn = self._connect()
+        with conn:
+            conn.execute("INSERT INTO history (owner, type, problem, answer, created) VALUES (?, ?, ?, ?, ?)",
+                         (owner, prob_type, problem, answer, time.time() if created is None else created))
+
+    def add_many(self, owner, records):
+        """records 為 (類型, 問題, 解答, 建立時間) 的序列，一次交易寫入。"""
+        conn = self._connect()
+        with conn:
+            conn.executemany("INSERT INTO history (owner, type, problem, answer, created) VALUES (?, ?, ?, ?, ?)",
+                             ((owner, *record) for record in records))
+
+    def type_counts(self, owner):
+        rows = self._connect().execute(
+            "SELECT type, n FROM history_counts WHERE owner = ? AND n > 0 ORDER BY type", (owner,))
+        return dict(rows.fetchall())
+
+    def count(self, owner, prob_type=None):
+        counts = self.type_counts(owner)
+        return counts.get(prob_type, 0) if prob_type else sum(counts.values())
+
+    def page(self, owner, page=1, page_size=50, prob_type=None):
+        """由新到舊的第 page 頁（從 1 開始），只讀取該頁的資料列。"""
+        sql = "SELECT type, problem, answer, created FROM history WHERE owner = ?"
+        params = [owner]
+        if prob_type:
+            sql += " AND type = ?"
+            params.append(prob_type)
+        sql += " ORDER BY created DESC, id DESC LIMIT ? OFFSET ?"
+        params += [page_size, (page - 1) * page_size]
+        return [_record(row) for row in self._connect().execute(sql, params)]
+
+    def version(self, owner):
+        """紀錄的版本號，新增或刪除後就會改變（從未寫入時為 0）。"""
+        row = self._connect().execute(
+            "SELECT version FROM history_versions WHERE owner = ?", (owner,)).fetchone()
+        return row[0] if row else 0
+
+    def time_range(self, owner):
+        """最早與最晚一筆紀錄的建立時間（沒有紀錄時為 (None, None)）。"""
+        # MIN 與 MAX 分開寫成子查詢，各自只讀索引的一端；寫在同一個 SELECT 會掃過該使用者的所有索引項
+        return self._connect().execute(
+            "SELECT (SELECT MIN(created) FROM history WHERE owner = ?),"
+            " (SELECT MAX(created) FROM history WHERE owner = ?)", (owner, owner)).fetchone()
+
+    def iter_rows(self, owner, prob_types=None, start=None, end=None, batch_size=5000):
+        """依時間先後分批產生 (類型, 問題, 解答, 建立時間)；篩選在 SQL 中完成，end 不含。"""
+        sql = "SELECT type, problem, answer, created FROM history WHERE owner = ?"
+        params = [owner]
+        if prob_types:
+            sql += f" AND type IN ({', '.join('?' * len(prob_types))})"
+            params += list(prob_types)
+        if start is not None:
+            sql += " AND created >= ?"
+            params.append(start)
+        if end is not None:
+            sql += " AND created < ?"
+            params.append(end)
+        cursor = self._connect().execute(sql + " ORDER BY created, id", params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield rows
+
+    def iter_records(self, owner, **filters):
+        """依時間先後逐筆產生紀錄，不一次載入整張表。"""
+        for rows in self.iter_rows(owner, **filters):
+            for row in rows:
+                yield _record(row)
+
+    def clear(self, owner):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM history WHERE owner = ?", (owner,))
+            conn.execute("DELETE FROM history_counts WHERE owner = ?", (owner,))
+
+
+def category_counts(type_counts):
+    """回傳 (代數問題, 幾何問題) 的筆數。"""
+    algebra = sum(n for t, n in type_counts.items() if ALGEBRA_PATTERN.search(t))
+    geometry = sum(n for t, n in type_counts.items() if GEOMETRY_PATTERN.search(t))
+    return algebra, geometry
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """取得程序內共用的紀錄庫。"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = HistoryStore()
+        return _store
@@ -0,0 +1,282 @@
+# linear_systems.py - n 元一次方程組（方程式個數可多於或少於未知數）
+#
+# 課堂上的小型題目以分數做高斯-約旦消去法，結果精確且可列出每個列運算；
+# 大型題目交給 numpy（LAPACK）的 solve / lstsq，數百個未知數也只要幾十毫秒。
+# 兩種方法都以係數矩陣與增廣矩陣的秩區分唯一解、無解與無限多解。
+import math
+import re
+from dataclasses import dataclass
+from fractions import Fraction
+from typing import Optional, Tuple
+
+from math_core.closed_form import to_fraction
+
+# 方程式個數 × 未知數個數不超過此值時才用分數精確消去（自動選擇或指定 "exact" 皆同）；
+# 分數的分子分母在消去過程中會越來越長，更大的矩陣可能要算上好幾分鐘
+EXACT_LIMIT = 144
+# 輸入大小上限，避免一次貼上過大的矩陣拖垮伺服器
+MAX_SIZE = 1000
+STATUS_TEXT = {"unique": "唯一解", "none": "無解", "infinite": "無限多解"}
+
+_SEPARATORS = re.compile(r"[\s,，|]+")
+
+
+@dataclass(frozen=True)
+class LinearSolution:
+    status: str                  # "unique"、"none" 或 "infinite"
+    rank: int                    # 係數矩陣的秩
+    augmented_rank: int          # 增廣矩陣的秩
+    solution: Tuple              # 唯一解；無限多解時為自由變數取 0 的特解；無解時為最小平方解（僅數值法）
+    method: str                  # "exact" 或 "numpy"
+    residual: float              # ‖Ax − b‖
+    free: Tuple[int, ...] = ()   # 自由變數的索引（僅精確法）
+    basis: Tuple = ()            # 齊次解的基底，每個向量對應一個自由變數（僅精確法）
+
+    @property
+    def unknowns(self):
+        return len(self.solution)
+
+
+def _number(token, exact):
+    try:
+        value = Fraction(token)
+    except (ValueError, ZeroDivisionError):
+        raise ValueError(f"無法辨識的數字「{token}」")
+    return value if exact else float(value)
+
+
+def parse_matrix(text):
+    """每行一個方程式的係數，最後一個數為常數項，例如「2 3 -1 | 5」或「2, 3, -1, 5」。
+
+    回傳 (係數矩陣, 常數)；小型題目為分數，大型題目為浮點數。
+    """
+    rows = [[t for t in _SEPARATORS.split(line.strip()) if t] for line in text.splitlines() if line.strip()]
+    if not rows:
+        raise ValueError("請輸入至少一個方程式")
+    width = len(rows[0])
+    if width < 2:
+        raise ValueError("每行至少要有一個係數與一個常數項")
+    if any(len(row) != width for row in rows):
+        raise ValueError("每行的數字個數必須相同")
+    if len(rows) > MAX_SIZE or width - 1 > MAX_SIZE:
+        raise ValueError(f"方程式與未知數最多各 {MAX_SIZE} 個")
+    exact = len(rows) * (width - 1) <= EXACT_LIMIT
+    numbers = [[_number(t, exact) for t in row] for row in rows]
+    return [row[:-1] for row in numbers], [row[-1] for row in numbers]
+
+
+def parse_equations(text):
+    """每行一個方程式，例如「2x + 3y - z = 5」；未知數依名稱排序。
+
+    回傳 (係數矩陣, 常數, 未知數名稱)；有理係數為分數，其餘為浮點數。
+    """
+    import sympy as sp
+
+    from math_core.parser import parse
+
+    exprs = []
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        left, sep, right = line.partition("=")
+        exprs.append(sp.expand(parse(left) - parse(right) if sep else parse(left)))
+    if not exprs:
+        raise ValueError("請輸入至少一個方程式")
+    if len(exprs) > MAX_SIZE:
+        raise ValueError(f"方程式最多 {MAX_SIZE} 個")
+    symbols = sorted(set().union(*(e.free_symbols for e in exprs)), key=str)
+    if not symbols:
+        raise ValueError("方程式中沒有未知數")
+
+    def number(value):
+        if not value.is_number:
+            raise ValueError(f"係數必須是數字: {value}")
+        return Fraction(int(value.p), int(value.q)) if value.is_Rational else float(value)
+
+    matrix, constants = [], []
+    for expr in exprs:
+        try:
+            poly = sp.Poly(expr, *symbols)
+        except sp.PolynomialError:
+            raise ValueError(f"不是一次方程式: {expr} = 0")
+        if poly.total_degree() > 1:
+            raise ValueError(f"不是一次方程式: {expr} = 0")
+        matrix.append([number(poly.coeff_monomial(s)) for s in symbols])
+        constants.append(-number(poly.coeff_monomial(1)))
+    return matrix, constants, [str(s) for s in symbols]
+
+
+def _check_shape(matrix, constants):
+    if not matrix or not matrix[0]:
+        raise ValueError("係數矩陣不能是空的")
+    n = len(matrix[0])
+    if any(len(row) != n for row in matrix):
+        raise ValueError("每個方程式的係數個數必須相同")
+    if len(constants) != len(matrix):
+        raise ValueError("常數項個數必須與方程式個數相同")
+    if len(matrix) > MAX_SIZE or n > MAX_SIZE:
+        raise ValueError(f"方程式與未知數最多各 {MAX_SIZE} 個")
+    return len(matrix), n
+
+
+def rref(rows, record=None):
+    """分數矩陣的簡化列梯形（高斯-約旦消去）；回傳 (矩陣, 樞紐所在的欄)。
+
+    record 為 list 時依序附加 (樞紐欄, 列運算文字)，例如 (0, "R2 − 3R1")。
+    """
+    m = [list(row) for row in rows]
+    pivots = []
+    r = 0
+    for c in range(len(m[0])):
+        pivot = next((i for i in range(r, len(m)) if m[i][c] != 0), None)
+        if pivot is None:
+            continue
+        if pivot != r:
+            m[r], m[pivot] = m[pivot], m[r]
+            if record is not None:
+                record.append((c, f"R{r + 1} ↔ R{pivot + 1}"))
+        p = m[r][c]
+        if p != 1:
+            m[r] = [v / p for v in m[r]]
+            if record is not None:
+                record.append((c, f"R{r + 1} ÷ {p if p > 0 else f'({p})'}"))
+        for i in range(len(m)):
+            factor = m[i][c]
+            if i != r and factor != 0:
+                m[i] = [a - factor * b for a, b in zip(m[i], m[r])]
+                if record is not None:
+                    size = abs(factor)
+                    sign = "−" if factor > 0 else "+"
+                    record.append((c, f"R{i + 1} {sign} {'' if size == 1 else size}R{r + 1}"))
+        pivots.append(c)
+        r += 1
+        if r == len(m):
+            break
+    return m, pivots
+
+
+def solve_exact(matrix, constants, record=None):
+    """以分數消去法求解；record 為 list 時記錄列運算。"""
+    m, n = _check_shape(matrix, constants)
+    augmented = [[to_fraction(v) for v in row] + [to_fraction(c)] for row, c in zip(matrix, constants)]
+    reduced, pivots = rref(augmented, record)
+    rank = sum(1 for c in pivots if c < n)
+    if rank < len(pivots):
+        # 樞紐落在常數項那一欄：出現 0 = 非零 的矛盾列
+        return LinearSolution("none", rank, rank + 1, (), "exact", float("nan"))
+
+    solution = [Fraction(0)] * n
+    for row, c in zip(reduced, pivots):
+        solution[c] = row[n]
+    free = tuple(c for c in range(n) if c not in pivots)
+    basis = []
+    for f in free:
+        vector = [Fraction(0)] * n
+        vector[f] = Fraction(1)
+        for row, c in zip(reduced, pivots):
+            vector[c] = -row[f]
+        basis.append(tuple(vector))
+    residual = max((abs(sum(a * x for a, x in zip(row, solution)) - row[n]) for row in augmented),
+                   default=Fraction(0))
+    status = "unique" if not free else "infinite"
+    return LinearSolution(status, rank, rank, tuple(solution), "exact", float(residual), free, tuple(basis))
+
+
+def solve_numeric(matrix, constants):
+    """以 numpy 求解：先由奇異值判斷秩，滿秩方陣用 LU（solve），其餘用最小平方法（lstsq）。"""
+    import numpy as np
+
+    _check_shape(matrix, constants)
+    A = np.asarray(matrix, dtype=float)
+    b = np.asarray(constants, dtype=float)
+    if not (np.isfinite(A).all() and np.isfinite(b).all()):
+        raise ValueError("係數與常數項必須是有限的數")
+    m, n = A.shape
+    singular = np.linalg.svd(A, compute_uv=False)
+    # 與 numpy.linalg.matrix_rank 相同的容許誤差
+    tol = singular.max(initial=0.0) * max(m, n) * np.finfo(float).eps
+    rank = int((singular > tol).sum())
+    if m == n and rank == n:
+        x = np.linalg.solve(A, b)
+    else:
+        x = np.linalg.lstsq(A, b, rcond=None)[0]
+    residual = float(np.linalg.norm(A @ x - b))
+    # 殘差在捨入誤差範圍內就算有解；否則增廣矩陣的秩比係數矩陣多 1
+    scale = max(m, n) * np.finfo(float).eps * (singular.max(initial=0.0) * np.linalg.norm(x) + np.linalg.norm(b))
+    consistent = residual <= 100 * scale
+    if not consistent:
+        status = "none"
+    else:
+        status = "unique" if rank == n else "infinite"
+    return LinearSolution(status, rank, rank if consistent else rank + 1, tuple(x.tolist()), "numpy", residual)
+
+
+def _exact_ok(matrix, constants):
+    values = [v for row in matrix for v in row] + list(constants)
+    return all(isinstance(v, (int, Fraction)) or math.isfinite(v) for v in values)
+
+
+def solve(matrix, constants, method: Optional[str] = None, record=None):
+    """method 為 None 時自動選擇：小型且係數皆為有限實數用 "exact"，其餘用 "numpy"。
+
+    指定 "exact" 時同樣受 EXACT_LIMIT 限制，超過時引發 ValueError。
+    record 為 list 時，以精確法求解會記錄列運算（見 rref）；數值法不記錄。
+    """
+    m, n = _check_shape(matrix, constants)
+    if method is None:
+        method = "exact" if m * n <= EXACT_LIMIT and _exact_ok(matrix, constants) else "numpy"
+    if method == "exact":
+        if m * n > EXACT_LIMIT:
+            raise ValueError(f"精確消去最多 {EXACT_LIMIT} 個係數（方程式個數 × 未知數個數），請改用 numpy")
+        return solve_exact(matrix, constants, record)
+    if method == "numpy":
+        return solve_numeric(matrix, constants)
+    raise ValueError(f"不支援的解法: {method}")
+
+
+def variable_names(n):
+    """未知數預設名稱：三個以內用 x, y, z，更多時用 x1, x2, …。"""
+    return ["x", "y", "z"][:n] if n <= 3 else [f"x{i + 1}" for i in range(n)]
+
+
+def general_solution(result, names):
+    """無限多解的參數式，例如 ["x = 1 - 2t1", "y = t1"]；自由變數依序記為 t1, t2, …。"""
+    params = {f: f"t{i + 1}" for i, f in enumerate(result.free)}
+    lines = []
+    for j, name in enumerate(names):
+        if j in params:
+            lines.append(f"{name} = {params[j]}")
+            continue
+        text = f"{result.solution[j]}" if result.solution[j] != 0 else ""
+        for f, vector in zip(result.free, result.basis):
+            coef = vector[j]
+            if coef == 0:
+                continue
+            size = abs(coef)
+            term = params[f] if size == 1 else f"{size}{params[f]}"
+            if not text:
+                text = f"-{term}" if coef < 0 else term
+            else:
+                text += f" - {term}" if coef < 0 else f" + {term}"
+        lines.append(f"{name} = {text or 0}")
+    return lines
+
+
+def format_number(value):
+    """分數照原樣（3/4），浮點數取 6 位有效數字。"""
+    return f"{value:.6g}" if isinstance(value, float) else f"{value}"
+
+
+def equation_text(row, constant, names):
+    """一列係數寫成方程式，例如 [2, -1, 0], 5 → "2x - y = 5"。"""
+    text = ""
+    for coef, name in zip(row, names):
+        if coef == 0:
+            continue
+        size = format_number(abs(coef))
+        term = name if size == "1" else f"{size}{name}"
+        if not text:
+            text = f"-{term}" if coef < 0 else term
+        else:
+            text += f" - {term}" if coef < 0 else f" + {term}"
+    return f"{text or 0} = {format_number(constant)}"
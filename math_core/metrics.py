@@ -0,0 +1,195 @@
+# metrics.py - 解題、歷史記錄渲染與整頁重新執行的延遲統計
+#
+# 每個 (指標, 標籤) 一個固定區間的直方圖，記錄一次只需 bisect 與加法，
+# 可在「系統監控」分頁查看，或以 Prometheus 文字格式匯出。
+# 另有可選的取樣分析器：開啟後定時抓取執行中程式的呼叫堆疊，只保留慢請求的結果。
+import bisect
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+
+# 直方圖區間上界（秒），最後一格為 +Inf
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+           0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+DESCRIPTIONS = {
+    "math_solver_seconds": "解題函數執行時間，type 與歷史記錄的類型相同",
+    "math_history_render_seconds": "歷史記錄分頁的渲染時間",
+    "math_rerun_seconds": "Streamlit 整頁重新執行的時間",
+    "math_check_seconds": "批改答案各階段的時間，stage 為批改階段",
+    "math_practice_generate_seconds": "產生並驗證一道練習題的時間，type 為題型",
+    "math_warmup_seconds": "啟動暖機各步驟的時間，step 為步驟名稱",
+}
+
+
+class Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+    def quantile(self, q):
+        """以區間內線性內插估計分位數（與 Prometheus 的 histogram_quantile 相同）。"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if seen + n >= rank and n:
+                lower = BUCKETS[i - 1] if i else 0.0
+                upper = BUCKETS[i] if i < len(BUCKETS) else BUCKETS[-1]
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+        return BUCKETS[-1]
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels_text(labels, extra=()):
+    items = [f'{k}="{_escape(v)}"' for k, v in (*labels, *extra)]
+    return "{" + ",".join(items) + "}" if items else ""
+
+
+def _stack(frame, limit=40):
+    # 由外到內串成一行，與 flame graph 的 collapsed 格式相同
+    names = []
+    while frame is not None and len(names) < limit:
+        code = frame.f_code
+        names.append(f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}:{frame.f_lineno}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class SamplingProfiler:
+    """開啟後每 interval 秒抓取一次被監看執行緒的堆疊；超過 threshold 秒的請求保留前幾名堆疊。"""
+
+    def __init__(self, interval=0.005, threshold=0.5, keep=20):
+        self.enabled = False
+        self.interval = interval
+        self.threshold = threshold
+        self.slow = deque(maxlen=keep)
+        self._active = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _sample_loop(self):
+        while True:
+            frames = sys._current_frames()
+            with self._lock:
+                # 被 st.rerun 等例外中斷、沒有呼叫 stop 的執行緒結束後就不再取樣
+                for token in [t for t, (ident, _) in self._active.items() if ident not in frames]:
+                    del self._active[token]
+                if not self._active:
+                    self._thread = None
+                    return
+                active = list(self._active.values())
+            for ident, counter in active:
+                counter[_stack(frames[ident])] += 1
+            time.sleep(self.interval)
+
+    def start(self, label):
+        """開始監看目前的執行緒；分析器關閉時回傳 None。"""
+        if not self.enabled:
+            return None
+        token = (label, time.perf_counter(), Counter())
+        with self._lock:
+            self._active[id(token)] = (threading.get_ident(), token[2])
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._sample_loop, name="math-profiler", daemon=True)
+                self._thread.start()
+        return token
+
+    def stop(self, token):
+        if token is None:
+            return
+        label, started, counter = token
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self._active.pop(id(token), None)
+        if elapsed >= self.threshold and counter:
+            self.slow.append({"label": label, "seconds": elapsed, "time": time.time(),
+                              "samples": sum(counter.values()), "stacks": counter.most_common(10)})
+
+    @contextmanager
+    def profile(self, label):
+        token = self.start(label)
+        try:
+            yield
+        finally:
+            self.stop(token)
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self.profiler = SamplingProfiler()
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """計時 with 區塊；例外時也會記錄。取樣分析器開啟時同時抓取堆疊。"""
+        label = " ".join([name, *map(str, labels.values())])
+        start = time.perf_counter()
+        try:
+            with self.profiler.profile(label):
+                yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def snapshot(self):
+        """每個直方圖一列：名稱、標籤、次數與平均/p50/p90/p99（毫秒）。"""
+        with self._lock:
+            items = [(name, labels, h.count, h.total, h.quantile(0.5), h.quantile(0.9), h.quantile(0.99))
+                     for (name, labels), h in sorted(self._histograms.items())]
+        return [{"指標": name, "標籤": ", ".join(f"{k}={v}" for k, v in labels), "次數": count,
+                 "平均(ms)": total / count * 1000, "p50(ms)": p50 * 1000,
+                 "p90(ms)": p90 * 1000, "p99(ms)": p99 * 1000}
+                for name, labels, count, total, p50, p90, p99 in items]
+
+    def prometheus_text(self):
+        """Prometheus text exposition format（0.0.4）。"""
+        with self._lock:
+            items = [(name, labels, list(h.counts), h.total, h.count)
+                     for (name, labels), h in sorted(self._histograms.items())]
+        lines = []
+        current = None
+        for name, labels, counts, total, count in items:
+            if name != current:
+                current = name
+                lines.append(f"# HELP {name} {DESCRIPTIONS.get(name, name)}")
+                lines.append(f"# TYPE {name} histogram")
+            cumulative = 0
+            for bound, n in zip((*BUCKETS, "+Inf"), counts):
+                cumulative += n
+                lines.append(f"{name}_bucket{_labels_text(labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{name}_sum{_labels_text(labels)} {total}")
+            lines.append(f"{name}_count{_labels_text(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+        self.profiler.slow.clear()
+
+
+# 程序內共用的統計資料
+metrics = MetricsRegistry()
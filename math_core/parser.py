@@ -0,0 +1,240 @@
+# parser.py - 中學數學寫法的表達式解析器（取代 sympify，不經過 eval）
+#
+# 支援: 隱含乘法 2x、3(x+1)、(x+1)(x-1)；^ 與 ** 次方；上標 x²、x⁻¹；√、∛；
+#       全形數字與符號（ｘ＋１）；×、÷、−；sin x、sin^2(x) 等函數寫法。
+# 字母連寫會拆成單一字母變數相乘（xy → x*y），但 sin、sqrt、pi 等已知名稱優先。
+# 輸入先檢查長度、記號數、巢狀深度與數字大小，超過上限直接拒絕，不做任何符號運算。
+import re
+import unicodedata
+from functools import lru_cache
+
+import sympy as sp
+
+MAX_LENGTH = 500
+MAX_TOKENS = 300
+MAX_DEPTH = 40
+MAX_NUMBER_DIGITS = 30
+# 純數字的次方（如 9^9^9）在建構時就會被 sympy 算出來，結果超過這個位元數就拒絕
+MAX_POWER_BITS = 20000
+# 無理數底數（√3、π）的次方數上限：√3^n 會被化成 3^(n/2) 算出來，無法先估計位元數
+MAX_POWER_EXPONENT = 1000
+
+FUNCTIONS = {
+    "sin": sp.sin, "cos": sp.cos, "tan": sp.tan, "cot": sp.cot, "sec": sp.sec, "csc": sp.csc,
+    "asin": sp.asin, "acos": sp.acos, "atan": sp.atan,
+    "arcsin": sp.asin, "arccos": sp.acos, "arctan": sp.atan,
+    "sinh": sp.sinh, "cosh": sp.cosh, "tanh": sp.tanh,
+    "log": sp.log, "ln": sp.log, "exp": sp.exp, "sqrt": sp.sqrt, "abs": sp.Abs,
+}
+CONSTANTS = {"pi": sp.pi, "E": sp.E, "I": sp.I}
+# 最長的名稱先比對，sinh 不會被拆成 sin·h
+_NAMES = sorted([*FUNCTIONS, *CONSTANTS], key=len, reverse=True)
+
+_SUPERSCRIPTS = str.maketrans("⁰¹²³⁴⁵⁶⁷⁸⁹⁻⁺", "0123456789-+")
+_SUPERSCRIPT_RUN = re.compile("[⁰¹²³⁴⁵⁶⁷⁸⁹⁻⁺]+")
+_REPLACEMENTS = {"×": "*", "·": "*", "÷": "/", "−": "-", "π": "pi"}
+_TOKEN = re.compile(r"\s*(?:(\d+\.?\d*|\.\d+)|([A-Za-z]+)|(\*\*|[-+*/^(),√∛]))")
+
+
+class ParseError(ValueError):
+    """表達式無法解析或超過大小限制。"""
+
+
+def normalize(text):
+    """統一寫法：上標改成 ^(…)，全形字元轉半形，其他符號換成 ASCII。"""
+    if len(text) > MAX_LENGTH:
+        raise ParseError(f"表達式太長（上限 {MAX_LENGTH} 個字元）")
+    # 上標要在 NFKC 之前處理，否則 ² 會被轉成普通的 2
+    text = _SUPERSCRIPT_RUN.sub(lambda m: f"^({m.group().translate(_SUPERSCRIPTS)})", text)
+    text = unicodedata.normalize("NFKC", text)
+    for old, new in _REPLACEMENTS.items():
+        text = text.replace(old, new)
+    return " ".join(text.split())
+
+
+def _split_name(word):
+    # 字母串拆成已知名稱或單一字母
+    parts, i = [], 0
+    while i < len(word):
+        for name in _NAMES:
+            if word.startswith(name, i):
+                parts.append(name)
+                i += len(name)
+                break
+        else:
+            parts.append(word[i])
+            i += 1
+    return parts
+
+
+def tokenize(text):
+    tokens, pos = [], 0
+    while pos < len(text):
+        match = _TOKEN.match(text, pos)
+        if not match:
+            if text[pos:].strip() == "":
+                break
+            raise ParseError(f"無法辨識的字元「{text[pos:].lstrip()[0]}」")
+        number, word, op = match.groups()
+        if number:
+            if len(number) > MAX_NUMBER_DIGITS:
+                raise ParseError(f"數字太長（上限 {MAX_NUMBER_DIGITS} 位）")
+            tokens.append(("num", number))
+        elif word:
+            for name in _split_name(word):
+                kind = "func" if name in FUNCTIONS else "name"
+                tokens.append((kind, name))
+        else:
+            tokens.append(("op", "^" if op == "**" else op))
+        if len(tokens) > MAX_TOKENS:
+            raise ParseError(f"表達式太長（上限 {MAX_TOKENS} 個記號）")
+        pos = match.end()
+    return tokens
+
+
+def _power(base, exponent):
+    # 有理數次方（含 2^(10^8/3) 這類分數）會先算出整數部分，所以不限於整數次方
+    if base.is_number and exponent.is_Rational and abs(exponent) > 1:
+        if base.is_Rational:
+            bits = max(abs(base.p), base.q, 2).bit_length()
+            too_large = abs(exponent) * bits > MAX_POWER_BITS
+        else:
+            too_large = abs(exponent) > MAX_POWER_EXPONENT
+        if too_large:
+            raise ParseError("數字次方過大")
+    return sp.Pow(base, exponent)
+
+
+class _Parser:
+    """遞迴下降：expr → term (±term)*；term → unary ((*|/)? unary)*；unary → ±unary | power；
+    power → primary (^ unary)?"""
+
+    _STARTS_PRIMARY = {"num", "name", "func"}
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+        self.depth = 0
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def take(self, value=None):
+        token = self.peek()
+        if token[0] is None or (value is not None and token[1] != value):
+            expected = f"「{value}」" if value else "運算元"
+            raise ParseError(f"表達式不完整，缺少{expected}")
+        self.pos += 1
+        return token
+
+    def starts_primary(self):
+        kind, value = self.peek()
+        return kind in self._STARTS_PRIMARY or value in ("(", "√", "∛")
+
+    def parse(self):
+        if not self.tokens:
+            raise ParseError("請輸入表達式")
+        expr = self.expr()
+        if self.pos < len(self.tokens):
+            raise ParseError(f"無法解析「{self.tokens[self.pos][1]}」附近的內容")
+        return expr
+
+    def nested(self, parse):
+        self.depth += 1
+        if self.depth > MAX_DEPTH:
+            raise ParseError(f"巢狀太深（上限 {MAX_DEPTH} 層）")
+        try:
+            return parse()
+        finally:
+            self.depth -= 1
+
+    def expr(self):
+        result = self.term()
+        while self.peek()[1] in ("+", "-"):
+            op = self.take()[1]
+            right = self.term()
+            result = result + right if op == "+" else result - right
+        return result
+
+    def term(self):
+        result = self.unary()
+        while True:
+            value = self.peek()[1]
+            if value in ("*", "/"):
+                self.take()
+                right = self.unary()
+                result = result * right if value == "*" else result / right
+            elif self.starts_primary():
+                # 隱含乘法：2x、3(x+1)、(x+1)(x-1)
+                result = result * self.power()
+            else:
+                return result
+
+    def unary(self):
+        value = self.peek()[1]
+        if value in ("+", "-"):
+            self.take()
+            operand = self.nested(self.unary)
+            return -operand if value == "-" else operand
+        return self.power()
+
+    def power(self):
+        base = self.primary()
+        if self.peek()[1] == "^":
+            self.take()
+            # 右結合：x^2^3 = x^(2^3)；指數可帶正負號：2^-1
+            return _power(base, self.nested(self.unary))
+        return base
+
+    def primary(self):
+        kind, value = self.take()
+        if kind == "num":
+            return sp.Rational(value) if "." in value else sp.Integer(value)
+        if kind == "name":
+            return CONSTANTS.get(value) or sp.Symbol(value)
+        if kind == "func":
+            return self.function(FUNCTIONS[value])
+        if value == "(":
+            inner = self.nested(self.expr)
+            self.take(")")
+            return inner
+        # √ 作用在緊接的一項（含次方）：√2x = √2·x，√x² = √(x²)
+        if value == "√":
+            return sp.sqrt(self.nested(self.power))
+        if value == "∛":
+            return sp.cbrt(self.nested(self.power))
+        raise ParseError(f"無法解析「{value}」附近的內容")
+
+    def function(self, func):
+        # sin^2(x) 表示 (sin x)^2
+        exponent = None
+        if self.peek()[1] == "^":
+            self.take()
+            exponent = self.nested(self.unary)
+        if self.peek()[1] == "(":
+            self.take()
+            args = [self.nested(self.expr)]
+            while self.peek()[1] == ",":
+                self.take()
+                args.append(self.nested(self.expr))
+            self.take(")")
+        else:
+            # 不加括號時作用在緊接的一項：sin x、sin x^2
+            args = [self.nested(self.power)]
+        try:
+            result = func(*args)
+        except TypeError:
+            raise ParseError("函數的參數個數不正確")
+        return result if exponent is None else _power(result, exponent)
+
+
+@lru_cache(maxsize=1024)
+def _parse_normalized(text):
+    return _Parser(tokenize(text)).parse()
+
+
+def parse(text):
+    """把使用者輸入的字串解析成 sympy 表達式；相同寫法（正規化後）只解析一次。"""
+    if not isinstance(text, str):
+        raise ParseError("表達式必須是字串")
+    return _parse_normalized(normalize(text))
@@ -0,0 +1,127 @@
+# plotting.py - 函數圖形：lambdify 編譯一次、自適應取樣、依 (表達式, 範圍, 解析度) 快取圖片
+import io
+from functools import lru_cache
+
+import numpy as np
+import sympy as sp
+
+MAX_POINTS = 5000
+# 代入求值一次最多的點數
+MAX_EVAL_POINTS = 100_000
+
+
+@lru_cache(maxsize=256)
+def compile_expression(expr):
+    """把單變數 sympy 表達式編譯成 NumPy 函數；回傳 (變數, 函數)。"""
+    symbols = sorted(expr.free_symbols, key=lambda s: s.name)
+    if len(symbols) > 1:
+        raise ValueError("只能繪製或代入單一變數的函數")
+    var = symbols[0] if symbols else sp.Symbol('x')
+    return var, sp.lambdify(var, expr, modules="numpy")
+
+
+def _evaluate(func, xs):
+    with np.errstate(all="ignore"):
+        ys = np.asarray(func(xs))
+    ys = np.broadcast_to(ys, xs.shape)
+    if np.iscomplexobj(ys):
+        ys = np.where(np.abs(ys.imag) < 1e-12, ys.real, np.nan)
+    ys = ys.astype(float)
+    ys[~np.isfinite(ys)] = np.nan
+    return ys
+
+
+def evaluate_points(expr, xs):
+    """以編譯好的 NumPy 函數一次算出所有點的值；無定義或不是實數的點為 nan。"""
+    xs = np.asarray(xs, dtype=float)
+    if xs.ndim != 1:
+        raise ValueError("x 值必須是一維的數列")
+    if xs.size > MAX_EVAL_POINTS:
+        raise ValueError(f"一次最多代入 {MAX_EVAL_POINTS} 個點")
+    _, func = compile_expression(expr)
+    try:
+        return _evaluate(func, xs)
+    except (NameError, TypeError) as e:
+        # lambdify 對應不到 NumPy 的函數（例如需要 scipy 的特殊函數）
+        raise ValueError(f"無法以數值計算此表達式: {e}")
+
+
+def parse_points(text):
+    """以逗號或空白分隔的 x 值，例如「0, 0.5, 1, 2」。"""
+    tokens = [t for t in text.replace("，", ",").replace(",", " ").split() if t]
+    if not tokens:
+        raise ValueError("請輸入至少一個 x 值")
+    if len(tokens) > MAX_EVAL_POINTS:
+        raise ValueError(f"一次最多代入 {MAX_EVAL_POINTS} 個點")
+    try:
+        return np.array([float(t) for t in tokens])
+    except ValueError:
+        raise ValueError("x 值必須是數字，以逗號或空白分隔")
+
+
+def _view_range(ys):
+    # 以百分位數決定 y 軸範圍，避免 tan 在漸近線附近的巨大值把圖壓扁
+    finite = ys[np.isfinite(ys)]
+    if finite.size == 0:
+        return -1.0, 1.0
+    lo, hi = np.percentile(finite, [2, 98])
+    if hi - lo < 1e-9:
+        lo, hi = lo - 1, hi + 1
+    pad = 0.1 * (hi - lo)
+    return lo - pad, hi + pad
+
+
+def adaptive_sample(func, x_min, x_max, resolution=200, max_depth=8, tol=1e-3):
+    """先均勻取樣，再只在中點偏離線性插值的區間加密；回傳 (xs, ys)。"""
+    xs = np.linspace(x_min, x_max, resolution + 1)
+    ys = _evaluate(func, xs)
+    lo, hi = _view_range(ys)
+    for _ in range(max_depth):
+        mids = (xs[:-1] + xs[1:]) / 2
+        ym = _evaluate(func, mids)
+        err = np.abs(ym - (ys[:-1] + ys[1:]) / 2)
+        # 只有一端有定義的區間（定義域邊界）也要加密
+        defined = np.isfinite(ys[:-1]) | np.isfinite(ys[1:]) | np.isfinite(ym)
+        refine = defined & ~(err <= tol * (hi - lo))
+        if not refine.any() or xs.size + refine.sum() > MAX_POINTS:
+            break
+        order = np.argsort(np.concatenate([xs, mids[refine]]), kind="stable")
+        xs = np.concatenate([xs, mids[refine]])[order]
+        ys = np.concatenate([ys, ym[refine]])[order]
+    return xs, ys
+
+
+def break_discontinuities(ys, view):
+    """相鄰兩點跳動超過整個視窗高度時（漸近線）插入 nan，避免畫出垂直線。"""
+    lo, hi = view
+    ys = ys.copy()
+    jump = np.abs(np.diff(ys)) > (hi - lo)
+    ys[1:][jump] = np.nan
+    return ys
+
+
+@lru_cache(maxsize=64)
+def render_plot(expr, x_min, x_max, resolution=200):
+    """回傳 PNG 圖片位元組；相同的 (表達式, 範圍, 解析度) 直接取快取，不重新計算或繪製。"""
+    from matplotlib.figure import Figure
+
+    var, func = compile_expression(expr)
+    xs, ys = adaptive_sample(func, x_min, x_max, resolution)
+    view = _view_range(_evaluate(func, np.linspace(x_min, x_max, resolution + 1)))
+    ys = break_discontinuities(ys, view)
+
+    fig = Figure(figsize=(6, 3.5), dpi=100)
+    ax = fig.subplots()
+    ax.plot(xs, ys, color="#667eea", linewidth=2)
+    ax.axhline(0, color="#999999", linewidth=0.8)
+    ax.axvline(0, color="#999999", linewidth=0.8)
+    ax.set_xlim(x_min, x_max)
+    ax.set_ylim(*view)
+    ax.set_xlabel(str(var))
+    ax.set_title(f"y = {expr}")
+    ax.grid(alpha=0.3)
+    fig.tight_layout()
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png")
+    return buf.getvalue()
+
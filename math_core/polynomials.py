@@ -0,0 +1,238 @@
+# polynomials.py - 任意次數的一元多項式方程
+#
+# 低次且係數皆為有理數時由 sympy 因式分解：一、二次因式給根式，其餘以 CRootOf 精確表示；
+# 高次或係數不是有理數時交給 numpy.roots（伴隨矩陣的特徵值），再以牛頓法修正，
+# 並用 Weierstrass 修正量算出每個根的誤差上界，數百次的方程式也只要幾十毫秒。
+import math
+import re
+from dataclasses import dataclass
+from fractions import Fraction
+from typing import Tuple
+
+from math_core.closed_form import to_fraction
+
+# 係數皆為有理數且次數不超過此值時，自動求精確根
+EXACT_DEGREE = 8
+# 精確法只接受分母不超過此值的係數；sqrt(2) 這類無理數的浮點近似會變成分母 10¹⁶ 的分數
+EXACT_DENOMINATOR = 10**6
+# 次數上限：伴隨矩陣為 n×n，再大特徵值計算會明顯變慢
+MAX_DEGREE = 500
+# 牛頓法修正的次數；只接受讓 |p(z)| 變小的修正
+POLISH_STEPS = 3
+
+_SEPARATORS = re.compile(r"[\s,，]+")
+
+
+@dataclass(frozen=True)
+class PolynomialRoots:
+    degree: int
+    roots: Tuple[complex, ...]       # 相異根的近似值；實根的虛部為 0
+    multiplicities: Tuple[int, ...]  # 每個根的重數
+    method: str                      # "exact" 或 "numpy"
+    exact: Tuple = ()                # 精確法：每個根的 sympy 寫法（根式或 CRootOf）
+    factors: Tuple = ()              # 精確法：(不可約因式, 重數, 該因式的根)
+    radii: Tuple[float, ...] = ()    # 數值法：真正的根落在以近似值為中心、此半徑的圓內
+
+    @property
+    def real_roots(self):
+        return [z.real for z in self.roots if z.imag == 0]
+
+
+def parse_coefficients(text):
+    """係數由最高次往下排，例如「1, -6, 11, -6」即 x³ - 6x² + 11x - 6；可寫分數 1/2。"""
+    tokens = [t for t in _SEPARATORS.split(text.strip()) if t]
+    if not tokens:
+        raise ValueError("請輸入係數")
+    try:
+        return [Fraction(t) for t in tokens]
+    except (ValueError, ZeroDivisionError):
+        raise ValueError("係數必須是數字，以逗號或空白分隔")
+
+
+def parse_polynomial(text):
+    """方程式或多項式，例如「x^3 - 6x^2 + 11x = 6」；回傳 (由最高次往下的係數, 未知數名稱)。"""
+    import sympy as sp
+
+    from math_core.parser import parse
+
+    left, sep, right = text.partition("=")
+    expr = sp.expand(parse(left) - parse(right) if sep else parse(left))
+    symbols = sorted(expr.free_symbols, key=str)
+    if not symbols:
+        raise ValueError("方程式中沒有未知數")
+    if len(symbols) > 1:
+        raise ValueError(f"只能有一個未知數: {', '.join(map(str, symbols))}")
+    try:
+        poly = sp.Poly(expr, symbols[0])
+    except sp.PolynomialError:
+        raise ValueError(f"不是多項式方程: {expr} = 0")
+
+    def number(value):
+        if not value.is_number:
+            raise ValueError(f"係數必須是數字: {value}")
+        if value.is_Rational:
+            return Fraction(int(value.p), int(value.q))
+        if not value.is_real:
+            raise ValueError(f"係數必須是實數: {value}")
+        return float(value)
+
+    return [number(c) for c in poly.all_coeffs()], str(symbols[0])
+
+
+def normalize(coefficients):
+    """去掉最高次的 0 並檢查次數；係數一律轉成分數（0.1 → 1/10）。"""
+    coefficients = list(coefficients)
+    while coefficients and coefficients[0] == 0:
+        coefficients.pop(0)
+    if len(coefficients) < 2:
+        raise ValueError("次數至少要是 1（至少要有一個含未知數的項）")
+    if len(coefficients) - 1 > MAX_DEGREE:
+        raise ValueError(f"次數最多 {MAX_DEGREE}")
+    if not all(math.isfinite(c) for c in coefficients):
+        raise ValueError("係數必須是有限的數")
+    return [to_fraction(float(c) if isinstance(c, float) else c) for c in coefficients]
+
+
+def expression_text(coefficients, variable="x"):
+    """係數寫成 sympy 可解析的式子，例如 [1, 0, -2] → "(1)*x**2 + (-2)"；作為快取的鍵。"""
+    degree = len(coefficients) - 1
+    terms = []
+    for i, c in enumerate(coefficients):
+        if c == 0:
+            continue
+        power = degree - i
+        terms.append(f"({c})" + ("" if power == 0 else f"*{variable}" if power == 1 else f"*{variable}**{power}"))
+    return " + ".join(terms) or "0"
+
+
+def display_text(coefficients, variable="x"):
+    """畫面與歷史記錄用的寫法，例如 [1, -6, 11, -6] → "x^3 - 6x^2 + 11x - 6"。"""
+    degree = len(coefficients) - 1
+    text = ""
+    for i, c in enumerate(coefficients):
+        if c == 0:
+            continue
+        power = degree - i
+        name = "" if power == 0 else variable if power == 1 else f"{variable}^{power}"
+        size = abs(c)
+        if isinstance(size, Fraction) and size.denominator > EXACT_DENOMINATOR:
+            size = f"{float(size):.6g}"
+        elif isinstance(size, Fraction) and size.denominator != 1 and name:
+            size = f"({size})"
+        term = f"{size}" if not name else name if size == 1 else f"{size}{name}"
+        if not text:
+            text = f"-{term}" if c < 0 else term
+        else:
+            text += f" - {term}" if c < 0 else f" + {term}"
+    return text or "0"
+
+
+def exact_roots(expr):
+    """sympy 精確解（在工作程序池裡執行）：因式分解後，一、二次因式用根式，其餘用 CRootOf。"""
+    import sympy as sp
+
+    symbols = sorted(expr.free_symbols, key=str)
+    poly = sp.Poly(expr, *symbols[:1] or [sp.Symbol("x")])
+    _, factors = poly.factor_list()
+    roots, multiplicities, exact = [], [], []
+    grouped = []
+    for factor, k in factors:
+        n = factor.degree()
+        found = sp.roots(factor, cubics=False, quartics=False, quintics=False)
+        found = list(found) if sum(found.values()) == n else [sp.CRootOf(factor, i) for i in range(n)]
+        grouped.append((factor.as_expr(), k, tuple(found)))
+        for r in found:
+            z = complex(sp.N(r, 17))
+            roots.append(complex(z.real, 0.0) if r.is_real else z)
+            multiplicities.append(k)
+            exact.append(r)
+    order = sorted(range(len(roots)), key=lambda i: (roots[i].imag != 0, roots[i].real, roots[i].imag))
+    return PolynomialRoots(poly.degree(), tuple(roots[i] for i in order), tuple(multiplicities[i] for i in order),
+                           "exact", tuple(exact[i] for i in order), tuple(grouped))
+
+
+def polish(coefficients, z, steps=POLISH_STEPS):
+    """牛頓法修正近似根：z ← z − p(z)/p′(z)，|p| 沒有變小的根保留原值。"""
+    import numpy as np
+
+    derivative = np.polyder(coefficients)
+    value = np.polyval(coefficients, z)
+    for _ in range(steps):
+        with np.errstate(all="ignore"):
+            slope = np.polyval(derivative, z)
+            candidate = np.where(slope != 0, z - value / slope, z)
+            new_value = np.polyval(coefficients, candidate)
+            better = np.isfinite(candidate) & (np.abs(new_value) < np.abs(value))
+        if not better.any():
+            break
+        z = np.where(better, candidate, z)
+        value = np.where(better, new_value, value)
+    return z
+
+
+def inclusion_radii(coefficients, z):
+    """每個近似根的誤差上界。
+
+    以 Wᵢ = p(zᵢ) / (aₙ ∏ⱼ≠ᵢ (zᵢ − zⱼ)) 為 Weierstrass 修正量，半徑 n|Wᵢ| 的圓盤聯集包含所有根，
+    且每個連通塊裡的根數等於圓盤數；孤立的圓盤恰好含一個根。p(zᵢ) 另加上 Horner 求值的捨入誤差上界。
+    乘積在對數空間計算，數百次的多項式也不會溢位；重根附近的圓盤會互相重疊、半徑變大。
+    """
+    import numpy as np
+
+    n = len(z)
+    a = np.asarray(coefficients, dtype=float)
+    with np.errstate(all="ignore"):
+        rounding = 2 * n * np.finfo(float).eps * np.polyval(np.abs(a), np.abs(z))
+        size = np.abs(np.polyval(a, z)) + rounding
+        gaps = np.abs(z[:, None] - z[None, :])
+        np.fill_diagonal(gaps, 1.0)
+        log_radius = math.log(n) + np.log(size) - math.log(abs(a[0])) - np.log(gaps).sum(axis=1)
+        return np.exp(log_radius)
+
+
+def _certified_real(z, radii):
+    # 實係數多項式的非實根成對出現：圓盤與實軸相交、且半徑 3r 內沒有別的圓盤時，
+    # 圓盤裡唯一的根的共軛也在同一個圓盤裡，所以它是實根
+    import numpy as np
+
+    gaps = np.abs(z[:, None] - z[None, :]) - radii[None, :]
+    np.fill_diagonal(gaps, np.inf)
+    return (np.abs(z.imag) <= radii) & (gaps.min(axis=1, initial=np.inf) > 3 * radii)
+
+
+def numeric_roots(coefficients):
+    """numpy.roots 求伴隨矩陣的特徵值，牛頓法修正後附上誤差上界；0 根直接由末項的 0 得出。"""
+    import numpy as np
+
+    a = np.asarray([float(c) for c in coefficients])
+    zeros = len(a) - len(np.trim_zeros(a, "b"))
+    a = a[:len(a) - zeros]
+    z = polish(a, np.roots(a).astype(complex)) if len(a) > 1 else np.zeros(0, dtype=complex)
+    radii = inclusion_radii(a, z) if len(z) else np.zeros(0)
+    if len(z):
+        real = _certified_real(z, radii)
+        z = np.where(real, z.real + 0j, z)
+    multiplicities = np.ones(len(z), dtype=int)
+    if zeros:
+        # 0 根是精確的（誤差半徑 0），合併成一項並記下重數，和其他根一起排序
+        z = np.append(z, 0j)
+        radii = np.append(radii, 0.0)
+        multiplicities = np.append(multiplicities, zeros)
+    order = np.lexsort((z.imag, z.real, z.imag != 0))
+    return PolynomialRoots(len(coefficients) - 1, tuple(complex(v) for v in z[order]),
+                           tuple(int(k) for k in multiplicities[order]), "numpy",
+                           radii=tuple(float(r) for r in radii[order]))
+
+
+def exact_ok(coefficients):
+    """normalize 後的係數是否適合求精確根：次數不高，且都是分母不大的分數。"""
+    return (len(coefficients) - 1 <= EXACT_DEGREE
+            and all(Fraction(c).denominator <= EXACT_DENOMINATOR for c in coefficients))
+
+
+def format_root(z):
+    """複數近似值，例如 1.5、-0.5+0.866025i。"""
+    real = z.real or 0.0  # -0.0 顯示成 0
+    if z.imag == 0:
+        return f"{real:.6g}"
+    return f"{real:.6g}{z.imag:+.6g}i"
@@ -0,0 +1,284 @@
+# practice.py - 練習題產生器：背景執行緒預先產生並驗證題目，每個 (題型, 難度) 各保持一個題目池
+#
+# 每道題先以亂數挑出「答案漂亮」的參數（整數根、整數解、可分解的多項式、畢氏三元數、特殊角），
+# 再交給 solvers 實際解一次，解出的答案與預期不符就丟掉重抽；因式分解的驗證走工作程序池與共用快取。
+# 題目池由背景執行緒補滿，取題時直接拿現成的，池子不夠才當場產生，50 題的練習卷可以立即出好。
+import math
+import os
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+
+from math_core import solvers
+from math_core.batch import COLUMNS
+from math_core.metrics import metrics
+from math_core.polynomials import display_text
+from math_core.worker_pool import ComputationTooExpensive, PoolBusy, get_pool
+
+# 每個 (題型, 難度) 的題目池大小
+POOL_SIZE = int(os.environ.get("MATH_PRACTICE_POOL_SIZE", "60"))
+# 一道題最多重抽幾次；題型可能的題目太少（例如簡單的特殊角）時接受重複的題目
+MAX_ATTEMPTS = 50
+# 工作程序池有使用者的工作、或補題出錯時，背景補題暫停這麼多秒
+BACKOFF_SECONDS = 0.5
+DIFFICULTIES = {1: "簡單", 2: "中等", 3: "困難"}
+
+
+@dataclass(frozen=True)
+class PracticeProblem:
+    prob_type: str
+    problem: str
+    answer: str
+    difficulty: int
+
+    def as_row(self, time_text=None):
+        """與歷史記錄 CSV 相同的欄位（類型、問題、解答、時間）。"""
+        return dict(zip(COLUMNS, (self.prob_type, self.problem, self.answer,
+                                  time_text or datetime.now().strftime("%H:%M:%S"))))
+
+
+class Rejected(Exception):
+    """候選題目不夠漂亮，或解出的答案與預期不符。"""
+
+
+def _nonzero(rng, low, high):
+    while True:
+        value = rng.randint(low, high)
+        if value:
+            return value
+
+
+# ========== 各題型：抽參數 → 實際解一次 → 檢查答案 ==========
+def _quadratic(rng, level):
+    bound = {1: 6, 2: 9, 3: 12}[level]
+    a = {1: 1, 2: rng.randint(1, 3), 3: _nonzero(rng, -4, 4)}[level]
+    r1, r2 = rng.randint(-bound, bound), rng.randint(-bound, bound)
+    if level == 1 and (r1 == r2 or r1 * r2 == 0):
+        raise Rejected("簡單題不出重根或 0 根")
+    b, c = -a * (r1 + r2), a * r1 * r2
+    sol = solvers.quadratic(a, b, c)
+    roots = sol.values["roots"]
+    if not all(r.is_rational() for r in roots) or {r.real for r in roots} != {r1, r2}:
+        raise Rejected(sol.answer)
+    return f"{display_text([a, b, c])} = 0", sol.answer
+
+
+def _system(rng, level):
+    bound = {1: 5, 2: 9, 3: 12}[level]
+    low = 1 if level == 1 else -bound
+    x, y = rng.randint(-bound, bound), rng.randint(-bound, bound)
+    a1, b1, a2, b2 = (_nonzero(rng, low, bound) for _ in range(4))
+    if a1 * b2 - a2 * b1 == 0:
+        raise Rejected("行列式為 0")
+    c1, c2 = a1 * x + b1 * y, a2 * x + b2 * y
+    sol = solvers.system_2x2(a1, b1, c1, a2, b2, c2)
+    if (sol.values["x"], sol.values["y"]) != (x, y):
+        raise Rejected(sol.answer)
+    return f"{_linear_text(a1, b1)} = {c1}; {_linear_text(a2, b2)} = {c2}", sol.answer
+
+
+def _linear_text(a, b):
+    # ax + by 的寫法，例如 (2, -1) → "2x - y"
+    x = "x" if a == 1 else "-x" if a == -1 else f"{a}x"
+    y = "y" if abs(b) == 1 else f"{abs(b)}y"
+    return f"{x} {'-' if b < 0 else '+'} {y}"
+
+
+def _multiply(p, q):
+    # 兩個係數串列（由最高次往下）相乘
+    product = [0] * (len(p) + len(q) - 1)
+    for i, a in enumerate(p):
+        for j, b in enumerate(q):
+            product[i + j] += a * b
+    return product
+
+
+def _factorable(rng, level):
+    factors = [[1, _nonzero(rng, -9, 9)], [1, rng.randint(-9, 9)]]
+    if level >= 2:
+        factors[0][0] = rng.randint(1, 3)
+    if level == 3:
+        factors.append([1, _nonzero(rng, -6, 6)])
+    coefficients = [rng.randint(2, 4) if level == 3 and rng.random() < 0.5 else 1]
+    for f in factors:
+        coefficients = _multiply(coefficients, f)
+    text = display_text(coefficients)
+    sol = solvers.symbolic("factor", text, compute=get_pool().run)
+    result = sol.values["result"]
+    if not (result.is_Mul or result.is_Pow):
+        raise Rejected(sol.answer)
+    return text, sol.answer
+
+
+def _pythagorean(rng, level):
+    m_max = {1: 4, 2: 6, 3: 9}[level]
+    m = rng.randint(2, m_max)
+    n = rng.randint(1, m - 1)
+    if math.gcd(m, n) != 1 or (m - n) % 2 == 0:
+        raise Rejected("不是原始畢氏三元數")
+    k = 1 if level == 1 else rng.randint(1, 3)
+    a, b, c = k * (m * m - n * n), k * 2 * m * n, k * (m * m + n * n)
+    if rng.random() < 0.5:
+        a, b = b, a
+    ask_leg = level == 3 or (level == 2 and rng.random() < 0.5)
+    known = {"a": a, "c": c} if ask_leg else {"a": a, "b": b}
+    sol = solvers.pythagoras(**known)
+    if round(sol.values["value"], 9) != (b if ask_leg else c):
+        raise Rejected(sol.answer)
+    return ",".join(f"{name}={value}" for name, value in known.items()), sol.answer
+
+
+def _special_angle(rng, level):
+    if level == 1:
+        angle = rng.choice([0, 30, 45, 60, 90])
+    elif level == 2:
+        angle = rng.choice(sorted(set(range(0, 361, 30)) | set(range(0, 361, 45))))
+    else:
+        angle = 15 * rng.randint(-24, 48)
+    sol = solvers.trig_values(angle)
+    if sol.values["exact"] is None:
+        raise Rejected(sol.answer)
+    return f"{angle}°", sol.answer
+
+
+CATEGORIES = {
+    "二次方程": _quadratic,
+    "二元方程組": _system,
+    "因式分解": _factorable,
+    "畢氏定理": _pythagorean,
+    "三角函數": _special_angle,
+}
+
+
+def generate(category, difficulty, rng=random, avoid=()):
+    """產生一道驗證過的題目；avoid 中已有的題目會重抽，重抽 MAX_ATTEMPTS 次後接受重複。"""
+    make = CATEGORIES[category]
+    started = time.perf_counter()
+    candidate = None
+    for _ in range(MAX_ATTEMPTS):
+        try:
+            candidate = make(rng, difficulty)
+        except Rejected:
+            continue
+        if candidate[0] not in avoid:
+            break
+    if candidate is None:
+        raise RuntimeError(f"{category}（{DIFFICULTIES[difficulty]}）連續 {MAX_ATTEMPTS} 次產生失敗")
+    metrics.observe("math_practice_generate_seconds", time.perf_counter() - started, type=category)
+    return PracticeProblem(category, candidate[0], candidate[1], difficulty)
+
+
+class ProblemPool:
+    """每個 (題型, 難度) 一個題目池，由一條背景執行緒補到 size 題。"""
+
+    def __init__(self, size=POOL_SIZE, seed=None):
+        self.size = size
+        self._pools = {(c, d): deque() for c in CATEGORIES for d in DIFFICULTIES}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._wanted = threading.Event()
+        self._thread = None
+        self.served_from_pool = 0
+        self.generated_on_demand = 0
+        self.errors = 0
+        self.last_error = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._refill, name="practice-pool", daemon=True)
+                self._thread.start()
+        self._wanted.set()
+
+    def _neediest(self):
+        # 題目最少、且還沒補滿的池子
+        with self._lock:
+            key, pool = min(self._pools.items(), key=lambda item: len(item[1]))
+            return key if len(pool) < self.size else None
+
+    @staticmethod
+    def _pool_busy():
+        # 有工作在排隊，或每個工作程序都在算：讓使用者的題目先用
+        stats = get_pool().stats()
+        return stats["waiting"] > 0 or stats["running"] >= stats["workers"]
+
+    def _refill(self):
+        while True:
+            key = self._neediest()
+            if key is None:
+                self._wanted.wait()
+                self._wanted.clear()
+                continue
+            if self._pool_busy():
+                time.sleep(BACKOFF_SECONDS)
+                continue
+            with self._lock:
+                existing = {p.problem for p in self._pools[key]}
+            try:
+                problem = generate(*key, rng=self._rng, avoid=existing)
+            except (PoolBusy, ComputationTooExpensive):
+                # 工作程序池正忙著處理使用者的題目，稍後再補
+                time.sleep(BACKOFF_SECONDS)
+                continue
+            except Exception as e:
+                # 連續產生失敗（RuntimeError）或 sympy 的例外：記錄下來，背景執行緒不能因此結束
+                self.errors += 1
+                self.last_error = f"{key[0]}（{DIFFICULTIES[key[1]]}）{type(e).__name__}: {e}"
+                time.sleep(BACKOFF_SECONDS)
+                continue
+            with self._lock:
+                self._pools[key].append(problem)
+
+    def take(self, category, difficulty, count):
+        """取出 count 道題；池子裡不夠的部分當場產生。取題後通知背景執行緒補回去。"""
+        if category not in CATEGORIES:
+            raise ValueError(f"不支援的題型: {category}")
+        if difficulty not in DIFFICULTIES:
+            raise ValueError(f"難度必須是 {', '.join(map(str, DIFFICULTIES))}")
+        with self._lock:
+            pool = self._pools[(category, difficulty)]
+            problems = [pool.popleft() for _ in range(min(count, len(pool)))]
+        self.served_from_pool += len(problems)
+        rng = random.Random()
+        seen = {p.problem for p in problems}
+        while len(problems) < count:
+            problem = generate(category, difficulty, rng, avoid=seen)
+            seen.add(problem.problem)
+            problems.append(problem)
+            self.generated_on_demand += 1
+        self.start()
+        return problems
+
+    def worksheet(self, categories, difficulty, count):
+        """count 道題平均分給各題型，依題型順序排列。"""
+        if not categories:
+            raise ValueError("請至少選擇一種題型")
+        share, extra = divmod(count, len(categories))
+        problems = []
+        for i, category in enumerate(categories):
+            problems += self.take(category, difficulty, share + (i < extra))
+        return problems
+
+    def stats(self):
+        with self._lock:
+            sizes = {f"{c}/{DIFFICULTIES[d]}": len(pool) for (c, d), pool in self._pools.items()}
+        return {"size": self.size, "pools": sizes, "served_from_pool": self.served_from_pool,
+                "generated_on_demand": self.generated_on_demand, "errors": self.errors,
+                "last_error": self.last_error}
+
+
+_practice = None
+_practice_lock = threading.Lock()
+
+
+def get_practice():
+    """取得程序內共用的題目池；第一次取得時啟動背景補題。"""
+    global _practice
+    with _practice_lock:
+        if _practice is None:
+            _practice = ProblemPool()
+            _practice.start()
+        return _practice
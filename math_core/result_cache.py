@@ -0,0 +1,339 @@
+# result_cache.py - 跨 session 共用的 LRU 結果快取（因式分解／展開／化簡）
+#
+# 後端以環境變數 MATH_CACHE_URL 選擇：
+#   memory（預設）              程序內的 LRU，只在同一個程序的 session 之間共用
+#   sqlite:///path/cache.db     同一台機器上的多個程序共用一個檔案（cluster.py 的預設）
+#   redis://host:6379/0         Redis 或相容的伺服器，可跨機器共用（需另外安裝 redis 套件）
+# 共用後端的鍵由 key_text 產生，與程序無關；值以 pickle 儲存，只適合放在可信任的本機或內網。
+# memory 後端可以 save/load 快照檔，重新啟動後沿用（見 warmup.py 的 MATH_CACHE_SNAPSHOT）。
+import hashlib
+import os
+import pickle
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+
+# 記憶體預算（MB），可用環境變數 MATH_CACHE_MAX_MB 調整
+DEFAULT_MAX_MB = float(os.environ.get("MATH_CACHE_MAX_MB", "64"))
+DEFAULT_URL = os.environ.get("MATH_CACHE_URL", "memory")
+# Redis 項目的存活秒數；容量上限交給伺服器的 maxmemory 設定
+DEFAULT_TTL = int(os.environ.get("MATH_CACHE_TTL", str(7 * 24 * 3600)))
+# 鍵格式或值的內容改變時調高，舊的共用項目就不會再被讀到
+KEY_VERSION = 1
+
+
+def key_text(key):
+    """(運算, srepr) 轉成各程序一致的字串鍵。
+
+    不用 hash()：每個程序的字串雜湊種子不同。sympy 版本也放進鍵裡，升級時不會讀到舊版 pickle。
+    """
+    import sympy as sp
+
+    op, text = key
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return f"math:v{KEY_VERSION}:{sp.__version__}:{op}:{digest}"
+
+
+def _snapshot_version():
+    import sympy as sp
+
+    return KEY_VERSION, sp.__version__
+
+
+def _entry_size(key, value):
+    import sympy as sp
+
+    # 粗估一筆快取佔用的位元組數：鍵字串 + 結果的 srepr
+    return sys.getsizeof(key[0]) + sys.getsizeof(key[1]) + sys.getsizeof(sp.srepr(value))
+
+
+class ResultCache:
+    """以（運算, 正規化表達式）為鍵、依記憶體預算做 LRU 淘汰的快取。"""
+
+    def __init__(self, max_bytes=int(DEFAULT_MAX_MB * 1024 * 1024)):
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()
+        self._sizes = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # 寫入次數；快照只在有變動時才重寫
+        self.writes = 0
+
+    @staticmethod
+    def make_key(op, expr):
+        import sympy as sp
+
+        # sympy 解析後的參數順序已正規化，srepr 可作為穩定鍵
+        # 例如 "x**2 - 4" 與 "-4 + x**2" 會得到同一個鍵
+        return (op, sp.srepr(expr))
+
+    def get(self, key):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return True, self._data[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key, value):
+        size = _entry_size(key, value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._data:
+                self._bytes -= self._sizes.pop(key)
+                del self._data[key]
+            self._data[key] = value
+            self._sizes[key] = size
+            self._bytes += size
+            self.writes += 1
+            while self._bytes > self.max_bytes:
+                old_key, _ = self._data.popitem(last=False)
+                self._bytes -= self._sizes.pop(old_key)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._sizes.clear()
+            self._bytes = 0
+            self.writes += 1
+
+    def save(self, path):
+        """寫出快照檔（依最久沒用到 → 最近用到的順序）；先寫暫存檔再改名，中途被終止也不會留下壞檔。"""
+        with self._lock:
+            items = list(self._data.items())
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump({"version": _snapshot_version(), "items": items}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        return len(items)
+
+    def load(self, path):
+        """載入快照檔；檔案不存在、損壞或 sympy 版本不同時略過。回傳載入的筆數。"""
+        try:
+            with open(path, "rb") as f:
+                snapshot = pickle.load(f)
+        except Exception:
+            # 沒有快照（第一次啟動）或快照已損壞，都從空的快取開始
+            return 0
+        if not isinstance(snapshot, dict) or snapshot.get("version") != _snapshot_version():
+            return 0
+        for key, value in snapshot["items"]:
+            self.put(key, value)
+        return len(snapshot["items"])
+
+    def stats(self):
+        with self._lock:
+            return _stats("memory", len(self._data), self._bytes, self.max_bytes,
+                          self.hits, self.misses, self.evictions)
+
+
+def _stats(backend, entries, size, max_bytes, hits, misses, evictions):
+    total = hits + misses
+    return {
+        "backend": backend,
+        "entries": entries,
+        "bytes": size,
+        "max_bytes": max_bytes,
+        "hits": hits,
+        "misses": misses,
+        "evictions": evictions,
+        "hit_rate": hits / total if total else 0.0,
+    }
+
+
+_SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS result_cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    used REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_result_cache_used ON result_cache(used);
+
+CREATE TABLE IF NOT EXISTS result_cache_size (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    entries INTEGER NOT NULL,
+    bytes INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO result_cache_size (id, entries, bytes) VALUES (0, 0, 0);
+
+CREATE TRIGGER IF NOT EXISTS trg_result_cache_insert AFTER INSERT ON result_cache BEGIN
+    UPDATE result_cache_size SET entries = entries + 1, bytes = bytes + NEW.size WHERE id = 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_result_cache_delete AFTER DELETE ON result_cache BEGIN
+    UPDATE result_cache_size SET entries = entries - 1, bytes = bytes - OLD.size WHERE id = 0;
+END;
+"""
+
+# 命中時最多每隔這麼多秒才寫回一次使用時間，避免每次讀取都搶寫入鎖
+_TOUCH_INTERVAL = 60.0
+# 超過預算時每次淘汰的筆數
+_EVICT_BATCH = 32
+
+
+class SQLiteResultCache:
+    """同一台機器上多個程序共用的快取檔；超過預算時淘汰最久沒用到的項目。"""
+
+    def __init__(self, path, max_bytes=int(DEFAULT_MAX_MB * 1024 * 1024)):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._connect().executescript(_SQLITE_SCHEMA)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def get(self, key):
+        text = key_text(key)
+        conn = self._connect()
+        row = conn.execute("SELECT value, used FROM result_cache WHERE key = ?", (text,)).fetchone()
+        if row is None:
+            self._count("misses")
+            return False, None
+        self._count("hits")
+        now = time.time()
+        if now - row[1] > _TOUCH_INTERVAL:
+            with conn:
+                conn.execute("UPDATE result_cache SET used = ? WHERE key = ?", (now, text))
+        return True, pickle.loads(row[0])
+
+    def put(self, key, value):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(blob) > self.max_bytes:
+            return
+        text = key_text(key)
+        conn = self._connect()
+        with conn:
+            # 先刪再插，讓 trigger 正確維護總大小（INSERT OR REPLACE 不會觸發刪除的 trigger）
+            conn.execute("DELETE FROM result_cache WHERE key = ?", (text,))
+            conn.execute("INSERT INTO result_cache (key, value, size, used) VALUES (?, ?, ?, ?)",
+                         (text, blob, len(blob), time.time()))
+            while conn.execute("SELECT bytes FROM result_cache_size").fetchone()[0] > self.max_bytes:
+                removed = conn.execute(
+                    "DELETE FROM result_cache WHERE key IN "
+                    "(SELECT key FROM result_cache ORDER BY used LIMIT ?)", (_EVICT_BATCH,)).rowcount
+                with self._lock:
+                    self.evictions += removed
+
+    def clear(self):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM result_cache")
+
+    def stats(self):
+        # 筆數與總大小由 trigger 維護，側邊欄每次重新執行都讀也不必掃表
+        entries, size = self._connect().execute("SELECT entries, bytes FROM result_cache_size").fetchone()
+        with self._lock:
+            return _stats("sqlite", entries, size, self.max_bytes, self.hits, self.misses, self.evictions)
+
+
+class RedisResultCache:
+    """Redis（或相容伺服器）上的共用快取；連線失敗時當作未命中，不影響解題。"""
+
+    def __init__(self, url, ttl=DEFAULT_TTL):
+        import redis
+
+        self._redis = redis
+        self._client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def get(self, key):
+        try:
+            blob = self._client.get(key_text(key))
+        except self._redis.RedisError:
+            self._count("errors")
+            blob = None
+        if blob is None:
+            self._count("misses")
+            return False, None
+        self._count("hits")
+        return True, pickle.loads(blob)
+
+    def put(self, key, value):
+        try:
+            self._client.set(key_text(key), pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), ex=self.ttl)
+        except self._redis.RedisError:
+            self._count("errors")
+
+    def clear(self):
+        keys = list(self._client.scan_iter(match=f"math:v{KEY_VERSION}:*", count=1000))
+        if keys:
+            self._client.delete(*keys)
+
+    def stats(self):
+        try:
+            entries = self._client.dbsize()
+            info = self._client.info("memory")
+            size, max_bytes = info.get("used_memory", 0), info.get("maxmemory", 0)
+        except self._redis.RedisError:
+            entries = size = max_bytes = 0
+        with self._lock:
+            result = _stats("redis", entries, size, max_bytes, self.hits, self.misses, 0)
+            result["errors"] = self.errors
+            return result
+
+
+def make_cache(url=DEFAULT_URL):
+    """依位址建立快取後端：memory、sqlite:///路徑 或 redis://…。"""
+    if url in ("", "memory"):
+        return ResultCache()
+    if url.startswith("sqlite:///"):
+        return SQLiteResultCache(url[len("sqlite:///"):])
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisResultCache(url)
+    raise ValueError(f"不支援的快取位址: {url}")
+
+
+# 程序內共用的單一實例（模組只會被 import 一次，所有 session 共用）
+result_cache = make_cache()
+
+
+def cached_operation(op, text, compute=None):
+    """解析表達式字串並執行 factor/expand/simplify，結果走共用快取。
+
+    compute(op, expr) 只在快取未命中時呼叫，可換成工作程序池的 run。
+    """
+    # 延遲載入 sympy：側邊欄只讀統計數字時不需要它
+    from math_core.algebra import apply_operation, parse_expression
+
+    compute = compute or apply_operation
+    expr = parse_expression(text)
+    key = ResultCache.make_key(op, expr)
+    found, value = result_cache.get(key)
+    if found:
+        return value
+    value = compute(op, expr)
+    result_cache.put(key, value)
+    return value
@@ -0,0 +1,336 @@
+# session_memory.py - 各 session 暫存結果的記憶體預算：每個 session 與整個程序各有上限
+#
+# 所有 session 都在同一個 Streamlit 程序裡，若把批次結果、練習卷、各區塊的解答都直接放在
+# st.session_state，上百位學生同時使用時記憶體會一直成長到容器被 OOM 終止。
+# 這裡的 SessionMemory 依 (session, 名稱) 保存這些結果並估算大小，超過上限時由最久沒用到的項目開始移出：
+# RecordTable（批次結果、批改結果、練習卷）寫到磁碟，之後用到再讀回；解答與表格等可重算的結果直接丟掉。
+# 閒置超過 MATH_SESSION_IDLE_SECONDS 的 session 連同磁碟上的檔案一起清除。
+#
+# 以環境變數設定：
+#   MATH_SESSION_MAX_MB        每個 session 的上限（預設 16）
+#   MATH_SESSIONS_MAX_MB       所有 session 合計的上限（預設 256）
+#   MATH_SESSION_SPILL_DIR     移出到磁碟的目錄（預設在第一次移出時以 mkdtemp 建立私有的暫存目錄）；
+#                              檔案以 pickle 讀回，目錄必須屬於本程序的使用者且其他人無法讀寫
+#   MATH_SESSION_IDLE_SECONDS  閒置多久後清除整個 session（預設 3600）
+import atexit
+import os
+import pickle
+import re
+import shutil
+import stat
+import sys
+import tempfile
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+SESSION_MAX_MB = float(os.environ.get("MATH_SESSION_MAX_MB", "16"))
+TOTAL_MAX_MB = float(os.environ.get("MATH_SESSIONS_MAX_MB", "256"))
+SPILL_DIR = os.environ.get("MATH_SESSION_SPILL_DIR", "")
+IDLE_SECONDS = float(os.environ.get("MATH_SESSION_IDLE_SECONDS", "3600"))
+# 估算巢狀容器大小時最多往下幾層
+_MAX_DEPTH = 6
+# 最多每隔這麼多秒才檢查一次閒置的 session
+_SWEEP_INTERVAL = 60.0
+_UNSAFE_NAME = re.compile(r"[^0-9A-Za-z_.-]")
+
+
+class RecordTable:
+    """欄位式的紀錄表，取代「每列一個 dict」的寫法。
+
+    每欄一個串列，不必每列重複存放「類型」「問題」等欄名；標籤欄（題型、批改結果）在表內只存一份字串，
+    各列存 array 裡的編號；數值欄存成 array('d')。to_frame() 轉成畫面用的 DataFrame。
+    """
+
+    __slots__ = ("columns", "labels", "numbers", "_data", "_names", "_codes")
+
+    def __init__(self, columns, labels=(), numbers=()):
+        self.columns = tuple(columns)
+        self.labels = frozenset(labels)
+        self.numbers = frozenset(numbers)
+        self._data = {c: array("I") if c in self.labels else array("d") if c in self.numbers else []
+                      for c in self.columns}
+        self._names = {c: [] for c in self.labels}   # 標籤欄：編號 → 字串
+        self._codes = {c: {} for c in self.labels}   # 標籤欄：字串 → 編號
+
+    @classmethod
+    def from_rows(cls, rows, columns, labels=(), numbers=()):
+        table = cls(columns, labels, numbers)
+        table.extend(rows)
+        return table
+
+    def append(self, row):
+        """row 為以欄名為鍵的 dict；缺少的欄位視為空字串（數值欄為 nan）。"""
+        for c in self.columns:
+            value = row.get(c)
+            if c in self.labels:
+                text = "" if value is None else str(value)
+                codes = self._codes[c]
+                if text not in codes:
+                    codes[text] = len(self._names[c])
+                    self._names[c].append(text)
+                self._data[c].append(codes[text])
+            elif c in self.numbers:
+                self._data[c].append(float("nan") if value is None else float(value))
+            else:
+                self._data[c].append("" if value is None else str(value))
+
+    def extend(self, rows):
+        for row in rows:
+            self.append(row)
+
+    def __len__(self):
+        return len(self._data[self.columns[0]]) if self.columns else 0
+
+    def column(self, name):
+        if name in self.labels:
+            names = self._names[name]
+            return [names[code] for code in self._data[name]]
+        return list(self._data[name])
+
+    def rows(self):
+        columns = [self.column(c) for c in self.columns]
+        for values in zip(*columns):
+            yield dict(zip(self.columns, values))
+
+    def to_frame(self):
+        import pandas as pd
+
+        return pd.DataFrame({c: self.column(c) for c in self.columns}, columns=list(self.columns))
+
+    @property
+    def nbytes(self):
+        size = sys.getsizeof(self._data)
+        for values in self._data.values():
+            size += sys.getsizeof(values) + (sum(map(sys.getsizeof, values)) if isinstance(values, list) else 0)
+        for c in self.labels:
+            names = self._names[c]
+            size += sys.getsizeof(names) + sys.getsizeof(self._codes[c]) + sum(map(sys.getsizeof, names))
+        return size
+
+
+def sizeof(value, _depth=0, _seen=None):
+    """粗估 value 佔用的位元組數（巢狀容器與物件屬性往下估 _MAX_DEPTH 層，共用的物件只算一次）。"""
+    seen = set() if _seen is None else _seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    if isinstance(value, RecordTable):
+        return value.nbytes
+    if hasattr(value, "memory_usage") and hasattr(value, "columns"):  # pandas DataFrame
+        return int(value.memory_usage(deep=True).sum())
+    if hasattr(value, "nbytes") and hasattr(value, "dtype"):  # numpy 陣列
+        return int(value.nbytes)
+    size = sys.getsizeof(value)
+    if _depth >= _MAX_DEPTH or isinstance(value, (str, bytes, bytearray, int, float, complex)):
+        return size
+    if isinstance(value, dict):
+        items = [v for pair in value.items() for v in pair]
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        items = value
+    elif hasattr(value, "__dict__"):
+        items = [vars(value)]
+    else:
+        return size
+    return size + sum(sizeof(item, _depth + 1, seen) for item in items)
+
+
+class _Entry:
+    __slots__ = ("value", "size", "path")
+
+    def __init__(self, value, size, path=None):
+        self.value = value
+        self.size = size
+        self.path = path  # 移出到磁碟時的檔案；value 此時為 None
+
+
+class SessionMemory:
+    """依 (session, 名稱) 保存暫存結果，維持每個 session 與全部 session 的記憶體上限。
+
+    剛寫入或讀取的項目不會被移出，單一項目超過上限時會暫時超出，直到下一次寫入。
+    """
+
+    def __init__(self, session_bytes=int(SESSION_MAX_MB * 1024 * 1024),
+                 total_bytes=int(TOTAL_MAX_MB * 1024 * 1024), spill_dir=SPILL_DIR, idle_seconds=IDLE_SECONDS):
+        self.session_bytes = session_bytes
+        self.total_bytes = total_bytes
+        self.spill_dir = spill_dir  # 空字串表示第一次移出時再建立私有的暫存目錄
+        self.idle_seconds = idle_seconds
+        self._sessions = {}  # session → OrderedDict(名稱 → _Entry)，依最近使用排序
+        self._bytes = {}     # session → 記憶體中項目的大小合計
+        self._used = {}      # session → 最後使用時間
+        self._total = 0
+        self._lock = threading.RLock()
+        self._swept = time.monotonic()
+        self.spilled = 0
+        self.dropped = 0
+        self.reloaded = 0
+        self.expired = 0
+
+    def get(self, session, name, default=None):
+        with self._lock:
+            entries = self._sessions.get(session)
+            entry = entries.get(name) if entries else None
+            if entry is None:
+                return default
+            self._used[session] = time.monotonic()
+            entries.move_to_end(name)
+            if entry.value is None:
+                try:
+                    self._reload(session, entry)
+                except (OSError, pickle.UnpicklingError, EOFError):
+                    # 磁碟上的檔案不見或損壞，當作沒有這筆結果
+                    del entries[name]
+                    return default
+                self._enforce(session, keep=name)
+            return entry.value
+
+    def put(self, session, name, value):
+        size = sizeof(value)
+        with self._lock:
+            self._sweep()
+            self.pop(session, name)
+            entries = self._sessions.setdefault(session, OrderedDict())
+            entries[name] = _Entry(value, size)
+            self._add(session, size)
+            self._used[session] = time.monotonic()
+            self._enforce(session, keep=name)
+
+    def pop(self, session, name):
+        with self._lock:
+            entries = self._sessions.get(session)
+            entry = entries.pop(name, None) if entries else None
+            if entry is not None:
+                self._release(session, entry)
+
+    def clear(self, session):
+        with self._lock:
+            for entry in self._sessions.pop(session, {}).values():
+                self._release(session, entry)
+            self._bytes.pop(session, None)
+            self._used.pop(session, None)
+
+    def _add(self, session, size):
+        self._bytes[session] = self._bytes.get(session, 0) + size
+        self._total += size
+
+    def _release(self, session, entry):
+        if entry.value is not None:
+            self._add(session, -entry.size)
+        elif entry.path:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+    def _private_dir(self):
+        # 讀回時用 pickle.load，別人能寫入的目錄等於讓別人在本程序裡執行任意程式碼
+        if not self.spill_dir:
+            self.spill_dir = tempfile.mkdtemp(prefix="math_sessions-")
+            atexit.register(shutil.rmtree, self.spill_dir, True)
+            return self.spill_dir
+        os.makedirs(self.spill_dir, mode=0o700, exist_ok=True)
+        info = os.lstat(self.spill_dir)
+        owner_ok = not hasattr(os, "getuid") or info.st_uid == os.getuid()
+        if not stat.S_ISDIR(info.st_mode) or not owner_ok or info.st_mode & 0o077:
+            raise PermissionError(f"{self.spill_dir} 必須是本使用者擁有、權限為 700 的目錄")
+        return self.spill_dir
+
+    def _path(self, session, name):
+        return os.path.join(self._private_dir(), _UNSAFE_NAME.sub("_", f"{session}-{name}") + ".pkl")
+
+    def _evict(self, session, name):
+        entry = self._sessions[session][name]
+        self._add(session, -entry.size)
+        if isinstance(entry.value, RecordTable):
+            # 表格寫到磁碟，之後用到再讀回；寫不進去時（磁碟滿了）只好丟掉
+            try:
+                path = self._path(session, name)
+                with open(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "wb") as f:
+                    pickle.dump(entry.value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            except OSError:
+                del self._sessions[session][name]
+                self.dropped += 1
+                return
+            entry.path = path
+            entry.value = None
+            self.spilled += 1
+        else:
+            # 解答、DataFrame 等可以重算的結果直接丟掉
+            del self._sessions[session][name]
+            self.dropped += 1
+
+    def _reload(self, session, entry):
+        with open(entry.path, "rb") as f:
+            entry.value = pickle.load(f)
+        os.remove(entry.path)
+        entry.path = None
+        self._add(session, entry.size)
+        self.reloaded += 1
+
+    def _oldest(self, sessions, keep):
+        # 在 sessions 之中找最久沒用到、仍在記憶體裡的項目；各 session 內依使用順序排列
+        for session in sorted(sessions, key=lambda s: self._used.get(s, 0.0)):
+            for name, entry in self._sessions[session].items():
+                if entry.value is not None and (session, name) != keep:
+                    return session, name
+        return None
+
+    def _enforce(self, session, keep):
+        keep = (session, keep)
+        while self._bytes.get(session, 0) > self.session_bytes:
+            victim = self._oldest([session], keep)
+            if victim is None:
+                break
+            self._evict(*victim)
+        while self._total > self.total_bytes:
+            victim = self._oldest(list(self._sessions), keep)
+            if victim is None:
+                break
+            self._evict(*victim)
+
+    def _sweep(self):
+        now = time.monotonic()
+        if now - self._swept < _SWEEP_INTERVAL:
+            return
+        self._swept = now
+        for session in [s for s, used in self._used.items() if now - used > self.idle_seconds]:
+            self.clear(session)
+            self.expired += 1
+
+    def usage(self, session):
+        """session 的用量：記憶體中的位元組數、上限、項目數與已移到磁碟的項目數。"""
+        with self._lock:
+            entries = self._sessions.get(session, {})
+            return {
+                "bytes": self._bytes.get(session, 0),
+                "max_bytes": self.session_bytes,
+                "entries": len(entries),
+                "on_disk": sum(entry.value is None for entry in entries.values()),
+            }
+
+    def stats(self):
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "bytes": self._total,
+                "max_bytes": self.total_bytes,
+                "spilled": self.spilled,
+                "reloaded": self.reloaded,
+                "dropped": self.dropped,
+                "expired": self.expired,
+            }
+
+
+_memory = None
+_memory_lock = threading.Lock()
+
+
+def get_session_memory():
+    """取得程序內共用的 session 記憶體管理。"""
+    global _memory
+    with _memory_lock:
+        if _memory is None:
+            _memory = SessionMemory()
+        return _memory
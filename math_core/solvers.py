@@ -0,0 +1,334 @@
+# solvers.py - 所有題型的解題函數（不依賴 Streamlit，可直接 import、測試與量測）
+#
+# 每個函數回傳 Solution：類型／問題／解答三個字串與歷史記錄的欄位一致，
+# values 則放畫面需要的數值。numpy 與 sympy 只在用到的函數裡才載入。
+# 解題步驟由 explain 在第一次讀取 Solution.steps 時才產生，沿用解題時已算出的中間結果。
+# 執行時間依類型記錄在 math_core.metrics 的 math_solver_seconds。
+import functools
+import math
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional, Sequence
+
+from math_core import special_angles, steps
+from math_core.closed_form import (
+    format_approx, format_roots, singular_system_status, solve_linear, solve_quadratic, solve_system_2x2,
+    to_fraction,
+)
+from math_core.metrics import metrics
+
+# 線性方程組的解答欄最多列出幾個未知數（完整的解在 values["solution"]）
+ANSWER_TERMS = 10
+
+SYMBOLIC_LABELS = {
+    "factor": "因式分解",
+    "expand": "表達式展開",
+    "simplify": "表達式化簡",
+}
+
+
+@dataclass(frozen=True)
+class Solution:
+    prob_type: str
+    problem: str
+    answer: str
+    values: Dict[str, Any] = field(default_factory=dict)
+    explain: Optional[Callable[[], Sequence[steps.Step]]] = field(default=None, repr=False, compare=False)
+
+    @functools.cached_property
+    def steps(self):
+        """解題步驟；第一次讀取時才呼叫 explain 產生，之後沿用同一份。"""
+        return tuple(self.explain()) if self.explain else ()
+
+
+def _timed(prob_type):
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with metrics.timer("math_solver_seconds", type=prob_type):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# ========== 代數 ==========
+@_timed("二次方程")
+def quadratic(a: float, b: float, c: float) -> Solution:
+    if a == 0:
+        raise ValueError("係數 a 不能為 0！")
+    roots = solve_quadratic(a, b, c)
+    # 係數不是有限實數時由 sympy 求解，沒有公式解的步驟
+    finite = all(math.isfinite(v) for v in (a, b, c))
+    return Solution("二次方程", f"{a}x²+{b}x+{c}=0", format_roots(roots),
+                    {"roots": roots, "approx": format_approx(roots), "discriminant": b**2 - 4*a*c},
+                    explain=(lambda: steps.quadratic(a, b, c, roots)) if finite else None)
+
+
+def quadratic_text(a: float, b: float, c: float) -> str:
+    """以精確分數係數寫出 ax² + bx + c，供繪圖解析（1.0 → 1、0.1 → 1/10）。"""
+    a, b, c = (to_fraction(v) for v in (a, b, c))
+    return f"({a})*x**2 + ({b})*x + ({c})"
+
+
+@_timed("一次方程")
+def linear(a: float, b: float) -> Solution:
+    if a == 0:
+        raise ValueError("係數 a 不能為 0！")
+    x = float(solve_linear(a, b))
+    return Solution("一次方程", f"{a}x+{b}=0", f"x={x:.4f}", {"x": x}, explain=lambda: steps.linear(a, b))
+
+
+@_timed("二元方程組")
+def system_2x2(a1: float, b1: float, c1: float, a2: float, b2: float, c2: float) -> Solution:
+    """行列式為 0 時 values["status"] 區分 "none"（無解）與 "infinite"（無限多解）。"""
+    solution = solve_system_2x2(a1, b1, c1, a2, b2, c2)
+    if solution:
+        (x, y), status = solution, "unique"
+        answer = f"{{x: {x}, y: {y}}}"
+    else:
+        x = y = None
+        status = singular_system_status(a1, b1, c1, a2, b2, c2)
+        answer = "無解" if status == "none" else "無限多解"
+    return Solution("二元方程組", f"({a1},{b1},{c1}),({a2},{b2},{c2})", answer,
+                    {"x": x, "y": y, "status": status},
+                    explain=lambda: steps.system_2x2(a1, b1, c1, a2, b2, c2))
+
+
+@_timed("線性方程組")
+def linear_system(matrix, constants, names=None, method: Optional[str] = None) -> Solution:
+    """n 元一次方程組；method 為 None（自動）、"exact" 或 "numpy"，見 math_core.linear_systems。"""
+    from math_core import linear_systems
+
+    # 精確法順便記下列運算，解題步驟直接沿用，不必再消去一次
+    record = []
+    result = linear_systems.solve(matrix, constants, method, record)
+    m, n = len(matrix), len(matrix[0])
+    names = list(names or linear_systems.variable_names(n))
+    if m * n <= linear_systems.EXACT_LIMIT:
+        problem = "; ".join(linear_systems.equation_text(row, c, names) for row, c in zip(matrix, constants))
+    else:
+        problem = f"{m} 個方程式、{n} 個未知數"
+    general = None
+    if result.status == "unique":
+        shown = [f"{name}={linear_systems.format_number(v)}" for name, v in zip(names, result.solution)]
+        answer = ", ".join(shown[:ANSWER_TERMS]) + (", …" if n > ANSWER_TERMS else "")
+    elif result.status == "infinite" and result.method == "exact":
+        general = linear_systems.general_solution(result, names)
+        answer = "; ".join(general[:ANSWER_TERMS]) + ("; …" if n > ANSWER_TERMS else "")
+    elif result.status == "infinite":
+        answer = f"無限多解（{n - result.rank} 個自由變數）"
+    else:
+        answer = "無解"
+    return Solution("線性方程組", problem, answer,
+                    {"status": result.status, "rank": result.rank, "augmented_rank": result.augmented_rank,
+                     "solution": result.solution, "names": names, "method": result.method,
+                     "residual": result.residual, "general": general},
+                    explain=lambda: steps.linear_system(matrix, names, result, record))
+
+
+@_timed("多項式方程")
+def polynomial(coefficients, variable: str = "x", method: Optional[str] = None,
+               compute: Optional[Callable] = None) -> Solution:
+    """任意次數的多項式方程，係數由最高次往下排；method 為 None（自動）、"exact" 或 "numpy"。
+
+    精確解經過 compute 與共用快取；自動選擇時精確解超時會改用數值解，見 math_core.polynomials。
+    """
+    from math_core import polynomials
+    from math_core.algebra import apply_operation
+    from math_core.result_cache import cached_operation
+    from math_core.worker_pool import ComputationTooExpensive
+
+    coefficients = polynomials.normalize(coefficients)
+    if method not in (None, "exact", "numpy"):
+        raise ValueError(f"不支援的解法: {method}")
+    text = polynomials.expression_text(coefficients, variable)
+    result = None
+    if method == "exact" or (method is None and polynomials.exact_ok(coefficients)):
+        try:
+            result = cached_operation("poly_roots", text, compute=compute or apply_operation)
+        except ComputationTooExpensive:
+            if method == "exact":
+                raise
+    if result is None:
+        result = polynomials.numeric_roots(coefficients)
+
+    degree = result.degree
+    if degree <= ANSWER_TERMS:
+        problem = f"{polynomials.display_text(coefficients, variable)} = 0"
+    else:
+        problem = f"{degree} 次多項式方程"
+    shown = []
+    for i, (z, k) in enumerate(zip(result.roots, result.multiplicities)):
+        root = str(result.exact[i]) if result.exact else polynomials.format_root(z)
+        shown.append(root + (f"（{k} 重根）" if k > 1 else ""))
+    sign = "=" if result.exact else "≈"
+    answer = f"{variable} {sign} " + ", ".join(shown[:ANSWER_TERMS]) + (", …" if len(shown) > ANSWER_TERMS else "")
+    return Solution("多項式方程", problem, answer,
+                    {"roots": result.roots, "multiplicities": result.multiplicities, "method": result.method,
+                     "exact": result.exact, "radii": result.radii, "real_roots": result.real_roots,
+                     "degree": degree, "variable": variable},
+                    explain=lambda: steps.polynomial(result, variable))
+
+
+def symbolic(op: str, text: str, compute: Optional[Callable] = None) -> Solution:
+    """factor / expand / simplify；compute(op, expr) 可換成工作程序池的 run。
+
+    步驟（{op}_steps）同樣經過 compute 與共用快取，超時會丟出 ComputationTooExpensive。
+    """
+    from math_core.algebra import apply_operation
+    from math_core.result_cache import cached_operation
+
+    compute = compute or apply_operation
+    with metrics.timer("math_solver_seconds", type=SYMBOLIC_LABELS.get(op, op)):
+        result = cached_operation(op, text, compute=compute)
+    return Solution(SYMBOLIC_LABELS[op], text, str(result), {"result": result},
+                    explain=lambda: cached_operation(f"{op}_steps", text, compute=compute))
+
+
+@_timed("表達式求值")
+def evaluate(text: str, xs) -> Solution:
+    """把 xs 的每個值代入單變數表達式；編譯好的 NumPy 函數依表達式快取，見 plotting.compile_expression。"""
+    import numpy as np
+
+    from math_core import plotting
+    from math_core.algebra import parse_expression
+
+    expr = parse_expression(text)
+    xs = np.asarray(xs, dtype=float)
+    ys = plotting.evaluate_points(expr, xs)
+    var = str(plotting.compile_expression(expr)[0])
+    shown = [f"{var}={x:g}: " + (f"{y:.6g}" if np.isfinite(y) else "無定義") for x, y in zip(xs[:ANSWER_TERMS], ys)]
+    answer = "; ".join(shown) + ("; …" if len(xs) > ANSWER_TERMS else "")
+    defined = int(np.isfinite(ys).sum())
+    return Solution("表達式求值", f"{text}（{len(xs)} 個點）", answer,
+                    {"x": xs, "y": ys, "variable": var, "defined": defined},
+                    explain=lambda: steps.evaluate(expr, var, len(xs), defined))
+
+
+# ========== 幾何 ==========
+@_timed("三角形面積")
+def triangle_area(base: float, height: float) -> Solution:
+    from math_core import geometry
+
+    area = geometry.triangle_area(base, height)
+    return Solution("三角形面積", f"底={base},高={height}", f"{area}", {"area": area},
+                    explain=lambda: steps.triangle_area(base, height, area))
+
+
+@_timed("長方形面積")
+def rect_area(length: float, width: float) -> Solution:
+    from math_core import geometry
+
+    area = geometry.rect_area(length, width)
+    return Solution("長方形面積", f"長={length},寬={width}", f"{area}", {"area": area},
+                    explain=lambda: steps.rect_area(length, width, area))
+
+
+def _two_sides(a, b, c):
+    # 已知兩邊：回傳 (已知邊名稱, 未知邊名稱)，並檢查斜邊大於直角邊
+    known = [name for name, v in (("a", a), ("b", b), ("c", c)) if v is not None]
+    if len(known) != 2:
+        raise ValueError("請輸入剛好兩個邊長")
+    if "c" in known:
+        leg_value = a if a is not None else b
+        if c <= leg_value:
+            raise ValueError("斜邊必須大於直角邊！")
+    unknown = ({"a", "b", "c"} - set(known)).pop()
+    return known, unknown
+
+
+@_timed("畢氏定理")
+def pythagoras(a: Optional[float] = None, b: Optional[float] = None,
+               c: Optional[float] = None) -> Solution:
+    from math_core import geometry
+
+    known, unknown = _two_sides(a, b, c)
+    sides = {"a": a, "b": b, "c": c}
+    if unknown == "c":
+        value = geometry.hypotenuse(a, b)
+    else:
+        value = geometry.leg(c, sides[known[0]])
+    problem = ",".join(f"{name}={sides[name]}" for name in known)
+    return Solution("畢氏定理", problem, f"{unknown}={value:.4f}", {"side": unknown, "value": value},
+                    explain=lambda: steps.pythagoras(a, b, c, unknown, value))
+
+
+@_timed("圓面積")
+def circle_area(radius: float) -> Solution:
+    from math_core import geometry
+
+    area = geometry.circle_area(radius)
+    return Solution("圓面積", f"半徑={radius}", f"{area:.4f}", {"area": area},
+                    explain=lambda: steps.circle_area(radius, area))
+
+
+@_timed("圓周長")
+def circle_circumference(radius: float) -> Solution:
+    from math_core import geometry
+
+    circumference = geometry.circle_circumference(radius)
+    return Solution("圓周長", f"半徑={radius}", f"{circumference:.4f}", {"circumference": circumference},
+                    explain=lambda: steps.circle_circumference(radius, circumference))
+
+
+# ========== 三角函數 ==========
+@_timed("角度轉換")
+def convert_angle(value: float, from_degrees: bool = True) -> Solution:
+    """15° 的倍數轉成 kπ/12 的精確寫法，values["exact"] 為該文字（不是特殊角時為 None）。"""
+    k = special_angles.multiple(value, from_degrees)
+    if from_degrees:
+        problem = f"{value}°"
+        if k is not None:
+            exact = special_angles.radians_text(k)
+            answer, result = f"{exact}弧度", k * math.pi / 12
+        else:
+            from math_core import trigonometry
+
+            exact, result = None, trigonometry.to_radians(value)
+            answer = f"{result:.6f}弧度"
+    else:
+        problem = f"{value}弧度"
+        if k is not None:
+            exact, result = f"{15 * k}°", float(15 * k)
+            answer = exact
+        else:
+            from math_core import trigonometry
+
+            exact, result = None, trigonometry.to_degrees(value)
+            answer = f"{result:.6f}°"
+    return Solution("角度轉換", problem, answer, {"result": result, "exact": exact},
+                    explain=lambda: steps.convert_angle(value, from_degrees, result, exact))
+
+
+@_timed("三角函數")
+def trig_values(angle: float, degrees: bool = True) -> Solution:
+    """tan 未定義時 values["tan"] 為 None；特殊角先查表，values["exact"] 為 sin/cos/tan 的精確寫法。"""
+    angle_str = f"{angle}°" if degrees else f"{angle}弧度"
+    entry = special_angles.lookup(angle, degrees)
+    if entry is not None:
+        answer = f"sin={entry.sin},cos={entry.cos}"
+        values = {"sin": entry.sin_value, "cos": entry.cos_value,
+                  "tan": None if entry.tan is None else entry.tan_value,
+                  "exact": {"sin": entry.sin, "cos": entry.cos, "tan": entry.tan}}
+    else:
+        from math_core import trigonometry
+
+        sin_val, cos_val, tan_val = trigonometry.trig_values(angle, degrees)
+        answer = f"sin={sin_val:.4f},cos={cos_val:.4f}"
+        values = {"sin": sin_val, "cos": cos_val, "tan": None if math.isnan(tan_val) else tan_val,
+                  "exact": None}
+    return Solution("三角函數", angle_str, answer, values,
+                    explain=lambda: steps.trig_values(angle, degrees, values))
+
+
+@_timed("解直角三角形")
+def right_triangle(a: Optional[float] = None, b: Optional[float] = None,
+                   c: Optional[float] = None) -> Solution:
+    from math_core import trigonometry
+
+    known, unknown = _two_sides(a, b, c)
+    sides = {"a": a, "b": b, "c": c}
+    rt = trigonometry.solve_right_triangle(**sides)
+    problem = ",".join(f"{name}={sides[name]}" for name in known)
+    answer = f"{unknown}={rt[unknown]:.2f},A={rt['A']:.1f}°,B={rt['B']:.1f}°"
+    values = dict(rt, side=unknown)
+    return Solution("解直角三角形", problem, answer, values, explain=lambda: steps.right_triangle(a, b, c, values))
@@ -0,0 +1,91 @@
+# special_angles.py - 15°（π/12）倍數角的精確三角函數值表
+#
+# 學生輸入的角度幾乎都是 0°、30°、45°、60°、90° 與它們的倍數。表在 import 時建好，
+# 查表只需一次取餘數，不經過浮點三角函數或 sympy；文字形式可直接交給 math_core.parser 解析。
+import math
+from dataclasses import dataclass
+from fractions import Fraction
+from typing import Optional
+
+# 第一象限 0°, 15°, …, 90° 的 sin 與 tan（tan 90° 未定義）
+_SIN_EXACT = ("0", "(√6-√2)/4", "1/2", "√2/2", "√3/2", "(√6+√2)/4", "1")
+_SIN_VALUE = (0.0, (math.sqrt(6) - math.sqrt(2)) / 4, 0.5, math.sqrt(2) / 2, math.sqrt(3) / 2,
+              (math.sqrt(6) + math.sqrt(2)) / 4, 1.0)
+_TAN_EXACT = ("0", "2-√3", "√3/3", "1", "√3", "2+√3", None)
+_TAN_VALUE = (0.0, 2 - math.sqrt(3), math.sqrt(3) / 3, 1.0, math.sqrt(3), 2 + math.sqrt(3), math.nan)
+_NEGATIVE = {"0": "0", "(√6-√2)/4": "(√2-√6)/4", "(√6+√2)/4": "-(√6+√2)/4", "2-√3": "√3-2", "2+√3": "-2-√3"}
+
+# 弧度與 k·π/12 相差不超過這麼多個 ulp 才算特殊角：π/6、math.radians(30) 等寫法都在 2 ulp 以內。
+# 容許誤差必須是絕對的（以角度本身的 ulp 計），若隨角度放大，1e8 以上幾乎每個數都會被當成特殊角
+_RADIAN_ULPS = 4
+
+
+@dataclass(frozen=True)
+class SpecialAngle:
+    degrees: int
+    radians: str
+    sin: str
+    cos: str
+    tan: Optional[str]
+    sin_value: float
+    cos_value: float
+    tan_value: float
+
+
+def _negate(text):
+    return _NEGATIVE.get(text, "-" + text)
+
+
+def _sin(k):
+    # k 為 0–23（15° 的倍數），依象限對稱取第一象限的值
+    if k <= 6:
+        return _SIN_EXACT[k], _SIN_VALUE[k]
+    if k <= 12:
+        return _SIN_EXACT[12 - k], _SIN_VALUE[12 - k]
+    text, value = _sin(k - 12)
+    return _negate(text), -value
+
+
+def _tan(k):
+    k %= 12
+    if k <= 6:
+        return _TAN_EXACT[k], _TAN_VALUE[k]
+    return _negate(_TAN_EXACT[12 - k]), -_TAN_VALUE[12 - k]
+
+
+def radians_text(k):
+    """k·π/12 的最簡寫法，例如 3 → π/4、18 → 3π/2、-6 → -π/2。"""
+    ratio = Fraction(k, 12)
+    if ratio == 0:
+        return "0"
+    sign = "-" if ratio < 0 else ""
+    numerator = abs(ratio.numerator)
+    coefficient = "" if numerator == 1 else str(numerator)
+    return f"{sign}{coefficient}π" + ("" if ratio.denominator == 1 else f"/{ratio.denominator}")
+
+
+def _build(k):
+    sin, sin_value = _sin(k)
+    cos, cos_value = _sin((k + 6) % 24)
+    tan, tan_value = _tan(k)
+    return SpecialAngle(15 * k, radians_text(k), sin, cos, tan, sin_value, cos_value, tan_value)
+
+
+TABLE = tuple(_build(k) for k in range(24))
+
+
+def multiple(angle, degrees=True):
+    """angle 是 15°（或 π/12）的幾倍；不是特殊角時回傳 None。"""
+    angle = float(angle)
+    if not math.isfinite(angle):
+        return None
+    if degrees:
+        return int(angle // 15) if angle % 15 == 0 else None
+    k = round(angle / (math.pi / 12))
+    return k if abs(angle - k * math.pi / 12) <= _RADIAN_ULPS * math.ulp(angle) else None
+
+
+def lookup(angle, degrees=True):
+    """特殊角回傳表中的 SpecialAngle，否則回傳 None。"""
+    k = multiple(angle, degrees)
+    return None if k is None else TABLE[k % 24]
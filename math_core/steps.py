@@ -0,0 +1,394 @@
+# steps.py - 各題型的解題步驟（結構化資料，畫面只負責逐條顯示）
+#
+# 數值題型的步驟直接沿用解題時算出的中間結果（判別式、根、行列式…），不重新求解；
+# 表達式運算的步驟需要 sympy，只在使用者要看步驟時才由 algebra.OPERATIONS 的 *_steps 執行。
+import math
+from dataclasses import dataclass
+from fractions import Fraction
+
+from math_core.closed_form import _split_square, to_fraction
+
+
+@dataclass(frozen=True)
+class Step:
+    text: str
+    formula: str = ""
+
+
+def _p(value):
+    # 負數代入公式時加括號：(-5)²
+    return f"({value})" if value < 0 else f"{value}"
+
+
+def _num(value):
+    # 整數值的浮點數去掉 .0，其餘保留原本的寫法
+    return f"{int(value)}" if float(value).is_integer() else f"{value}"
+
+
+def _terms(pairs):
+    """[(2, "x"), (-1, "y")] → "2x - y"；係數為 0 的項省略。"""
+    text = ""
+    for coef, name in pairs:
+        if coef == 0:
+            continue
+        size = abs(coef)
+        part = name if size == 1 else f"{size}{name}"
+        if not text:
+            text = f"-{part}" if coef < 0 else part
+        else:
+            text += f" - {part}" if coef < 0 else f" + {part}"
+    return text or "0"
+
+
+def sqrt_text(q):
+    """非負有理數 q 的最簡根式，例如 12 → 2√3、1/2 → √2/2、9/4 → 3/2。"""
+    q = Fraction(q)
+    k, m = _split_square(q.numerator * q.denominator)
+    coef = Fraction(k, q.denominator)
+    if m == 1:
+        return str(coef)
+    head = "" if coef.numerator == 1 else str(coef.numerator)
+    return f"{head}√{m}" + ("" if coef.denominator == 1 else f"/{coef.denominator}")
+
+
+# ========== 代數 ==========
+def quadratic(a, b, c, roots):
+    a, b, c = (to_fraction(v) for v in (a, b, c))
+    D = b*b - 4*a*c
+    steps = [
+        Step("寫出係數", f"a = {a}, b = {b}, c = {c}"),
+        Step("計算判別式", f"D = b² - 4ac = {_p(b)}² - 4×{_p(a)}×{_p(c)} = {D}"),
+    ]
+    if D == 0:
+        steps.append(Step("D = 0，有一個重根（兩根相等）"))
+        steps.append(Step("代入 x = -b / (2a)", f"x = {-b} / {_p(2*a)} = {roots[0]}"))
+        return steps
+    if D > 0:
+        steps.append(Step("D > 0，有兩個相異實根"))
+    else:
+        steps.append(Step("D < 0，沒有實數根，有兩個共軛複數根"))
+    steps.append(Step("代入求根公式 x = (-b ± √D) / (2a)", f"x = ({-b} ± √{_p(D)}) / {_p(2*a)}"))
+    if D < 0:
+        steps.append(Step("負數開根號：√D = i√|D|", f"√{_p(D)} = {sqrt_text(-D)}i"))
+    elif sqrt_text(D) != f"√{D}":
+        steps.append(Step("化簡根號", f"√{D} = {sqrt_text(D)}"))
+    steps.append(Step("得到兩根", f"x₁ = {roots[0]}, x₂ = {roots[1]}"))
+    return steps
+
+
+def linear(a, b):
+    a, b = to_fraction(a), to_fraction(b)
+    x = -b / a
+    steps = [
+        Step("常數項移到等號右邊", f"{_terms([(a, 'x')])} = {-b}"),
+        Step("兩邊同除以 a", f"x = {-b} / {_p(a)} = {x}"),
+    ]
+    if x.denominator != 1:
+        steps.append(Step("化成小數", f"x ≈ {float(x):.4f}"))
+    return steps
+
+
+def system_2x2(a1, b1, c1, a2, b2, c2):
+    """加減消去法：先消去 y 求 x，再代回求 y；行列式為 0 時說明無解或無限多解。"""
+    a1, b1, c1, a2, b2, c2 = (to_fraction(v) for v in (a1, b1, c1, a2, b2, c2))
+    det = a1*b2 - a2*b1
+    nx = c1*b2 - c2*b1
+    ny = a1*c2 - a2*c1
+    steps = [
+        Step("寫出方程組", f"(1) {_terms([(a1, 'x'), (b1, 'y')])} = {c1}；"
+                          f"(2) {_terms([(a2, 'x'), (b2, 'y')])} = {c2}"),
+        Step("消去 y：(1)×b₂ − (2)×b₁", f"({_p(a1)}×{_p(b2)} − {_p(a2)}×{_p(b1)})x = "
+                                      f"{_p(c1)}×{_p(b2)} − {_p(c2)}×{_p(b1)}"),
+        Step("整理", f"{det}x = {nx}"),
+    ]
+    if det == 0:
+        if nx != 0:
+            steps.append(Step(f"0 = {nx} 不可能成立，方程組無解（兩直線平行）"))
+        elif ny != 0:
+            steps.append(Step("改為消去 x：(2)×a₁ − (1)×a₂", f"0 = {ny}"))
+            steps.append(Step("等式不可能成立，方程組無解（兩直線平行）"))
+        else:
+            steps.append(Step("0 = 0 恆成立，兩式代表同一條直線，方程組有無限多解"))
+        return steps
+    x = nx / det
+    steps.append(Step("解出 x", f"x = {nx} / {_p(det)} = {x}"))
+    # 代回 y 係數不為 0 的那一式（行列式不為 0 時至少有一式可用）
+    n, a, b, c = (1, a1, b1, c1) if b1 != 0 else (2, a2, b2, c2)
+    y = (c - a*x) / b
+    steps.append(Step(f"代回第 ({n}) 式求 y", f"y = ({c} − {_p(a)}×{_p(x)}) / {_p(b)} = {y}"))
+    steps.append(Step("得到解", f"x = {x}, y = {y}"))
+    return steps
+
+
+def linear_system(matrix, names, result, record):
+    """精確法依 record（求解時記下的列運算）列出每個樞紐的消去；數值法只說明所用的分解與秩。"""
+    from math_core import linear_systems
+
+    m, n = len(matrix), len(names)
+    if result.method == "exact":
+        steps = [Step("寫出增廣矩陣 [A|b]", f"{m} 個方程式、{n} 個未知數")]
+        for column in dict.fromkeys(c for c, _ in record):
+            label = f"以 {names[column]} 的係數為樞紐消去" if column < n else "整理常數項那一欄"
+            steps.append(Step(label, "、".join(op for c, op in record if c == column)))
+    else:
+        steps = [Step("以奇異值分解求係數矩陣的秩", f"rank(A) = {result.rank}")]
+        if result.status == "unique":
+            steps.append(Step("滿秩方陣，以 LU 分解求解（numpy.linalg.solve）"))
+        else:
+            steps.append(Step("以最小平方法求解（numpy.linalg.lstsq）", f"‖Ax − b‖ = {result.residual:.3g}"))
+    ranks = f"rank(A) = {result.rank}, rank([A|b]) = {result.augmented_rank}"
+    if result.status == "none":
+        reason = "出現 0 = 非零 的列" if result.method == "exact" else "殘差無法降到捨入誤差以內"
+        steps.append(Step(f"增廣矩陣的秩比係數矩陣大（{reason}），方程組無解", ranks))
+    elif result.status == "unique":
+        steps.append(Step(f"秩等於未知數個數 {n}，有唯一解", ranks))
+    else:
+        steps.append(Step(f"秩小於未知數個數，有 {n - result.rank} 個自由變數，方程組有無限多解", ranks))
+        if result.method == "exact":
+            steps.append(Step("令自由變數為參數，寫出通解", "；".join(linear_systems.general_solution(result, names))))
+    return steps
+
+
+def polynomial(result, variable):
+    """精確法依不可約因式說明每組根的來源；數值法說明伴隨矩陣、牛頓法修正與誤差上界。"""
+    from math_core import polynomials
+
+    if result.method == "exact":
+        product = " · ".join(f"({f})" + (f"^{k}" if k > 1 else "") for f, k, _ in result.factors)
+        steps = [Step("在有理數範圍內因式分解", f"{product} = 0")]
+        for factor, k, roots in result.factors:
+            n = len(roots)
+            repeat = f"（重複 {k} 次，每個根都是 {k} 重根）" if k > 1 else ""
+            values = ", ".join(str(r) for r in roots)
+            if n == 1:
+                steps.append(Step(f"一次因式 {factor} = 0{repeat}", f"{variable} = {values}"))
+            elif n == 2:
+                steps.append(Step(f"二次因式 {factor} = 0 用公式解{repeat}", f"{variable} = {values}"))
+            elif any(r.func.__name__ == "ComplexRootOf" for r in roots):
+                approx = ", ".join(polynomials.format_root(complex(r.evalf())) for r in roots)
+                steps.append(Step(f"{n} 次因式 {factor} 沒有簡單的根式，以 CRootOf 表示它的 {n} 個根{repeat}",
+                                  f"{variable} ≈ {approx}"))
+            else:
+                steps.append(Step(f"{n} 次因式 {factor} = 0{repeat}", f"{variable} = {values}"))
+        return steps
+
+    n = result.degree
+    # 0 根由末項的 0 直接得出（誤差半徑為 0），依大小排在其他根之間
+    zero_at = next((i for i, (z, r) in enumerate(zip(result.roots, result.radii)) if z == 0 and r == 0), None)
+    zeros = 0 if zero_at is None else result.multiplicities[zero_at]
+    steps = []
+    if zeros:
+        steps.append(Step(f"提出公因式 {variable}^{zeros}，{variable} = 0 是 {zeros} 重根"))
+    m = n - zeros
+    if m:
+        steps += [
+            Step(f"把 {m} 次多項式寫成伴隨矩陣（{m}×{m}），其特徵值就是方程式的根", "numpy.roots"),
+            Step(f"以牛頓法修正每個近似根（最多 {polynomials.POLISH_STEPS} 次）", "z ← z − p(z) / p′(z)"),
+        ]
+        bound = max(r for i, r in enumerate(result.radii) if i != zero_at)
+        if math.isfinite(bound):
+            steps.append(Step("以 Weierstrass 修正量估計誤差：每個真正的根都落在以近似根為中心的小圓內",
+                              f"半徑 n·|p(zᵢ) / (aₙ ∏ⱼ≠ᵢ (zᵢ − zⱼ))| ≤ {bound:.2e}"))
+        else:
+            steps.append(Step("有重根或非常接近的根，誤差圓互相重疊，無法個別保證誤差"))
+    real = sum(k for z, k in zip(result.roots, result.multiplicities) if z.imag == 0)
+    steps.append(Step(f"共 {n} 個根（重根依重數計）：實根 {real} 個、虛根 {n - real} 個，虛根成共軛對出現"))
+    return steps
+
+
+def evaluate(expr, var, count, defined):
+    steps = [
+        Step("把表達式編譯成向量化的 NumPy 函數（同一個表達式只編譯一次）", f"f({var}) = {expr}"),
+        Step(f"一次代入全部 {count} 個 {var} 值，不必逐點以 sympy 代換"),
+    ]
+    if defined < count:
+        steps.append(Step(f"{count - defined} 個點無定義或不是實數（例如分母為 0、根號或對數內為負）"))
+    return steps
+
+
+def _pattern(poly):
+    # 只用項數與次數猜課本上的分解方法，猜不到時不給提示
+    import sympy as sp
+
+    terms = sp.Add.make_args(poly)
+    try:
+        degree = sp.Poly(poly).total_degree()
+    except sp.PolynomialError:
+        return ""
+    if len(terms) == 2 and degree == 2:
+        return "平方差公式 a² − b² = (a + b)(a − b)"
+    if len(terms) == 2 and degree == 3:
+        return "立方和／立方差公式 a³ ± b³ = (a ± b)(a² ∓ ab + b²)"
+    if len(terms) == 3 and degree == 2:
+        return "十字交乘法"
+    return ""
+
+
+def factor_steps(expr):
+    import sympy as sp
+
+    steps = [Step("原式", str(expr))]
+    expanded = sp.expand(expr)
+    if expanded != expr:
+        steps.append(Step("先展開整理", str(expanded)))
+    terms = sp.Add.make_args(expanded)
+    remainder = expanded
+    try:
+        common = sp.gcd_list(terms) if len(terms) > 1 else sp.S.One
+    except (sp.PolynomialError, sp.GeneratorsNeeded):
+        common = sp.S.One
+    if common != 1:
+        remainder = sp.expand(expanded / common)
+        steps.append(Step(f"提出公因式 {common}", f"{common}*({remainder})"))
+    factored = sp.factor(remainder)
+    if factored == remainder:
+        if common == 1:
+            steps.append(Step("在有理數範圍內無法再分解"))
+        return steps
+    pattern = _pattern(remainder)
+    steps.append(Step(f"分解 {remainder}" + (f"：{pattern}" if pattern else ""), f"{remainder} = {factored}"))
+    try:
+        _, factors = sp.factor_list(expanded)
+    except sp.PolynomialError:
+        factors = []
+    if len(factors) > 1 or any(k > 1 for _, k in factors):
+        listed = "、".join(str(f) if k == 1 else f"({f})**{k}" for f, k in factors)
+        steps.append(Step("不可再分解的因式", listed))
+    steps.append(Step("結果", str(sp.factor(expr))))
+    return steps
+
+
+def expand_steps(expr):
+    import sympy as sp
+
+    steps = [Step("原式", str(expr))]
+    parts = sp.Add.make_args(expr) if expr.is_Add else [expr]
+    for part in parts:
+        for factor in sp.Mul.make_args(part):
+            if factor.is_Pow and factor.base.is_Add and factor.exp.is_Integer and factor.exp > 1:
+                if len(factor.base.args) == 2:
+                    method = "乘法公式" if factor.exp == 2 else "二項式定理"
+                else:
+                    method = "多項式乘方"
+                steps.append(Step(f"以{method}展開 {factor}", f"{factor} = {sp.expand(factor)}"))
+        if part.is_Mul and any(f.is_Add or (f.is_Pow and f.base.is_Add) for f in part.args):
+            steps.append(Step(f"分配律：{part} 的每一項分別相乘", f"{part} = {sp.expand(part)}"))
+    result = sp.expand(expr)
+    if len(steps) == 1 and result == expr:
+        steps.append(Step("已經是展開的形式"))
+    else:
+        steps.append(Step("合併同類項", str(result)))
+    return steps
+
+
+def simplify_steps(expr):
+    import sympy as sp
+
+    steps = [Step("原式", str(expr))]
+    current = sp.together(expr)
+    if current != expr:
+        steps.append(Step("通分", str(current)))
+    numerator, denominator = sp.fraction(current)
+    try:
+        common = sp.gcd(numerator, denominator) if denominator != 1 else sp.S.One
+    except sp.PolynomialError:
+        common = sp.S.One
+    if denominator != 1 and sp.expand(numerator) == 0:
+        current = sp.S.Zero
+        steps.append(Step("分子展開後為 0", "0"))
+    elif common != 1:
+        current = sp.cancel(current)
+        steps.append(Step(f"約去分子分母的公因式 {common}", str(current)))
+    changed = sp.trigsimp(current)
+    if changed != current:
+        steps.append(Step("三角恆等式", str(changed)))
+        current = changed
+    result = sp.simplify(expr)
+    if result != current:
+        steps.append(Step("整理成最簡形式", str(result)))
+    elif len(steps) == 1:
+        steps.append(Step("已經是最簡形式"))
+    return steps
+
+
+# ========== 幾何 ==========
+def triangle_area(base, height, area):
+    return [Step("面積 = ½ × 底 × 高", f"½ × {_num(base)} × {_num(height)} = {_num(area)}")]
+
+
+def rect_area(length, width, area):
+    return [Step("面積 = 長 × 寬", f"{_num(length)} × {_num(width)} = {_num(area)}")]
+
+
+def circle_area(radius, area):
+    r = to_fraction(radius)
+    return [Step("面積 = πr²", f"π × {r}² = {r*r}π ≈ {area:.4f}")]
+
+
+def circle_circumference(radius, circumference):
+    r = to_fraction(radius)
+    return [Step("圓周長 = 2πr", f"2 × π × {r} = {2*r}π ≈ {circumference:.4f}")]
+
+
+def pythagoras(a, b, c, unknown, value):
+    """畢氏定理 a² + b² = c²；已知的兩邊取精確分數，結果寫成最簡根式。"""
+    sides = {name: to_fraction(v) for name, v in (("a", a), ("b", b), ("c", c)) if v is not None}
+    if unknown == "c":
+        squared = sides["a"]**2 + sides["b"]**2
+        rule = "c² = a² + b²"
+        formula = f"c = √({sides['a']}² + {sides['b']}²) = √({sides['a']**2} + {sides['b']**2}) = √{squared}"
+    else:
+        other = "b" if unknown == "a" else "a"
+        squared = sides["c"]**2 - sides[other]**2
+        rule = f"{unknown}² = c² − {other}²"
+        formula = (f"{unknown} = √({sides['c']}² − {sides[other]}²) = "
+                   f"√({sides['c']**2} − {sides[other]**2}) = √{squared}")
+    steps = [Step("畢氏定理", rule), Step("代入已知兩邊", formula)]
+    exact = sqrt_text(squared)
+    steps.append(Step("開根號", f"{unknown} = {exact}" + ("" if "√" not in exact else f" ≈ {value:.4f}")))
+    return steps
+
+
+# ========== 三角函數 ==========
+def convert_angle(value, from_degrees, result, exact):
+    if from_degrees:
+        formula = f"{_num(value)} × π/180 = " + (f"{exact}" if exact else f"{result:.6f}")
+        return [Step("弧度 = 角度 × π/180", formula)]
+    formula = f"{value} × 180/π = " + (f"{exact}" if exact else f"{result:.6f}°")
+    return [Step("角度 = 弧度 × 180/π", formula)]
+
+
+def trig_values(angle, degrees, values):
+    unit = "°" if degrees else "弧度"
+    exact = values["exact"]
+    if exact is not None:
+        steps = [Step(f"{_num(angle)}{unit} 是 15°（π/12）的倍數，查特殊角表"),
+                 Step("sin 與 cos", f"sin = {exact['sin']}, cos = {exact['cos']}")]
+        if exact["tan"] is None:
+            steps.append(Step("cos = 0，tan = sin/cos 無定義"))
+        else:
+            steps.append(Step("tan = sin / cos", f"tan = {exact['tan']}"))
+        return steps
+    steps = []
+    if degrees:
+        steps.append(Step("換成弧度", f"{_num(angle)} × π/180 = {math.radians(angle):.6f}"))
+    steps.append(Step("以數值計算", f"sin ≈ {values['sin']:.6f}, cos ≈ {values['cos']:.6f}"))
+    if values["tan"] is None:
+        steps.append(Step("cos = 0，tan = sin/cos 無定義"))
+    else:
+        steps.append(Step("tan = sin / cos", f"tan ≈ {values['tan']:.6f}"))
+    return steps
+
+
+def right_triangle(a, b, c, rt):
+    """先用畢氏定理求第三邊，再由已知邊的比值求角 A（對邊 a、鄰邊 b、斜邊 c），B = 90° − A。"""
+    unknown = rt["side"]
+    steps = pythagoras(a, b, c, unknown, rt[unknown])
+    if c is None:
+        steps.append(Step("tan A = 對邊 / 鄰邊", f"A = arctan({_num(a)} / {_num(b)}) ≈ {rt['A']:.1f}°"))
+    elif b is None:
+        steps.append(Step("sin A = 對邊 / 斜邊", f"A = arcsin({_num(a)} / {_num(c)}) ≈ {rt['A']:.1f}°"))
+    else:
+        steps.append(Step("cos A = 鄰邊 / 斜邊", f"A = arccos({_num(b)} / {_num(c)}) ≈ {rt['A']:.1f}°"))
+    steps.append(Step("兩銳角互餘：B = 90° − A", f"B ≈ {rt['B']:.1f}°"))
+    return steps
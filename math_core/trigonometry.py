@@ -0,0 +1,69 @@
+# trigonometry.py - 角度轉換、三角函數值與解直角三角形（可輸入純量或陣列）
+import numpy as np
+
+from math_core import special_angles
+from math_core.geometry import _out, hypotenuse, leg
+
+_SIN = np.array([entry.sin_value for entry in special_angles.TABLE])
+_COS = np.array([entry.cos_value for entry in special_angles.TABLE])
+_TAN = np.array([entry.tan_value for entry in special_angles.TABLE])
+
+
+def to_radians(degrees):
+    return _out(np.radians(np.asarray(degrees, dtype=float)))
+
+
+def to_degrees(radians):
+    return _out(np.degrees(np.asarray(radians, dtype=float)))
+
+
+def _special_index(angle, degrees):
+    # 15°（π/12）倍數的位置與其在 special_angles.TABLE 中的索引
+    finite = np.isfinite(angle)
+    safe = np.where(finite, angle, 0.0)
+    if degrees:
+        steps = np.floor_divide(safe, 15)
+        special = finite & (np.mod(safe, 15) == 0)
+    else:
+        steps = np.rint(safe / (np.pi / 12))
+        distance = np.abs(safe - steps * np.pi / 12)
+        special = finite & (distance <= special_angles._RADIAN_ULPS * np.spacing(np.abs(safe)))
+    return special, np.mod(steps, 24).astype(int)
+
+
+def trig_values(angle, degrees=True):
+    """回傳 (sin, cos, tan)；15° 的倍數直接查精確值表，tan 恰好在 90° + k·180° 未定義，以 nan 表示。"""
+    angle = np.asarray(angle, dtype=float)
+    rad = np.radians(angle) if degrees else angle
+    special, index = _special_index(angle, degrees)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        sin = np.where(special, _SIN[index], np.sin(rad))
+        cos = np.where(special, _COS[index], np.cos(rad))
+        tan = np.where(special, _TAN[index], np.tan(rad))
+    return _out(sin), _out(cos), _out(tan)
+
+
+def trig_table(start, stop, step, degrees=True):
+    """start 到 stop（含）每隔 step 的三角函數表，回傳 (角度, sin, cos, tan) 四個陣列。"""
+    angles = np.arange(start, stop + step / 2, step, dtype=float)
+    sin, cos, tan = trig_values(angles, degrees)
+    return angles, np.atleast_1d(sin), np.atleast_1d(cos), np.atleast_1d(tan)
+
+
+def solve_right_triangle(a=None, b=None, c=None):
+    """已知兩邊（c 為斜邊）求第三邊與兩銳角（度），回傳 dict(a, b, c, A, B)。"""
+    if c is None:
+        a, b = np.asarray(a, dtype=float), np.asarray(b, dtype=float)
+        c = hypotenuse(a, b)
+        angle_A = np.degrees(np.arctan2(a, b))
+    elif b is None:
+        a, c = np.asarray(a, dtype=float), np.asarray(c, dtype=float)
+        b = leg(c, a)
+        with np.errstate(invalid="ignore"):
+            angle_A = np.degrees(np.arcsin(a / c))
+    else:
+        b, c = np.asarray(b, dtype=float), np.asarray(c, dtype=float)
+        a = leg(c, b)
+        with np.errstate(invalid="ignore"):
+            angle_A = np.degrees(np.arccos(b / c))
+    return {"a": _out(a), "b": _out(b), "c": _out(c), "A": _out(angle_A), "B": _out(90 - angle_A)}
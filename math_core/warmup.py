@@ -0,0 +1,242 @@
+# warmup.py - 伺服器啟動時的暖機：先把每條解題路徑跑過一次，第一位學生不必等 sympy 的延遲初始化
+#
+# 主程序: 載入 sympy/numpy、解析器、公式解、線性方程組、數值求根、編譯後的求值函數與常用的函數圖形。
+# 工作程序池: 把工作程序開滿，每個程序各跑一次因式分解、展開、化簡、精確根與批改用的化簡（與主程序平行）。
+# 共用快取: 介面上的預設範例先算好放進快取，第一次按下按鈕就會命中。
+#
+# 以環境變數設定：
+#   MATH_WARMUP=0                       關閉暖機
+#   MATH_CACHE_SNAPSHOT=路徑            memory 快取的快照檔：啟動時載入，結束時與每隔一段時間寫回，
+#                                       重新啟動或部署後先前算過的題目仍然命中（sqlite/redis 後端本身就會保存）
+#   MATH_CACHE_SNAPSHOT_INTERVAL=秒     定期寫回的間隔，預設 300；0 表示只在程序結束時寫回
+import atexit
+import os
+import threading
+import time
+
+from math_core.metrics import metrics
+
+ENABLED = os.environ.get("MATH_WARMUP", "1").strip().lower() not in ("0", "false", "off", "no")
+SNAPSHOT_PATH = os.environ.get("MATH_CACHE_SNAPSHOT", "")
+SNAPSHOT_INTERVAL = float(os.environ.get("MATH_CACHE_SNAPSHOT_INTERVAL", "300"))
+
+# 介面上的預設範例（運算, 表達式）；連同解題步驟一起放進共用快取
+EXAMPLES = [("factor", "x**2 - 4"), ("expand", "(x+1)**2"), ("simplify", "(x**2 - 1)/(x - 1)")]
+# 每個工作程序各跑一次，涵蓋 sympy 各個延遲初始化的子系統（多項式、三角、指數、根式、CRootOf）
+POOL_JOBS = [
+    ("factor", "x**3 - 2*x**2 - 5*x + 6"),
+    ("expand", "(x + 2*y)**3"),
+    ("simplify", "sin(x)**2 + cos(x)**2 + exp(x)*exp(-x)"),
+    ("poly_roots", "x**3 - 3*x + 1"),
+    ("is_zero", "sin(2*x) - 2*sin(x)*cos(x)"),
+    ("factor_steps", "x**2 - 5*x + 6"),
+]
+
+
+def _modules():
+    import numpy  # noqa: F401
+    import sympy  # noqa: F401
+
+
+def _parser():
+    from math_core.algebra import parse_expression
+
+    for text in ("2x^2 + 3x - 5", "√2·sin(x) + cos(2x)", "(x+1)(x-1)/(x^2+1)"):
+        parse_expression(text)
+
+
+def _formulas():
+    from math_core import solvers
+
+    for sol in (solvers.quadratic(1, -5, 6), solvers.quadratic(1, 2, 5), solvers.linear(2, -8),
+                solvers.system_2x2(2, 3, 8, 1, -1, 1), solvers.pythagoras(a=3, b=4),
+                solvers.trig_values(30), solvers.trig_values(31), solvers.convert_angle(30)):
+        sol.explain()
+
+
+def _linear_systems():
+    from math_core import solvers
+
+    matrix, constants = [[1, 1, 1], [0, 1, -1], [2, 0, 1]], [6, 0, 4]
+    solvers.linear_system(matrix, constants).explain()
+    solvers.linear_system(matrix, constants, method="numpy")
+
+
+def _numeric_roots():
+    from math_core import solvers
+
+    solvers.polynomial([1, 0, -2], method="numpy").explain()
+
+
+def _evaluate():
+    from math_core import solvers
+
+    solvers.evaluate("x**2 - 4", [0, 1, 2, 3])
+
+
+def _plots():
+    import math
+
+    from math_core import solvers
+    from math_core.algebra import parse_expression
+    from math_core.plotting import render_plot
+
+    # 與 plot_panel 的預設範圍、解析度相同，第一次勾選「顯示函數圖形」直接取快取
+    for text, lo, hi in ((solvers.quadratic_text(1.0, -5.0, 6.0), -10.0, 10.0),
+                         ("(x**2 - 1)/(x - 1)", -10.0, 10.0),
+                         ("sin(x)", -2 * math.pi, 2 * math.pi),
+                         ("cos(x)", -2 * math.pi, 2 * math.pi),
+                         ("tan(x)", -2 * math.pi, 2 * math.pi)):
+        render_plot(parse_expression(text), lo, hi, 200)
+
+
+def _examples():
+    from math_core import answer_check, polynomials, solvers
+    from math_core.worker_pool import get_pool
+
+    compute = get_pool().run
+    for op, text in EXAMPLES:
+        solvers.symbolic(op, text, compute=compute).explain()
+    coefficients, variable = polynomials.parse_polynomial("x^3 - 6x^2 + 11x - 6 = 0")
+    solvers.polynomial(coefficients, variable, compute=compute)
+    answer_check.check("因式分解", "x**2 - 4", "(x-2)(x+2)", compute=compute)
+
+
+# 主程序依序執行的步驟（名稱, 函數）
+LOCAL_STEPS = [
+    ("載入模組", _modules),
+    ("解析器", _parser),
+    ("公式解", _formulas),
+    ("線性方程組", _linear_systems),
+    ("數值求根", _numeric_roots),
+    ("求值", _evaluate),
+    ("函數圖形", _plots),
+]
+
+
+class Warmup:
+    """依序執行暖機步驟並記錄每一步的耗時；步驟失敗只記錄下來，不影響伺服器啟動。"""
+
+    def __init__(self, enabled=ENABLED, snapshot_path=SNAPSHOT_PATH, snapshot_interval=SNAPSHOT_INTERVAL):
+        self.enabled = enabled
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval = snapshot_interval
+        self.state = "pending"  # pending → running → done
+        self.timings = {}
+        self.errors = {}
+        self.seconds = 0.0
+        self.pool_workers = 0
+        self.snapshot_loaded = 0
+        self.snapshot_saved = 0
+        self._saved_writes = None
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._thread = None
+
+    def _step(self, name, func):
+        started = time.perf_counter()
+        try:
+            func()
+        except Exception as e:
+            self.errors[name] = f"{type(e).__name__}: {e}"
+        seconds = time.perf_counter() - started
+        self.timings[name] = seconds
+        metrics.observe("math_warmup_seconds", seconds, step=name)
+
+    def _memory_cache(self):
+        # 只有 memory 後端需要快照
+        from math_core.result_cache import ResultCache, result_cache
+
+        return result_cache if self.snapshot_path and isinstance(result_cache, ResultCache) else None
+
+    def _prestart_pool(self):
+        from math_core.algebra import parse_expression
+        from math_core.worker_pool import get_pool
+
+        self.pool_workers = get_pool().prestart([(op, (parse_expression(text),)) for op, text in POOL_JOBS])
+
+    def run(self, skip=()):
+        """執行一次暖機（同一個程序只會執行一次）；已在執行中時等它完成。skip 為不需要的步驟名稱。"""
+        with self._lock:
+            first = self.state == "pending"
+            if first:
+                self.state = "running"
+        if not first:
+            self._done.wait()
+            return
+        started = time.perf_counter()
+        try:
+            cache = self._memory_cache()
+            if cache is not None:
+                self._step("載入快照", lambda: setattr(self, "snapshot_loaded", cache.load(self.snapshot_path)))
+                self._saved_writes = cache.writes
+                atexit.register(self.save_snapshot)
+            if self.enabled:
+                # 工作程序的啟動與 sympy 初始化和主程序的步驟平行進行
+                pool = threading.Thread(target=self._step, args=("工作程序池", self._prestart_pool),
+                                        name="warmup-pool", daemon=True)
+                pool.start()
+                for name, func in LOCAL_STEPS:
+                    if name not in skip:
+                        self._step(name, func)
+                pool.join()
+                self._step("預設範例", _examples)
+        finally:
+            self.seconds = time.perf_counter() - started
+            metrics.observe("math_warmup_seconds", self.seconds, step="全部")
+            self.state = "done"
+            self._done.set()
+
+    def start(self, wait=False):
+        """在背景執行緒暖機，之後定期寫回快照；wait=True 時等暖機完成才回傳。"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._background, name="warmup", daemon=True)
+                self._thread.start()
+        if wait:
+            self._done.wait()
+        return self
+
+    def _background(self):
+        self.run()
+        while self._memory_cache() is not None and self.snapshot_interval > 0:
+            time.sleep(self.snapshot_interval)
+            self.save_snapshot()
+
+    def save_snapshot(self):
+        """快取有變動時寫回快照檔；回傳寫入的筆數（沒有寫入時為 0）。"""
+        cache = self._memory_cache()
+        if cache is None or cache.writes == self._saved_writes:
+            return 0
+        writes = cache.writes
+        try:
+            self.snapshot_saved = cache.save(self.snapshot_path)
+        except OSError as e:
+            self.errors["寫回快照"] = f"{type(e).__name__}: {e}"
+            return 0
+        self._saved_writes = writes
+        return self.snapshot_saved
+
+    def report(self):
+        return {
+            "state": self.state,
+            "enabled": self.enabled,
+            "seconds": round(self.seconds, 3),
+            "steps": {name: round(seconds, 3) for name, seconds in self.timings.items()},
+            "errors": dict(self.errors),
+            "pool_workers": self.pool_workers,
+            "snapshot": {"path": self.snapshot_path, "loaded": self.snapshot_loaded, "saved": self.snapshot_saved},
+        }
+
+
+_warmup = None
+_warmup_lock = threading.Lock()
+
+
+def get_warmup():
+    """取得程序內共用的暖機狀態；呼叫 start() 或 run() 才會真正開始。"""
+    global _warmup
+    with _warmup_lock:
+        if _warmup is None:
+            _warmup = Warmup()
+        return _warmup
@@ -0,0 +1,222 @@
+# worker_pool.py - 在獨立程序中執行耗時的符號運算（有時間與記憶體上限）
+import multiprocessing as mp
+import os
+import queue
+import threading
+
+# 以環境變數調整，預設值適合單機小型部署
+DEFAULT_WORKERS = int(os.environ.get("MATH_POOL_WORKERS", str(min(2, os.cpu_count() or 1))))
+DEFAULT_TIMEOUT = float(os.environ.get("MATH_JOB_TIMEOUT", "5"))
+DEFAULT_MEMORY_MB = int(os.environ.get("MATH_JOB_MAX_MB", "512"))
+DEFAULT_MAX_QUEUE = int(os.environ.get("MATH_POOL_MAX_QUEUE", "8"))
+
+
+class ComputationTooExpensive(RuntimeError):
+    """運算超過時間或記憶體上限，工作程序已被終止。"""
+
+
+class PoolBusy(ComputationTooExpensive):
+    """等待中的工作太多，直接拒絕以免拖垮伺服器。"""
+
+
+def _limit_memory(max_bytes):
+    # RLIMIT_AS 限制的是虛擬記憶體，需以子程序目前大小為基準再加上預算
+    try:
+        import resource
+    except ImportError:  # Windows 沒有 resource 模組
+        return
+    try:
+        with open("/proc/self/statm") as f:
+            current = int(f.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        current = 0
+    limit = current + max_bytes
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _worker_main(conn, max_bytes):
+    from math_core.algebra import apply_operation
+
+    _limit_memory(max_bytes)
+    while True:
+        try:
+            op, args = conn.recv()
+        except (EOFError, OSError):
+            return
+        try:
+            result = ("ok", apply_operation(op, *args))
+        except MemoryError:
+            result = ("memory", None)
+        except Exception as e:
+            result = ("error", e)
+        try:
+            conn.send(result)
+        except MemoryError:
+            return
+        except Exception as e:
+            # 例外物件本身無法 pickle 時，改傳字串
+            conn.send(("error", RuntimeError(str(e))))
+        if result[0] == "memory":
+            return
+
+
+def _context():
+    methods = mp.get_all_start_methods()
+    if "forkserver" in methods:
+        ctx = mp.get_context("forkserver")
+        ctx.set_forkserver_preload(["math_core.algebra"])
+        return ctx
+    return mp.get_context("spawn")
+
+
+class _Worker:
+    def __init__(self, ctx, max_bytes):
+        self.conn, child_conn = ctx.Pipe()
+        self.proc = ctx.Process(target=_worker_main, args=(child_conn, max_bytes), daemon=True)
+        self.proc.start()
+        child_conn.close()
+
+    def kill(self):
+        self.proc.kill()
+        self.proc.join()
+        self.conn.close()
+
+
+class WorkerPool:
+    """固定上限的工作程序池：逾時或爆記憶體的工作程序會被殺掉並補上新的。"""
+
+    def __init__(self, max_workers=DEFAULT_WORKERS, timeout=DEFAULT_TIMEOUT,
+                 memory_mb=DEFAULT_MEMORY_MB, max_queue=DEFAULT_MAX_QUEUE):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.max_bytes = memory_mb * 1024 * 1024
+        self.max_queue = max_queue
+        self._ctx = None
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_workers)
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._running = 0
+        self.killed = 0
+        self.rejected = 0
+
+    def _checkout(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            # 工作程序延遲到第一次使用時才啟動
+            if self._ctx is None:
+                self._ctx = _context()
+            return _Worker(self._ctx, self.max_bytes)
+
+    def _discard(self, worker):
+        worker.kill()
+        with self._lock:
+            self.killed += 1
+
+    def run(self, op, *args, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        with self._lock:
+            if self._waiting >= self.max_queue:
+                self.rejected += 1
+                raise PoolBusy("伺服器忙碌中，請稍後再試")
+            self._waiting += 1
+        try:
+            acquired = self._slots.acquire(timeout=timeout)
+        finally:
+            with self._lock:
+                self._waiting -= 1
+        if not acquired:
+            with self._lock:
+                self.rejected += 1
+            raise PoolBusy("伺服器忙碌中，請稍後再試")
+
+        with self._lock:
+            self._running += 1
+        worker = None
+        try:
+            worker = self._checkout()
+            try:
+                worker.conn.send((op, args))
+                ready = worker.conn.poll(timeout)
+                status, value = worker.conn.recv() if ready else ("timeout", None)
+            except (EOFError, OSError):
+                status, value = ("memory", None)
+            if status == "ok":
+                return value
+            if status == "error":
+                raise value
+            self._discard(worker)
+            worker = None
+            if status == "timeout":
+                raise ComputationTooExpensive(f"計算量過大：超過 {timeout:g} 秒上限")
+            raise ComputationTooExpensive(
+                f"計算量過大：超過 {self.max_bytes // (1024 * 1024)} MB 記憶體上限")
+        finally:
+            if worker is not None:
+                self._idle.put(worker)
+            with self._lock:
+                self._running -= 1
+            self._slots.release()
+
+    def prestart(self, jobs=(), timeout=None):
+        """把工作程序開滿，並在每個程序裡各跑一次 jobs [(op, args), ...]，先付掉 sympy 的延遲初始化。
+
+        只佔用目前空著的名額，不會擋住正在進行的請求；回傳暖機成功的程序數。
+        """
+        timeout = self.timeout if timeout is None else timeout
+        acquired = 0
+        workers = []
+        try:
+            while acquired < self.max_workers and self._slots.acquire(blocking=False):
+                acquired += 1
+                workers.append(self._checkout())
+            for op, args in jobs:
+                # 同一個工作同時送給所有程序，各程序平行計算
+                for worker in workers:
+                    worker.conn.send((op, args))
+                for worker in list(workers):
+                    try:
+                        done = worker.conn.poll(timeout) and worker.conn.recv()[0] in ("ok", "error")
+                    except (EOFError, OSError):
+                        done = False
+                    if not done:
+                        workers.remove(worker)
+                        self._discard(worker)
+            return len(workers)
+        finally:
+            for worker in workers:
+                self._idle.put(worker)
+            for _ in range(acquired):
+                self._slots.release()
+
+    def shutdown(self):
+        while True:
+            try:
+                self._idle.get_nowait().kill()
+            except queue.Empty:
+                return
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "idle": self._idle.qsize(),
+                "waiting": self._waiting,
+                "running": self._running,
+                "killed": self.killed,
+                "rejected": self.rejected,
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """取得程序內共用的工作程序池。"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = WorkerPool()
+        return _pool